@@ -20,6 +20,7 @@ from rest_framework.views import APIView
 from .views import AjaxView
 from .version import inventreeVersion, inventreeApiVersion, inventreeInstanceName
 from .status import is_worker_running
+from .dashboard import get_dashboard, DASHBOARD_RESULTS
 
 from plugins import plugins as inventree_plugins
 
@@ -124,3 +125,29 @@ class ActionPluginView(APIView):
             'error': _("No matching action found"),
             "action": action,
         })
+
+
+class DashboardView(APIView):
+    """
+    Endpoint for the aggregated dashboard (index page) data.
+
+    - GET: Return the count and top-N rows for each dashboard panel
+
+    Query parameters:
+    - limit: Maximum number of rows returned for each panel
+    """
+
+    permission_classes = [
+        permissions.IsAuthenticated,
+    ]
+
+    def get(self, request, *args, **kwargs):
+
+        try:
+            limit = int(request.query_params.get('limit', DASHBOARD_RESULTS))
+        except ValueError:
+            limit = DASHBOARD_RESULTS
+
+        limit = max(limit, 0)
+
+        return Response(get_dashboard(request.user, limit=limit))
@@ -18,6 +18,15 @@ class InvenTreeConfig(AppConfig):
 
     def ready(self):
 
+        # Connect the signal receivers which invalidate cached dashboard data
+        import InvenTree.dashboard  # noqa: F401
+
+        # Connect the signal receivers which invalidate cached tree data
+        import InvenTree.tree  # noqa: F401
+
+        # Connect the signal receivers which invalidate compiled label / report templates
+        import InvenTree.matching  # noqa: F401
+
         if canAppAccessDatabase():
             self.start_background_tasks()
 
@@ -54,6 +63,11 @@ class InvenTreeConfig(AppConfig):
             schedule_type=Schedule.DAILY,
         )
 
+        InvenTree.tasks.schedule_task(
+            'InvenTree.tasks.delete_old_report_jobs',
+            schedule_type=Schedule.DAILY,
+        )
+
     def update_exchange_rates(self):
         """
         Update exchange rates each time the server is started, *if*:
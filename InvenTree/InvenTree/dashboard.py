@@ -0,0 +1,353 @@
+"""
+Aggregated data for the InvenTree index page (dashboard).
+
+The index page displays a number of panels (e.g. starred parts, low stock, overdue orders).
+Requesting the data for each panel via the list API endpoints requires a separate request
+(and a full set of serializer annotations) for each panel.
+
+The Dashboard class calculates the data for all panels (which the user has permission to view):
+
+- Each panel is defined by a simple (un-annotated) queryset, which provides the count and top-N rows
+- Parts which appear in multiple panels are annotated and serialized only once
+- Results are cached (per user) for a short, configurable time
+- The cache is invalidated whenever any of the displayed models are changed
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+import time
+
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from InvenTree.status_codes import BuildStatus, PurchaseOrderStatus, SalesOrderStatus
+
+import common.models
+import common.settings
+
+from users.models import check_user_role
+
+from part import models as PartModels
+from part import shortage as part_shortage
+from part import serializers as part_serializers
+from stock import models as StockModels
+from stock import serializers as stock_serializers
+from build import models as BuildModels
+from build import serializers as build_serializers
+from order import models as OrderModels
+from order import serializers as order_serializers
+
+
+logger = logging.getLogger("inventree")
+
+
+# Cache key which stores the current "version" of all cached dashboard data
+DASHBOARD_CACHE_VERSION_KEY = 'dashboard-version'
+
+# Default number of rows returned for each panel
+DASHBOARD_RESULTS = 25
+
+# Changes to any of these models invalidate the cached dashboard data
+DASHBOARD_MODELS = [
+    'part.part',
+    'part.partstar',
+    'part.bomitem',
+    'stock.stockitem',
+    'build.build',
+    'order.purchaseorder',
+    'order.salesorder',
+    'users.ruleset',
+    'auth.group',
+]
+
+# Roles which determine the panels displayed to a user
+DASHBOARD_ROLES = [
+    'part',
+    'stock',
+    'build',
+    'purchase_order',
+    'sales_order',
+]
+
+
+def get_dashboard_cache_version():
+    """
+    Return the current version stamp for cached dashboard data.
+    """
+
+    version = cache.get(DASHBOARD_CACHE_VERSION_KEY)
+
+    if version is None:
+        # Seed with a timestamp, so stale entries are never matched
+        cache.add(DASHBOARD_CACHE_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(DASHBOARD_CACHE_VERSION_KEY)
+
+    return version
+
+
+def invalidate_dashboard_cache():
+    """
+    Invalidate *all* cached dashboard data,
+    by incrementing the dashboard cache version stamp.
+    """
+
+    try:
+        cache.incr(DASHBOARD_CACHE_VERSION_KEY)
+    except ValueError:
+        # Version key does not exist (yet)
+        get_dashboard_cache_version()
+
+
+@receiver(post_save, dispatch_uid='dashboard_invalidate_save')
+@receiver(post_delete, dispatch_uid='dashboard_invalidate_delete')
+def after_dashboard_data_change(sender, instance, **kwargs):
+    """ Receives post_save and post_delete signals for *all* models.
+
+    Any change to a model displayed on the dashboard invalidates the cached dashboard data.
+    """
+
+    if sender._meta.label_lower in DASHBOARD_MODELS:
+        invalidate_dashboard_cache()
+
+
+@receiver(m2m_changed, sender=User.groups.through, dispatch_uid='dashboard_invalidate_user_groups')
+def after_user_groups_change(sender, instance, **kwargs):
+    """ Changes to the group membership of a user change the panels they can view """
+
+    invalidate_dashboard_cache()
+
+
+class Dashboard:
+    """
+    Calculate the dashboard data for a particular user.
+
+    Args:
+        user: The user requesting the dashboard
+        limit: Maximum number of rows returned for each panel
+
+    Returns a dict of panel name -> {'count': <total>, 'results': [<rows>]}
+    """
+
+    def __init__(self, user, limit=DASHBOARD_RESULTS):
+
+        self.user = user
+        self.limit = limit
+
+        # Roles which the user has permission to view
+        self.roles = [role for role in DASHBOARD_ROLES if check_user_role(user, role, 'view')]
+
+    def part_panels(self):
+        """
+        Return the part panels, as a dict of name -> Part queryset
+        """
+
+        parts = PartModels.Part.objects.all()
+
+        recent = common.models.InvenTreeSetting.get_setting('PART_RECENT_COUNT')
+
+        panels = {
+            'starred_parts': parts.filter(starred_users__user=self.user),
+            'latest_parts': parts.order_by('-creation_date')[:recent],
+            'bom_invalid_parts': parts.filter(active=True, assembly=True, bom_valid=False),
+        }
+
+        if 'stock' in self.roles:
+            panels['low_stock_parts'] = parts.exclude(minimum_stock=0).filter(in_stock__lt=F('minimum_stock'))
+            panels['to_build_parts'] = parts.filter(pk__in=part_shortage.get_build_shortages().values('pk'))
+
+        return panels
+
+    def stock_panels(self):
+        """
+        Return the stock panels, as a dict of name -> StockItem queryset
+        """
+
+        items = StockModels.StockItem.objects.all()
+
+        recent = common.models.InvenTreeSetting.get_setting('STOCK_RECENT_COUNT')
+
+        panels = {
+            'recently_updated_stock': items.order_by('-updated')[:recent],
+        }
+
+        if common.settings.stock_expiry_enabled():
+            stale_days = common.models.InvenTreeSetting.get_setting('STOCK_STALE_DAYS')
+            stale_date = datetime.now().date() + timedelta(days=stale_days)
+
+            stale_filter = StockModels.StockItem.IN_STOCK_FILTER & ~Q(expiry_date=None) & Q(expiry_date__lt=stale_date)
+
+            panels['expired_stock'] = items.filter(StockModels.StockItem.EXPIRED_FILTER)
+            panels['stale_stock'] = items.filter(stale_filter).exclude(StockModels.StockItem.EXPIRED_FILTER)
+
+        return panels
+
+    def build_panels(self):
+
+        builds = BuildModels.Build.objects.all()
+
+        return {
+            'build_pending': builds.filter(status__in=BuildStatus.ACTIVE_CODES),
+            'build_overdue': builds.filter(BuildModels.Build.OVERDUE_FILTER),
+        }
+
+    def po_panels(self):
+
+        orders = OrderModels.PurchaseOrder.objects.all()
+
+        return {
+            'po_outstanding': orders.filter(status__in=PurchaseOrderStatus.OPEN),
+            'po_overdue': orders.filter(OrderModels.PurchaseOrder.OVERDUE_FILTER),
+        }
+
+    def so_panels(self):
+
+        orders = OrderModels.SalesOrder.objects.all()
+
+        return {
+            'so_outstanding': orders.filter(status__in=SalesOrderStatus.OPEN),
+            'so_overdue': orders.filter(OrderModels.SalesOrder.OVERDUE_FILTER),
+        }
+
+    def get_rows(self, panels):
+        """
+        Return the count and the top-N primary keys for each panel
+        """
+
+        rows = {}
+
+        for name, queryset in panels.items():
+
+            if queryset.query.is_sliced:
+                # Sliced querysets (e.g. "recent" items) are already limited,
+                # so count the rows *before* applying the row limit
+                pk_list = list(queryset.values_list('pk', flat=True))
+                count = len(pk_list)
+                pk_list = pk_list[:self.limit]
+            else:
+                pk_list = list(queryset.values_list('pk', flat=True)[:self.limit])
+                count = queryset.count()
+
+            rows[name] = (count, pk_list)
+
+        return rows
+
+    def serialize(self, panels, queryset, serializer):
+        """
+        Serialize the rows for a group of panels.
+
+        All objects are loaded (and annotated) in a single query,
+        and each object is serialized only once, even if it appears in multiple panels.
+        """
+
+        rows = self.get_rows(panels)
+
+        pk_list = set()
+
+        for _count, pks in rows.values():
+            pk_list.update(pks)
+
+        data = {}
+
+        if len(pk_list) > 0:
+            for item in serializer(queryset.filter(pk__in=pk_list), many=True).data:
+                data[item['pk']] = item
+
+        return {
+            name: {
+                'count': count,
+                'results': [data[pk] for pk in pks if pk in data],
+            } for name, (count, pks) in rows.items()
+        }
+
+    def get_data(self):
+        """
+        Calculate the data for all panels which the user has permission to view
+        """
+
+        data = {}
+
+        if 'part' in self.roles:
+            queryset = PartModels.Part.objects.all()
+            queryset = part_serializers.PartSerializer.prefetch_queryset(queryset)
+            queryset = part_serializers.PartSerializer.annotate_queryset(queryset)
+
+            starred = [star.part for star in self.user.starred_parts.all().select_related('part')]
+
+            def serializer(*args, **kwargs):
+                return part_serializers.PartSerializer(*args, starred_parts=starred, **kwargs)
+
+            data.update(self.serialize(self.part_panels(), queryset, serializer))
+
+        if 'stock' in self.roles:
+            queryset = StockModels.StockItem.objects.all()
+            queryset = stock_serializers.StockItemSerializer.prefetch_queryset(queryset)
+            queryset = stock_serializers.StockItemSerializer.annotate_queryset(queryset)
+
+            def serializer(*args, **kwargs):
+                return stock_serializers.StockItemSerializer(*args, part_detail=True, location_detail=True, **kwargs)
+
+            data.update(self.serialize(self.stock_panels(), queryset, serializer))
+
+        if 'build' in self.roles:
+            queryset = BuildModels.Build.objects.all().prefetch_related('part')
+            queryset = build_serializers.BuildSerializer.annotate_queryset(queryset)
+
+            def serializer(*args, **kwargs):
+                return build_serializers.BuildSerializer(*args, part_detail=True, **kwargs)
+
+            data.update(self.serialize(self.build_panels(), queryset, serializer))
+
+        if 'purchase_order' in self.roles:
+            queryset = OrderModels.PurchaseOrder.objects.all().prefetch_related('supplier')
+            queryset = order_serializers.POSerializer.annotate_queryset(queryset)
+
+            def serializer(*args, **kwargs):
+                return order_serializers.POSerializer(*args, supplier_detail=True, **kwargs)
+
+            data.update(self.serialize(self.po_panels(), queryset, serializer))
+
+        if 'sales_order' in self.roles:
+            queryset = OrderModels.SalesOrder.objects.all().prefetch_related('customer')
+            queryset = order_serializers.SalesOrderSerializer.annotate_queryset(queryset)
+
+            def serializer(*args, **kwargs):
+                return order_serializers.SalesOrderSerializer(*args, customer_detail=True, **kwargs)
+
+            data.update(self.serialize(self.so_panels(), queryset, serializer))
+
+        return data
+
+
+def get_dashboard(user, limit=DASHBOARD_RESULTS):
+    """
+    Return the (cached) dashboard data for a user.
+
+    The cache timeout is set via the INVENTREE_DASHBOARD_CACHE setting (zero disables caching).
+    """
+
+    timeout = common.models.InvenTreeSetting.get_setting('INVENTREE_DASHBOARD_CACHE')
+
+    dashboard = Dashboard(user, limit=limit)
+
+    if not timeout:
+        return dashboard.get_data()
+
+    # The displayed panels depend on the roles of the user
+    roles = '-'.join(dashboard.roles)
+
+    key = f"dashboard-{get_dashboard_cache_version()}-{user.pk}-{limit}-{roles}"
+
+    data = cache.get(key)
+
+    if data is None:
+        data = dashboard.get_data()
+        cache.set(key, data, timeout)
+
+    return data
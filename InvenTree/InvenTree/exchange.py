@@ -1,6 +1,10 @@
+from decimal import Decimal
+
 from django.conf import settings as inventree_settings
 
 from djmoney.contrib.exchange.backends.base import SimpleExchangeBackend
+from djmoney.contrib.exchange.exceptions import MissingRate
+from djmoney.contrib.exchange.models import Rate, get_default_backend_name
 
 
 class InvenTreeExchange(SimpleExchangeBackend):
@@ -27,3 +31,53 @@ class InvenTreeExchange(SimpleExchangeBackend):
         symbols = ','.join(inventree_settings.CURRENCIES)
 
         super().update_rates(base=base_currency, symbols=symbols)
+
+
+class ExchangeRateTable:
+    """
+    In-memory table of currency exchange rates.
+
+    All exchange rates for the exchange backend are loaded in a single query,
+    so that many prices can be converted without a database (or cache) lookup per conversion.
+
+    Conversion matches djmoney.contrib.exchange.models.convert_money,
+    with all rates stored relative to the base currency of the exchange backend.
+    """
+
+    def __init__(self, backend=None):
+
+        if backend is None:
+            backend = get_default_backend_name()
+
+        self.rates = {}
+
+        for currency, value, base_currency in Rate.objects.filter(backend=backend).values_list('currency', 'value', 'backend__base_currency'):
+            self.rates[currency] = value
+            self.rates[base_currency] = Decimal(1)
+
+    def get_rate(self, source, target):
+        """
+        Return the exchange rate from the source currency to the target currency.
+
+        Raises MissingRate if the rate is not available.
+        """
+
+        source = str(source)
+        target = str(target)
+
+        if source == target:
+            return Decimal(1)
+
+        if source not in self.rates or target not in self.rates:
+            raise MissingRate(f"Rate {source} -> {target} does not exist")
+
+        return self.rates[target] / self.rates[source]
+
+    def convert(self, amount, source, target):
+        """
+        Convert an amount from the source currency to the target currency.
+
+        Raises MissingRate if the rate is not available.
+        """
+
+        return amount * self.get_rate(source, target)
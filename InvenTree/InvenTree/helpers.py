@@ -4,6 +4,7 @@ Provides helper functions used throughout the InvenTree project
 
 import io
 import re
+import functools
 import json
 import os.path
 from PIL import Image
@@ -459,31 +460,48 @@ def extract_serial_numbers(serials, expected_quantity):
     return numbers
 
 
-def validateFilterString(value, model=None):
+def serial_number_to_int(serial):
+    """ Return the integer representation of a serial number.
+
+    Used to sort serial numbers numerically (in the database).
+
+    Returns:
+        The integer value of the serial number,
+        or None if the serial number is not an integer (or is out of range)
     """
-    Validate that a provided filter string looks like a list of comma-separated key=value pairs
 
-    These should nominally match to a valid database filter based on the model being filtered.
+    if serial is None:
+        return None
 
-    e.g. "category=6, IPN=12"
-    e.g. "part__name=widget"
+    try:
+        value = int(str(serial).strip())
+    except ValueError:
+        return None
 
-    The ReportTemplate class uses the filter string to work out which items a given report applies to.
-    For example, an acceptance test report template might only apply to stock items with a given IPN,
-    so the string could be set to:
+    # Value must fit into a 64-bit integer field
+    if abs(value) >= 2 ** 63:
+        return None
 
-    filters = "IPN = ACME0001"
+    return value
 
-    Returns a map of key:value pairs
+
+@functools.lru_cache(maxsize=1024)
+def parseFilterString(value):
     """
+    Parse a filter string into a tuple of (key, value) pairs.
 
-    # Empty results map
-    results = {}
+    Filter strings are parsed many times over (e.g. once per template,
+    for every request which lists available templates), so the results are cached.
 
-    value = str(value).strip()
+    Raises a ValidationError if the filter string is invalid
+    """
+
+    results = []
+
+    value = value.strip()
 
     if not value or len(value) == 0:
-        return results
+        return tuple(results)
 
     groups = value.split(',')
 
@@ -507,7 +525,30 @@ def validateFilterString(value, model=None):
                 "Invalid group: {g}".format(g=group)
             )
 
-        results[k] = v
+        results.append((k, v))
+
+    return tuple(results)
+
+
+def validateFilterString(value, model=None):
+    """
+    Validate that a provided filter string looks like a list of comma-separated key=value pairs
+
+    These should nominally match to a valid database filter based on the model being filtered.
+
+    e.g. "category=6, IPN=12"
+    e.g. "part__name=widget"
+
+    The ReportTemplate class uses the filter string to work out which items a given report applies to.
+    For example, an acceptance test report template might only apply to stock items with a given IPN,
+    so the string could be set to:
+
+    filters = "IPN = ACME0001"
+
+    Returns a map of key:value pairs
+    """
+
+    results = dict(parseFilterString(str(value)))
 
     # If a model is provided, verify that the provided filters can be used against it
     if model is not None:
@@ -521,6 +562,52 @@ def validateFilterString(value, model=None):
     return results
 
 
+def getMatchingTemplates(templates, model, items):
+    """
+    Determine which templates (e.g. labels or reports) match *all* of the provided items.
+
+    Each template provides a 'filters' string, which is evaluated against
+    the entire set of items with a single query (per template).
+
+    Args:
+        templates: Iterable of template objects (each with a 'filters' attribute)
+        model: Model class of the provided items
+        items: Iterable of model instances (or primary keys)
+
+    Returns a set of primary keys for the matching templates
+    """
+
+    pks = set()
+
+    for item in items:
+        pks.add(item if type(item) is int else item.pk)
+
+    matches = set()
+
+    for template in templates:
+
+        try:
+            filters = validateFilterString(template.filters)
+        except ValidationError:
+            # Filters are ill-defined
+            continue
+
+        if len(filters) == 0:
+            # No filters - template matches all items
+            matches.add(template.pk)
+            continue
+
+        try:
+            matched = set(model.objects.filter(pk__in=pks).filter(**filters).values_list('pk', flat=True))
+        except (FieldError, ValidationError, ValueError):
+            continue
+
+        if matched == pks:
+            matches.add(template.pk)
+
+    return matches
+
+
 def addUserPermission(user, permission):
     """
     Shortcut function for adding a certain permission to a user.
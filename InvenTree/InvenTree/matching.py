@@ -0,0 +1,339 @@
+"""
+Matching of label and report templates against model instances.
+
+Each label / report template provides a "filters" string, which determines
+which objects the template applies to (e.g. "part__IPN=ACME0001").
+Determining the templates available for an object (e.g. when rendering a stock item detail page)
+previously ran a separate "exists" query for every enabled template.
+
+The TemplateIndex class instead:
+
+- Parses and compiles the filters for all enabled templates once (per template-set version)
+- Evaluates simple filters (exact matches against fields of the object itself) in memory
+- Evaluates all remaining filters with a single query (one subquery per template)
+
+The compiled templates are reloaded when the templates are changed (in this process),
+and after a short time (to pick up changes made by other server processes).
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from InvenTree.helpers import validateFilterString
+
+
+logger = logging.getLogger("inventree")
+
+
+# Cache key which stores the current "version" of all label and report templates
+TEMPLATE_CACHE_VERSION_KEY = 'template-version'
+
+# Maximum time (seconds) for which compiled templates are used before being reloaded.
+# The version stamp is stored in the (process local) cache,
+# so changes made by other server processes are only picked up after this time
+TEMPLATE_INDEX_MAX_AGE = 10
+
+# Changes to any model in these apps invalidate the compiled templates
+TEMPLATE_APPS = [
+    'label',
+    'report',
+]
+
+# Lookups which can be evaluated in memory
+MEMORY_LOOKUPS = {
+    'exact': lambda value, target: value == target,
+    'iexact': lambda value, target: value is not None and str(value).lower() == str(target).lower(),
+}
+
+
+def get_template_cache_version():
+    """
+    Return the current version stamp for label and report templates.
+    """
+
+    version = cache.get(TEMPLATE_CACHE_VERSION_KEY)
+
+    if version is None:
+        # Seed with a timestamp, so stale entries are never matched
+        cache.add(TEMPLATE_CACHE_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(TEMPLATE_CACHE_VERSION_KEY)
+
+    return version
+
+
+def invalidate_template_cache():
+    """
+    Invalidate *all* compiled templates,
+    by incrementing the template cache version stamp.
+    """
+
+    try:
+        cache.incr(TEMPLATE_CACHE_VERSION_KEY)
+    except ValueError:
+        # Version key does not exist (yet)
+        get_template_cache_version()
+
+
+@receiver(post_save, dispatch_uid='template_match_invalidate_save')
+@receiver(post_delete, dispatch_uid='template_match_invalidate_delete')
+def after_template_data_change(sender, instance, **kwargs):
+    """ Receives post_save and post_delete signals for *all* models.
+
+    Any change to a label or report template invalidates all compiled templates
+    """
+
+    if sender._meta.app_label in TEMPLATE_APPS:
+        invalidate_template_cache()
+
+
+class CompiledFilter:
+    """
+    Compiled form of a template filter string, for a particular model.
+
+    Filters which compare a (loaded) field of the object itself
+    are evaluated in memory. Any other filters are evaluated by the database.
+
+    Args:
+        model: Model class the filters apply to
+        filters: Filter string (e.g. "part=1, serial=100")
+
+    Raises a ValidationError (or FieldError) if the filters are not valid for the model.
+    """
+
+    def __init__(self, model, filters):
+
+        self.filters = validateFilterString(filters)
+
+        # Ensure that the filters are valid for the model
+        # (invalid fields or values raise an error when the query is constructed)
+        try:
+            model.objects.filter(**self.filters)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        # List of (attname, lookup, value) conditions which can be evaluated in memory
+        self.conditions = []
+
+        # True if (some of) the filters must be evaluated by the database
+        self.query = False
+
+        for key, value in self.filters.items():
+            condition = self.compile(model, key, value)
+
+            if condition is None:
+                self.query = True
+            else:
+                self.conditions.append(condition)
+
+    @staticmethod
+    def compile(model, key, value):
+        """
+        Compile a single filter into an in-memory condition.
+
+        Returns None if the filter cannot be evaluated in memory
+        """
+
+        path = key.split('__')
+
+        lookup = 'exact'
+
+        if len(path) > 1 and path[-1] in MEMORY_LOOKUPS:
+            lookup = path.pop()
+
+        try:
+            field = model._meta.get_field(path[0])
+        except FieldDoesNotExist:
+            return None
+
+        if not field.concrete or field.many_to_many:
+            return None
+
+        if len(path) == 2 and field.is_relation and path[1] in ['pk', 'id', field.target_field.name]:
+            # Filter against the primary key of a related object (e.g. "part__pk=1")
+            path.pop()
+
+        if len(path) > 1:
+            return None
+
+        if field.is_relation:
+            if lookup != 'exact':
+                return None
+
+            target = field.target_field
+        else:
+            target = field
+
+        try:
+            value = target.to_python(value)
+        except ValidationError:
+            return None
+
+        return (field.attname, lookup, value)
+
+    def evaluate(self, instance):
+        """
+        Evaluate the in-memory conditions against a model instance.
+
+        Returns:
+            - False if any condition does not match
+            - True if all conditions match (and no database query is required)
+            - None if the database must be queried
+        """
+
+        query = self.query
+
+        for attname, lookup, value in self.conditions:
+
+            if attname not in instance.__dict__:
+                # Field has not been loaded
+                query = True
+                continue
+
+            if not MEMORY_LOOKUPS[lookup](getattr(instance, attname), value):
+                return False
+
+        return None if query else True
+
+
+class TemplateIndex:
+    """
+    Index of the enabled templates of a particular type (e.g. StockItemLabel),
+    for matching against a particular model (e.g. StockItem).
+
+    The compiled templates are rebuilt whenever the template-set version changes,
+    or when they are older than TEMPLATE_INDEX_MAX_AGE.
+
+    Usage:
+        index = TemplateIndex(StockItemLabel, StockItem)
+        labels = index.match(item)
+    """
+
+    def __init__(self, template_model, model):
+
+        self.template_model = template_model
+        self.model = model
+
+        self.lock = threading.Lock()
+
+        self.version = None
+        self.loaded = None
+
+        # List of (template, compiled filter)
+        self.templates = []
+
+    def load(self, version):
+
+        templates = []
+
+        for template in self.template_model.objects.filter(enabled=True).order_by('pk'):
+            try:
+                templates.append((template, CompiledFilter(self.model, template.filters)))
+            except (ValidationError, FieldError):
+                # Filters are ill-defined
+                continue
+
+        self.templates = templates
+        self.version = version
+        self.loaded = time.monotonic()
+
+    def get_templates(self):
+        """ Return the compiled templates (reloading if the templates have changed) """
+
+        version = get_template_cache_version()
+
+        with self.lock:
+            if self.version != version or self.loaded is None or time.monotonic() - self.loaded > TEMPLATE_INDEX_MAX_AGE:
+                self.load(version)
+
+            return self.templates
+
+    def query(self, instance, templates):
+        """
+        Evaluate the filters for the provided templates against the database,
+        using a single query.
+
+        Returns a dict of template pk -> True / False
+        """
+
+        annotations = {}
+
+        for template, compiled in templates:
+            annotations[f'template_{template.pk}'] = Exists(
+                self.model.objects.filter(pk=OuterRef('pk'), **compiled.filters)
+            )
+
+        row = self.model.objects.filter(pk=instance.pk).annotate(**annotations).values(*annotations.keys()).first()
+
+        if row is None:
+            return {template.pk: False for template, _compiled in templates}
+
+        return {template.pk: bool(row[f'template_{template.pk}']) for template, _compiled in templates}
+
+    def match(self, instance):
+        """
+        Return a list of the enabled templates which match the provided instance
+        """
+
+        templates = self.get_templates()
+
+        matches = {}
+
+        # Templates which must be evaluated by the database
+        pending = []
+
+        for template, compiled in templates:
+            result = compiled.evaluate(instance)
+
+            if result is None:
+                pending.append((template, compiled))
+            else:
+                matches[template.pk] = result
+
+        if len(pending) > 0:
+            results = self.query(instance, pending)
+
+            for template, _compiled in pending:
+                matches[template.pk] = results.get(template.pk, False)
+
+        return [template for template, _compiled in templates if matches.get(template.pk, False)]
+
+
+# Template indexes, keyed by (template model label, model label)
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_template_index(template_model, model):
+    """
+    Return the (shared) TemplateIndex for a template model and a model
+    """
+
+    key = (template_model._meta.label_lower, model._meta.label_lower)
+
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = TemplateIndex(template_model, model)
+
+        return _indexes[key]
+
+
+def get_matching_templates(template_model, instance):
+    """
+    Return a list of the enabled templates (of the given type) which match a model instance.
+
+    Args:
+        template_model: Template model class (e.g. StockItemLabel)
+        instance: Model instance (e.g. a StockItem)
+    """
+
+    return get_template_index(template_model, instance.__class__).match(instance)
@@ -224,6 +224,15 @@ MEDIA_ROOT = os.path.abspath(
     )
 )
 
+# The filesystem location for rendered report files
+# (these are *not* served as media files, only via the report download API)
+REPORT_OUTPUT_ROOT = os.path.abspath(
+    get_setting(
+        'INVENTREE_REPORT_OUTPUT_ROOT',
+        CONFIG.get('report_output_root', os.path.join(os.path.dirname(MEDIA_ROOT), 'report_output'))
+    )
+)
+
 if DEBUG:
     logger.info("InvenTree running in DEBUG mode")
 
@@ -170,6 +170,7 @@ def update_exchange_rates():
         from InvenTree.exchange import InvenTreeExchange
         from djmoney.contrib.exchange.models import ExchangeBackend, Rate
         from django.conf import settings
+        from part.pricing import invalidate_pricing_cache
     except AppRegistryNotReady:
         # Apps not yet loaded!
         return
@@ -199,6 +200,51 @@ def update_exchange_rates():
     # Remove any exchange rates which are not in the provided currencies
     Rate.objects.filter(backend="InvenTreeExchange").exclude(currency__in=settings.CURRENCIES).delete()
 
+    # Cached part pricing depends on the exchange rates
+    invalidate_pricing_cache()
+
+
+def render_report_job(job_id):
+    """
+    Render a report job (in the background worker)
+    """
+
+    try:
+        from report.models import ReportJob
+    except AppRegistryNotReady:
+        logger.warning("Could not render report - App registry not ready")
+        return
+
+    try:
+        job = ReportJob.objects.get(pk=job_id)
+    except ReportJob.DoesNotExist:
+        logger.warning(f"Report job <{job_id}> does not exist")
+        return
+
+    job.run()
+
+
+def delete_old_report_jobs():
+    """
+    Delete report jobs (and the rendered output files)
+    which are more than a day old.
+    """
+
+    try:
+        from report.models import ReportJob
+    except AppRegistryNotReady:
+        logger.warning("Could not perform 'delete_old_report_jobs' - App registry not ready")
+        return
+
+    threshold = datetime.now() - timedelta(days=1)
+
+    # Output files are removed by django-cleanup
+    jobs = ReportJob.objects.filter(
+        created__lte=threshold
+    )
+
+    jobs.delete()
+
 
 def send_email(subject, body, recipients, from_email=None):
     """
@@ -5,8 +5,12 @@ from rest_framework import status
 from django.urls import reverse
 
 from InvenTree.api_tester import InvenTreeAPITestCase
+from InvenTree.dashboard import invalidate_dashboard_cache
 
 from users.models import RuleSet
+from common.models import InvenTreeSetting
+from part.models import Part
+from stock.models import StockItem
 
 from base64 import b64encode
 
@@ -157,3 +161,91 @@ class APITests(InvenTreeAPITestCase):
         # New role permissions should have been added now
         self.assertIn('delete', roles['part'])
         self.assertIn('change', roles['build'])
+
+
+class DashboardTest(InvenTreeAPITestCase):
+    """ Tests for the aggregated dashboard API endpoint """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'stock',
+    ]
+
+    roles = [
+        'part.view',
+        'stock.view',
+    ]
+
+    def setUp(self):
+
+        super().setUp()
+
+        # Ensure cached dashboard data does not leak between tests
+        invalidate_dashboard_cache()
+
+    def test_panels(self):
+
+        url = reverse('api-dashboard')
+
+        # Revoke permission to view anything other than parts and stock
+        # (new rulesets are created with "view" permission by default)
+        self.group.rule_sets.exclude(name__in=['part', 'stock']).update(can_view=False)
+
+        response = self.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.data
+
+        # Only panels which the user has permission to view are returned
+        for panel in ['starred_parts', 'latest_parts', 'bom_invalid_parts', 'low_stock_parts', 'recently_updated_stock']:
+            self.assertIn(panel, data)
+
+        for panel in ['build_pending', 'po_outstanding', 'so_overdue']:
+            self.assertNotIn(panel, data)
+
+        self.assertEqual(data['starred_parts']['count'], 0)
+
+        # Number of returned rows is limited
+        response = self.get(url, {'limit': 2})
+
+        self.assertEqual(len(response.data['latest_parts']['results']), 2)
+        self.assertEqual(len(response.data['recently_updated_stock']['results']), 2)
+
+        # Counts for the "recent" panels are not affected by the row limit
+        recent_parts = min(InvenTreeSetting.get_setting('PART_RECENT_COUNT'), Part.objects.count())
+        recent_stock = min(InvenTreeSetting.get_setting('STOCK_RECENT_COUNT'), StockItem.objects.count())
+
+        for limit in [0, 2]:
+            response = self.get(url, {'limit': limit})
+
+            self.assertEqual(response.data['latest_parts']['count'], recent_parts)
+            self.assertEqual(response.data['recently_updated_stock']['count'], recent_stock)
+
+    def test_role_change(self):
+
+        url = reverse('api-dashboard')
+
+        self.assertIn('build_pending', self.get(url).data)
+
+        # Removing a role removes the corresponding panels
+        self.group.rule_sets.filter(name='build').update(can_view=False)
+
+        self.assertNotIn('build_pending', self.get(url).data)
+
+    def test_cache_invalidation(self):
+
+        url = reverse('api-dashboard')
+
+        self.assertEqual(self.get(url).data['starred_parts']['count'], 0)
+
+        part = Part.objects.get(pk=1)
+        part.setStarred(self.user, True)
+
+        data = self.get(url).data['starred_parts']
+
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['pk'], 1)
+        self.assertTrue(data['results'][0]['starred'])
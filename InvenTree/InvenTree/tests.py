@@ -1,7 +1,9 @@
 
 import json
+import os
+import tempfile
 
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
 import django.core.exceptions as django_exceptions
 from django.core.exceptions import ValidationError
 
@@ -14,6 +16,7 @@ from djmoney.contrib.exchange.exceptions import MissingRate
 from .validators import validate_overage, validate_part_name
 from . import helpers
 from . import version
+from .views import serve_media
 
 from mptt.exceptions import InvalidMove
 
@@ -185,6 +188,46 @@ class TestDownloadFile(TestCase):
         helpers.DownloadFile(bytes("hello world".encode("utf8")), "out.bin")
 
 
+class TestServeMedia(TestCase):
+    """ Tests for serving media files with ETag / Cache-Control headers """
+
+    def test_etag(self):
+
+        with tempfile.TemporaryDirectory() as media:
+
+            for name in ['motor.png', 'motor.thumbnail.png']:
+                with open(os.path.join(media, name), 'wb') as f:
+                    f.write(b'image data')
+
+            factory = RequestFactory()
+
+            response = serve_media(factory.get('/media/motor.thumbnail.png'), 'motor.thumbnail.png', document_root=media)
+
+            self.assertEqual(response.status_code, 200)
+
+            etag = response['ETag']
+
+            self.assertTrue(etag.startswith('"'))
+            self.assertIn('max-age', response['Cache-Control'])
+
+            # Unchanged file is revalidated
+            response = serve_media(
+                factory.get('/media/motor.thumbnail.png', HTTP_IF_NONE_MATCH=etag),
+                'motor.thumbnail.png',
+                document_root=media
+            )
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+            # Full-size images are not cached by the browser
+            response = serve_media(factory.get('/media/motor.png'), 'motor.png', document_root=media)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertFalse(response.has_header('Cache-Control'))
+
+
 class TestMPTT(TestCase):
     """ Tests for the MPTT tree models """
 
@@ -287,6 +330,19 @@ class TestSerialNumberExtraction(TestCase):
         with self.assertRaises(ValidationError):
             e("10, a, 7-70j", 4)
 
+    def test_serial_to_int(self):
+
+        f = helpers.serial_number_to_int
+
+        self.assertEqual(f(22), 22)
+        self.assertEqual(f('0123'), 123)
+        self.assertEqual(f(' 7 '), 7)
+
+        self.assertIsNone(f(None))
+        self.assertIsNone(f('A123'))
+        self.assertIsNone(f('1-2'))
+        self.assertIsNone(f('9' * 30))
+
 
 class TestVersionNumber(TestCase):
     """
@@ -0,0 +1,154 @@
+"""
+Cached construction of category / location trees.
+
+The part category tree and stock location tree (displayed in the sidebar)
+were previously constructed node by node, requiring multiple queries for each node
+(checking for children, loading children, and counting the items under the node).
+
+The build_tree function constructs the entire tree using two queries:
+
+- All nodes are loaded in a single query
+- The number of items directly under each node is calculated with a single grouped count
+- Cascaded item counts are calculated bottom-up, in memory
+
+The serialized tree is cached, keyed on a per-tree version stamp,
+which is incremented whenever a node (or an item within the tree) is changed,
+and expires after a short time (to pick up changes made by other server processes).
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+
+# Time (seconds) for which a serialized tree is cached.
+# The version stamp is stored in the (process local) cache,
+# so changes made by other server processes are only picked up after this time
+TREE_CACHE_TIMEOUT = 30
+
+# Changes to these models invalidate the cached tree (model label -> tree label)
+TREE_MODELS = {
+    'part.partcategory': 'part.partcategory',
+    'part.part': 'part.partcategory',
+    'stock.stocklocation': 'stock.stocklocation',
+    'stock.stockitem': 'stock.stocklocation',
+}
+
+
+def tree_cache_version_key(tree):
+    return f"tree-version-{tree}"
+
+
+def get_tree_cache_version(tree):
+    """
+    Return the current version stamp for a cached tree (e.g. 'part.partcategory')
+    """
+
+    key = tree_cache_version_key(tree)
+
+    version = cache.get(key)
+
+    if version is None:
+        # Seed with a timestamp, so stale entries are never matched
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+
+    return version
+
+
+def invalidate_tree_cache(tree):
+    """
+    Invalidate the cached data for a tree,
+    by incrementing the tree cache version stamp.
+    """
+
+    try:
+        cache.incr(tree_cache_version_key(tree))
+    except ValueError:
+        # Version key does not exist (yet)
+        get_tree_cache_version(tree)
+
+
+@receiver(post_save, dispatch_uid='tree_invalidate_save')
+@receiver(post_delete, dispatch_uid='tree_invalidate_delete')
+def after_tree_data_change(sender, instance, **kwargs):
+    """ Receives post_save and post_delete signals for *all* models.
+
+    Any change to a tree node (or to an item within a tree) invalidates the cached tree.
+    """
+
+    tree = TREE_MODELS.get(sender._meta.label_lower, None)
+
+    if tree is not None:
+        invalidate_tree_cache(tree)
+
+
+def get_item_counts(items, field):
+    """
+    Return a dict of node pk -> number of items directly under that node.
+
+    Args:
+        items: Item queryset (e.g. Part.objects.all())
+        field: Name of the item field which references the tree node (e.g. 'category')
+    """
+
+    counts = items.exclude(**{field: None}).order_by().values(field).annotate(count=Count('pk'))
+
+    return {row[field]: row['count'] for row in counts}
+
+
+def build_tree(nodes, counts):
+    """
+    Construct a tree (compatible with bootstrap-treeview) from a list of nodes.
+
+    Args:
+        nodes: Iterable of tree nodes (each node must provide pk, parent_id, name and get_absolute_url)
+        counts: Dict of node pk -> number of items directly under that node
+
+    Returns:
+        (list of top-level nodes, total number of items under the top-level nodes)
+
+    Top-level nodes are returned in the order provided, and child nodes are sorted by name.
+    Each node is tagged with the number of items under that node (including child nodes).
+    """
+
+    nodes = list(nodes)
+
+    children = {}
+
+    for node in nodes:
+        children.setdefault(node.parent_id, []).append(node)
+
+    def serialize(node):
+
+        data = {
+            'pk': node.pk,
+            'text': node.name,
+            'href': node.get_absolute_url(),
+        }
+
+        count = counts.get(node.pk, 0)
+
+        child_nodes = children.get(node.pk, [])
+
+        if len(child_nodes) > 0:
+            data['nodes'] = []
+
+            for child in sorted(child_nodes, key=lambda item: item.name):
+                child_data = serialize(child)
+                count += child_data['tags'][0]
+                data['nodes'].append(child_data)
+
+        data['tags'] = [count]
+
+        return data
+
+    top_nodes = [serialize(node) for node in children.get(None, [])]
+
+    return top_nodes, sum([node['tags'][0] for node in top_nodes])
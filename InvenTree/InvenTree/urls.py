@@ -4,6 +4,7 @@ Top-level URL lookup for InvenTree application.
 Passes URL lookup downstream to each app as required.
 """
 
+import re
 
 from django.conf.urls import url, include
 from django.urls import path
@@ -22,7 +23,7 @@ from build.urls import build_urls
 from order.urls import order_urls
 
 from barcodes.api import barcode_api_urls
-from common.api import common_api_urls
+from common.api import common_api_urls, search_api_urls
 from part.api import part_api_urls, bom_api_urls
 from company.api import company_api_urls
 from stock.api import stock_api_urls
@@ -37,7 +38,7 @@ from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
 from rest_framework.documentation import include_docs_urls
 
-from .views import auth_request
+from .views import auth_request, serve_media
 from .views import IndexView, SearchView, DatabaseStatsView
 from .views import SettingsView, EditUserView, SetPasswordView
 from .views import CurrencySettingsView, CurrencyRefreshView
@@ -47,7 +48,7 @@ from .views import DynamicJsView
 from common.views import SettingEdit
 
 from .api import InfoView, NotFoundView
-from .api import ActionPluginView
+from .api import ActionPluginView, DashboardView
 
 from users.urls import user_urls
 
@@ -71,6 +72,12 @@ apipatterns = [
     # Plugin endpoints
     url(r'^action/', ActionPluginView.as_view(), name='api-action-plugin'),
 
+    # Full-text search
+    url(r'^search/', include(search_api_urls)),
+
+    # Aggregated dashboard data
+    url(r'^dashboard/', DashboardView.as_view(), name='api-dashboard'),
+
     # InvenTree information endpoint
     url(r'^$', InfoView.as_view(), name='api-inventree-info'),
 
@@ -169,8 +176,10 @@ if settings.DEBUG:
     # Static file access
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
-    # Media file access
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Media file access (with ETag / Cache-Control headers)
+    urlpatterns += [
+        url(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, {'document_root': settings.MEDIA_ROOT}),
+    ]
 
     # Debug toolbar access (only allowed in DEBUG mode)
     if 'debug_toolbar' in settings.INSTALLED_APPS:
@@ -8,11 +8,21 @@ as JSON objects and passing them to modal forms (using jQuery / bootstrap).
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import hashlib
+import os
+import posixpath
+
 from django.utils.translation import gettext_lazy as _
 from django.template.loader import render_to_string
 from django.http import HttpResponse, JsonResponse, HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.static import serve
 
 from django.contrib.auth.mixins import PermissionRequiredMixin
 
@@ -23,6 +33,7 @@ from django.views.generic.base import RedirectView, TemplateView
 from djmoney.contrib.exchange.models import ExchangeBackend, Rate
 
 from part.models import Part, PartCategory
+import part.thumbnails as part_thumbnails
 from stock.models import StockLocation, StockItem
 from common.models import InvenTreeSetting, ColorTheme
 from users.models import check_user_role, RuleSet
@@ -32,6 +43,7 @@ import InvenTree.tasks
 from .forms import DeleteForm, EditUserForm, SetPasswordForm
 from .forms import ColorThemeSelectForm, SettingCategorySelectForm
 from .helpers import str2bool
+from .tree import build_tree, get_tree_cache_version, TREE_CACHE_TIMEOUT
 
 from rest_framework import views
 
@@ -49,6 +61,36 @@ def auth_request(request):
         return HttpResponse(status=403)
 
 
+def serve_media(request, path, document_root=None):
+    """
+    Serve a media file (only used in DEBUG mode, otherwise media files are served by the web server).
+
+    Each response carries a strong ETag (derived from the file path, size and modification time),
+    so an unchanged file is revalidated with a "304 Not Modified" response.
+    Image variations (e.g. part thumbnails) may additionally be cached by the browser.
+    """
+
+    try:
+        stat = os.stat(safe_join(document_root, posixpath.normpath(path).lstrip('/')))
+    except (OSError, SuspiciousFileOperation):
+        # Let the static file view handle the error
+        return serve(request, path, document_root=document_root)
+
+    etag = quote_etag(hashlib.md5(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+
+    if response is None:
+        response = serve(request, path, document_root=document_root)
+
+    response['ETag'] = etag
+
+    if part_thumbnails.is_variation(path):
+        patch_cache_control(response, private=True, max_age=part_thumbnails.VARIATION_CACHE_MAX_AGE)
+
+    return response
+
+
 class TreeSerializer(views.APIView):
     """ JSON View for serializing a Tree object.
 
@@ -66,46 +108,33 @@ class TreeSerializer(views.APIView):
 
         return '#'
 
-    def itemToJson(self, item):
-
-        data = {
-            'pk': item.id,
-            'text': item.name,
-            'href': item.get_absolute_url(),
-            'tags': [item.item_count],
-        }
-
-        if item.has_children:
-            nodes = []
-
-            for child in item.children.all().order_by('name'):
-                nodes.append(self.itemToJson(child))
+    def get_items(self):
+        """ Return all nodes in the tree """
 
-            data['nodes'] = nodes
+        return self.model.objects.all()
 
-        return data
+    def get_item_counts(self):
+        """ Return a dict of node pk -> number of items directly under that node.
 
-    def get_items(self):
+        Default implementation returns an empty dict (no items)
+        """
 
-        return self.model.objects.all()
+        return {}
 
     def generate_tree(self):
+        """ Construct the tree (or load it from the cache) """
 
-        nodes = []
-
-        items = self.get_items()
+        tree = self.model._meta.label_lower
 
-        # Construct the top-level items
-        top_items = [i for i in items if i.parent is None]
+        key = f"tree-{tree}-{get_tree_cache_version(tree)}"
 
-        top_count = 0
+        data = cache.get(key)
 
-        # Construct the top-level items
-        top_items = [i for i in items if i.parent is None]
+        if data is None:
+            data = build_tree(self.get_items(), self.get_item_counts())
+            cache.set(key, data, TREE_CACHE_TIMEOUT)
 
-        for item in top_items:
-            nodes.append(self.itemToJson(item))
-            top_count += item.item_count
+        nodes, top_count = data
 
         self.tree = {
             'pk': None,
@@ -0,0 +1,351 @@
+"""
+Automatic allocation of stock items to a Build Order.
+
+The AutoAllocator loads all of the data required to allocate stock
+against every (untracked) BOM line for a build in a fixed number of queries:
+
+- BOM lines for the assembly
+- Existing allocations against the build
+- Candidate stock items for *all* BOM lines (annotated with existing allocations)
+
+Stock is then allocated to each BOM line according to the selected strategy,
+and the resulting BuildItem objects are validated against the current stock
+levels and created with a single bulk insert.
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.translation import ugettext_lazy as _
+
+from sql_util.utils import SubquerySum
+
+import common.models
+
+from part import models as PartModels
+from stock import models as StockModels
+from build import models as BuildModels
+
+
+class AutoAllocator:
+    """
+    Allocate available stock to the untracked BOM lines for a Build.
+
+    Args:
+        build: Build object
+        strategy: Allocation strategy (default = FIFO)
+
+    Strategies:
+        FIFO: Allocate from the oldest stock items first
+        EXPIRY: Allocate from the stock items which expire first (FEFO)
+        LOCATION: Allocate from the stock items closest to the source location
+        FEWEST: Allocate from the largest stock items first, to use the fewest items
+    """
+
+    FIFO = 'fifo'
+    EXPIRY = 'expiry'
+    LOCATION = 'location'
+    FEWEST = 'fewest'
+
+    STRATEGIES = [
+        (FIFO, _('Oldest stock first')),
+        (EXPIRY, _('Earliest expiry date first')),
+        (LOCATION, _('Closest location first')),
+        (FEWEST, _('Fewest stock items')),
+    ]
+
+    def __init__(self, build, strategy=FIFO):
+
+        if strategy not in [s[0] for s in self.STRATEGIES]:
+            raise ValueError(f"Invalid allocation strategy '{strategy}'")
+
+        self.build = build
+        self.strategy = strategy
+
+    def get_bom_lines(self):
+        """
+        Return the BOM lines (and the parts which can be allocated against each line)
+
+        Returns a list of (bom_item, [part pk, ...]) tuples.
+        Trackable parts are not allocated automatically.
+        """
+
+        bom_items = list(self.build.untracked_bom_items.select_related('sub_part'))
+
+        # Load all variant parts (if required) in a single query
+        trees = set([item.sub_part.tree_id for item in bom_items if item.allow_variants])
+
+        variants = PartModels.Part.objects.filter(tree_id__in=trees).values_list('pk', 'tree_id', 'lft', 'rght')
+
+        lines = []
+
+        for item in bom_items:
+            parts = [item.sub_part.pk]
+
+            if item.allow_variants:
+                sub_part = item.sub_part
+
+                for pk, tree_id, lft, rght in variants:
+                    if tree_id == sub_part.tree_id and lft > sub_part.lft and rght < sub_part.rght:
+                        parts.append(pk)
+
+            lines.append((item, parts))
+
+        return lines
+
+    def get_allocated(self):
+        """
+        Return the quantities already allocated (untracked) to this build
+
+        Returns:
+            (lines, parts) where:
+            - lines is a dict of BOM item pk -> quantity allocated against that BOM line
+            - parts is a dict of part pk -> quantity allocated without a BOM line
+        """
+
+        allocations = BuildModels.BuildItem.objects.filter(
+            build=self.build,
+            install_into=None,
+        ).values('bom_item', 'stock_item__part').annotate(total=Sum('quantity'))
+
+        lines = {}
+        parts = {}
+
+        for row in allocations:
+            if row['bom_item'] is None:
+                pk = row['stock_item__part']
+                parts[pk] = parts.get(pk, 0) + row['total']
+            else:
+                pk = row['bom_item']
+                lines[pk] = lines.get(pk, 0) + row['total']
+
+        return lines, parts
+
+    def get_stock_items(self, part_ids):
+        """
+        Return all stock items which could be allocated against the provided parts.
+
+        Each item is annotated with the quantity already allocated to builds and sales orders.
+        """
+
+        items = StockModels.StockItem.objects.filter(
+            StockModels.StockItem.IN_STOCK_FILTER,
+            part__in=part_ids,
+        )
+
+        # Exclude any items which have already been allocated to this build
+        allocated = BuildModels.BuildItem.objects.filter(
+            build=self.build,
+            install_into=None,
+        )
+
+        items = items.exclude(pk__in=allocated.values('stock_item'))
+
+        # Limit query to stock items which are "downstream" of the source location
+        take_from = self.build.take_from
+
+        if take_from is not None:
+            items = items.filter(
+                location__tree_id=take_from.tree_id,
+                location__lft__gte=take_from.lft,
+                location__rght__lte=take_from.rght,
+            )
+
+        # Exclude expired stock items
+        if not common.models.InvenTreeSetting.get_setting('STOCK_ALLOW_EXPIRED_BUILD'):
+            items = items.exclude(StockModels.StockItem.EXPIRED_FILTER)
+
+        items = items.annotate(
+            build_allocated=SubquerySum('allocations__quantity'),
+            sales_allocated=SubquerySum('sales_order_allocations__quantity'),
+        )
+
+        return items.select_related('part', 'location')
+
+    def sort_key(self, item):
+        """
+        Return the sort key for a stock item, for the selected allocation strategy
+        """
+
+        if self.strategy == self.EXPIRY:
+            # Items without an expiry date are allocated last
+            return (item.expiry_date is None, item.expiry_date, item.pk)
+
+        elif self.strategy == self.LOCATION:
+            location = item.location
+            source = self.build.take_from
+
+            if location is None:
+                return (True, 0, item.pk)
+
+            if source is None:
+                return (False, location.level, item.pk)
+
+            return (False, location.level - source.level, item.pk)
+
+        elif self.strategy == self.FEWEST:
+            return (-item.available, item.pk)
+
+        # Default strategy is FIFO
+        return (item.pk, )
+
+    def get_allocations(self):
+        """
+        Calculate the stock allocations for this build.
+
+        Returns:
+            A list of dict objects with keys like:
+            {
+                'stock_item': stock_item,
+                'quantity': quantity,
+                'bom_item': bom_item,
+            }
+        """
+
+        lines = self.get_bom_lines()
+
+        if len(lines) == 0:
+            return []
+
+        allocated_lines, allocated_parts = self.get_allocated()
+
+        part_ids = set()
+
+        for _bom_item, parts in lines:
+            part_ids.update(parts)
+
+        stock_items = list(self.get_stock_items(part_ids))
+
+        for item in stock_items:
+            item.available = item.quantity - Decimal(item.build_allocated or 0) - Decimal(item.sales_allocated or 0)
+
+        stock_items = [item for item in stock_items if item.available > 0]
+
+        stock_items.sort(key=self.sort_key)
+
+        allocations = []
+
+        for bom_item, parts in lines:
+
+            # How many parts are required to complete the build?
+            required = self.build.quantity * bom_item.quantity
+            required -= allocated_lines.get(bom_item.pk, 0)
+
+            # Allocations without a BOM line are consumed by the first line(s) which can use them,
+            # so that they are not subtracted from every line which shares the same part
+            for pk in parts:
+                if required <= 0:
+                    break
+
+                quantity = min(required, allocated_parts.get(pk, 0))
+
+                if quantity > 0:
+                    allocated_parts[pk] -= quantity
+                    required -= quantity
+
+            for item in stock_items:
+
+                if required <= 0:
+                    break
+
+                if item.available <= 0 or item.part_id not in parts:
+                    continue
+
+                quantity = min(required, item.available)
+
+                # Serialized stock can only be allocated as a whole
+                if item.serialized and quantity != item.quantity:
+                    continue
+
+                allocations.append({
+                    'stock_item': item,
+                    'quantity': quantity,
+                    'bom_item': bom_item,
+                })
+
+                item.available -= quantity
+                required -= quantity
+
+        return allocations
+
+    def validate_allocations(self, allocations):
+        """
+        Check the calculated allocations against the current stock levels.
+
+        BuildItem.clean() is not called for bulk allocations, so the same quantity checks
+        are performed here (for all allocated stock items in a single query).
+
+        Raises:
+            ValidationError if any of the allocations is invalid
+        """
+
+        totals = {}
+
+        for allocation in allocations:
+            quantity = allocation['quantity']
+            item = allocation['stock_item']
+
+            # Allocated quantity must be positive
+            if quantity <= 0:
+                raise ValidationError({
+                    'quantity': _('Allocation quantity must be greater than zero'),
+                })
+
+            # Quantity must be 1 for serialized stock
+            if item.serialized and not quantity == 1:
+                raise ValidationError({
+                    'quantity': _('Quantity must be 1 for serialized stock'),
+                })
+
+            totals[item.pk] = totals.get(item.pk, 0) + quantity
+
+        if len(totals) == 0:
+            return
+
+        # Reload the stock items, in case the stock levels have changed since the allocations were calculated
+        items = StockModels.StockItem.objects.filter(pk__in=totals.keys()).annotate(
+            build_allocated=SubquerySum('allocations__quantity'),
+            sales_allocated=SubquerySum('sales_order_allocations__quantity'),
+        )
+
+        for item in items:
+            available = item.quantity - Decimal(item.build_allocated or 0) - Decimal(item.sales_allocated or 0)
+
+            # Allocated quantity cannot cause the stock item to be over-allocated
+            if totals[item.pk] > available:
+                raise ValidationError({
+                    'quantity': _('StockItem is over-allocated'),
+                })
+
+    @transaction.atomic
+    def allocate(self):
+        """
+        Calculate the stock allocations for this build, and create the BuildItem objects
+
+        Returns the list of allocations (see get_allocations)
+        """
+
+        allocations = self.get_allocations()
+
+        self.validate_allocations(allocations)
+
+        BuildModels.BuildItem.objects.bulk_create([
+            BuildModels.BuildItem(
+                build=self.build,
+                bom_item=allocation['bom_item'],
+                stock_item=allocation['stock_item'],
+                quantity=allocation['quantity'],
+                install_into=None,
+            ) for allocation in allocations
+        ])
+
+        # bulk_create does not send the post_save signal, so update the cached allocation quantities here
+        for part_id in set([allocation['stock_item'].part_id for allocation in allocations]):
+            PartModels.update_part_quantities(part_id, 'allocated')
+
+        return allocations
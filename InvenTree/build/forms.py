@@ -16,6 +16,7 @@ from InvenTree.fields import DatePickerFormField
 from InvenTree.status_codes import StockStatus
 
 from .models import Build, BuildItem, BuildOrderAttachment
+from .allocation import AutoAllocator
 
 from stock.models import StockLocation, StockItem
 
@@ -168,9 +169,18 @@ class AutoAllocateForm(HelperForm):
 
     confirm = forms.BooleanField(required=True, label=_('Confirm'), help_text=_('Confirm stock allocation'))
 
+    strategy = forms.ChoiceField(
+        required=False,
+        choices=AutoAllocator.STRATEGIES,
+        initial=AutoAllocator.FIFO,
+        label=_('Strategy'),
+        help_text=_('Select the order in which stock items are allocated'),
+    )
+
     class Meta:
         model = Build
         fields = [
+            'strategy',
             'confirm',
         ]
 
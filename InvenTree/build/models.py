@@ -14,6 +14,8 @@ from django.core.exceptions import ValidationError
 
 from django.urls import reverse
 from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.db.models import Sum, Q
 from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
@@ -36,6 +38,8 @@ from stock import models as StockModels
 from part import models as PartModels
 from users import models as UserModels
 
+import build.allocation as build_allocation
+
 
 class Build(MPTTModel):
     """ A Build object organises the creation of new StockItem objects from other existing StockItem objects.
@@ -532,18 +536,17 @@ class Build(MPTTModel):
         self.status = BuildStatus.CANCELLED
         self.save()
 
-    def getAutoAllocations(self):
+    def getAutoAllocations(self, strategy=build_allocation.AutoAllocator.FIFO):
         """
         Return a list of StockItem objects which will be allocated
         using the 'AutoAllocate' function.
 
-        For each item in the BOM for the attached Part,
-        the following tests must *all* evaluate to True,
-        for the part to be auto-allocated:
+        For each (untracked) item in the BOM for the attached Part,
+        available stock is allocated until the BOM line is fully allocated.
 
-        - The sub_item in the BOM line must *not* be trackable
-        - There is only a single stock item available (which has not already been allocated to this build)
-        - The stock item has an availability greater than zero
+        - Trackable parts are not auto-allocated
+        - Stock is taken from the source location (if specified)
+        - Stock items are selected according to the allocation strategy
 
         Returns:
             A list object containing the StockItem objects to be allocated (and the quantities).
@@ -551,66 +554,13 @@ class Build(MPTTModel):
             {
                 'stock_item': stock_item,
                 'quantity': stock_quantity,
+                'bom_item': bom_item,
             }
-        """
-
-        allocations = []
 
+        See: build.allocation.AutoAllocator
         """
-        Iterate through each item in the BOM
-        """
-
-        for bom_item in self.bom_items:
-
-            part = bom_item.sub_part
-
-            # If the part is "trackable" it cannot be auto-allocated
-            if part.trackable:
-                continue
-
-            # Skip any parts which are already fully allocated
-            if self.isPartFullyAllocated(part, None):
-                continue
-
-            # How many parts are required to complete the output?
-            required = self.unallocatedQuantity(part, None)
-
-            # Grab a list of stock items which are available
-            stock_items = self.availableStockItems(part, None)
-
-            # Ensure that the available stock items are in the correct location
-            if self.take_from is not None:
-                # Filter for stock that is located downstream of the designated location
-                stock_items = stock_items.filter(location__in=[loc for loc in self.take_from.getUniqueChildren()])
-
-            # Only one StockItem to choose from? Default to that one!
-            if stock_items.count() == 1:
-                stock_item = stock_items[0]
-
-                # Double check that we have not already allocated this stock-item against this build
-                build_items = BuildItem.objects.filter(
-                    build=self,
-                    stock_item=stock_item,
-                )
-
-                if len(build_items) > 0:
-                    continue
-
-                # How many items are actually available?
-                if stock_item.quantity > 0:
-
-                    # Only take as many as are available
-                    if stock_item.quantity < required:
-                        required = stock_item.quantity
 
-                    allocation = {
-                        'stock_item': stock_item,
-                        'quantity': required,
-                    }
-
-                    allocations.append(allocation)
-
-        return allocations
+        return build_allocation.AutoAllocator(self, strategy).get_allocations()
 
     @transaction.atomic
     def unallocateOutput(self, output, part=None):
@@ -751,36 +701,25 @@ class Build(MPTTModel):
         # Remove the build output from the database
         output.delete()
 
-    @transaction.atomic
-    def autoAllocate(self):
+    def autoAllocate(self, strategy=build_allocation.AutoAllocator.FIFO):
         """
         Run auto-allocation routine to allocate StockItems to this Build.
 
         Args:
-            output: If specified, only auto-allocate against the given built output
+            strategy: Allocation strategy (see build.allocation.AutoAllocator)
 
         Returns a list of dict objects with keys like:
 
             {
                 'stock_item': item,
                 'quantity': quantity,
+                'bom_item': bom_item,
             }
 
         See: getAutoAllocations()
         """
 
-        allocations = self.getAutoAllocations()
-
-        for item in allocations:
-            # Create a new allocation
-            build_item = BuildItem(
-                build=self,
-                stock_item=item['stock_item'],
-                quantity=item['quantity'],
-                install_into=None
-            )
-
-            build_item.save()
+        return build_allocation.AutoAllocator(self, strategy).allocate()
 
     @transaction.atomic
     def subtractUntrackedStock(self, user):
@@ -1358,3 +1297,26 @@ class BuildItem(models.Model):
             'is_building': True,
         }
     )
+
+
+@receiver(post_save, sender=Build, dispatch_uid='build_post_save_quantities')
+@receiver(post_delete, sender=Build, dispatch_uid='build_post_delete_quantities')
+def after_build_change(sender, instance, **kwargs):
+    """
+    Update the cached 'building' quantity for the Part being built
+    """
+
+    PartModels.update_part_quantities(instance.part_id, 'building')
+
+
+@receiver(post_save, sender=BuildItem, dispatch_uid='build_item_post_save_quantities')
+@receiver(post_delete, sender=BuildItem, dispatch_uid='build_item_post_delete_quantities')
+def after_build_item_change(sender, instance, **kwargs):
+    """
+    Update the cached 'allocated' quantity for the allocated Part
+    """
+
+    # Note: The StockItem may have already been deleted
+    part_id = StockModels.StockItem.objects.filter(pk=instance.stock_item_id).values_list('part', flat=True).first()
+
+    PartModels.update_part_quantities(part_id, 'allocated')
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 
+from datetime import datetime, timedelta
+
 from django.test import TestCase
 
 from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
 
+from build.allocation import AutoAllocator
 from build.models import Build, BuildItem
 from stock.models import StockItem
 from part.models import Part, BomItem
@@ -270,15 +273,116 @@ class BuildTest(TestCase):
 
         allocations = self.build.getAutoAllocations()
 
-        self.assertEqual(len(allocations), 1)
+        self.assertEqual(len(allocations), 2)
 
         self.build.autoAllocate()
-        self.assertEqual(BuildItem.objects.count(), 1)
+        self.assertEqual(BuildItem.objects.count(), 2)
 
-        # Check that one un-tracked part has been fully allocated to the build
+        # Check that both un-tracked parts have been fully allocated to the build
+        self.assertTrue(self.build.isPartFullyAllocated(self.sub_part_1, None))
         self.assertTrue(self.build.isPartFullyAllocated(self.sub_part_2, None))
 
-        self.assertFalse(self.build.isPartFullyAllocated(self.sub_part_1, None))
+        self.assertTrue(self.build.areUntrackedPartsFullyAllocated())
+
+        # Trackable parts are not allocated
+        self.assertFalse(self.build.isPartFullyAllocated(self.sub_part_3, None))
+
+        # Cached allocation quantities are updated
+        self.sub_part_1.refresh_from_db()
+        self.assertEqual(self.sub_part_1.allocated, 50)
+
+        # Nothing left to allocate
+        self.assertEqual(len(self.build.getAutoAllocations()), 0)
+
+    def test_auto_allocate_strategy(self):
+        """
+        Test the different auto-allocation strategies
+        """
+
+        # Not enough stock in the first item to allocate the entire BOM line
+        self.stock_1_1.quantity = 30
+        self.stock_1_1.save()
+
+        def allocated(strategy):
+            allocations = self.build.getAutoAllocations(strategy)
+
+            return [(a['stock_item'].pk, a['quantity']) for a in allocations if a['stock_item'].part == self.sub_part_1]
+
+        # Oldest stock is allocated first
+        self.assertEqual(allocated('fifo'), [(self.stock_1_1.pk, 30), (self.stock_1_2.pk, 20)])
+
+        # Largest stock item is allocated first
+        self.assertEqual(allocated('fewest'), [(self.stock_1_2.pk, 50)])
+
+        # Stock which expires first is allocated first
+        self.stock_1_2.expiry_date = datetime.now().date() + timedelta(days=10)
+        self.stock_1_2.save()
+
+        self.assertEqual(allocated('expiry'), [(self.stock_1_2.pk, 50)])
+
+        # Stock already allocated elsewhere is not available
+        other = Build.objects.create(reference="BO-9999", title="Another build", part=self.assembly, quantity=10)
+
+        BuildItem.objects.create(build=other, stock_item=self.stock_1_2, quantity=90)
+
+        self.assertEqual(allocated('fewest'), [(self.stock_1_1.pk, 30), (self.stock_1_2.pk, 10)])
+
+        with self.assertRaises(ValueError):
+            self.build.getAutoAllocations('random')
+
+    def test_auto_allocate_shared_part(self):
+        """
+        Test auto-allocation where BOM lines share stock (via part variants)
+        """
+
+        variant = Part.objects.create(
+            name="Widget variant",
+            description="A variant of sub_part_1",
+            variant_of=self.sub_part_1,
+            component=True,
+        )
+
+        # sub_part_1 line can also be satisfied by the variant
+        line = BomItem.objects.get(part=self.assembly, sub_part=self.sub_part_1)
+        line.allow_variants = True
+        line.save()
+
+        variant_line = BomItem.objects.create(part=self.assembly, sub_part=variant, quantity=2)
+
+        variant_stock = StockItem.objects.create(part=variant, quantity=100)
+
+        # Variant stock allocated against its own BOM line
+        BuildItem.objects.create(build=self.build, bom_item=variant_line, stock_item=variant_stock, quantity=20)
+
+        allocations = self.build.getAutoAllocations()
+
+        # The existing allocation is not subtracted from the sub_part_1 line
+        self.assertEqual(
+            sum([a['quantity'] for a in allocations if a['bom_item'] == line]),
+            50
+        )
+
+        self.assertEqual(len([a for a in allocations if a['bom_item'] == variant_line]), 0)
+
+    def test_auto_allocate_validate(self):
+        """
+        Bulk allocations are validated against the current stock levels
+        """
+
+        allocator = AutoAllocator(self.build)
+
+        allocations = allocator.get_allocations()
+
+        # Stock level changed after the allocations were calculated
+        StockItem.objects.filter(pk=self.stock_1_1.pk).update(quantity=10)
+
+        with self.assertRaises(ValidationError):
+            allocator.validate_allocations(allocations)
+
+        allocations[0]['quantity'] = 0
+
+        with self.assertRaises(ValidationError):
+            allocator.validate_allocations(allocations)
 
     def test_cancel(self):
         """
@@ -13,6 +13,7 @@ from django.urls import reverse
 
 from part.models import Part
 from .models import Build, BuildItem, BuildOrderAttachment
+from .allocation import AutoAllocator
 from . import forms
 from stock.models import StockLocation, StockItem
 
@@ -109,12 +110,24 @@ class BuildAutoAllocate(AjaxUpdateView):
 
         build = self.get_object()
 
-        context['allocations'] = build.getAutoAllocations()
+        context['allocations'] = build.getAutoAllocations(self.get_strategy())
 
         context['build'] = build
 
         return context
 
+    def get_strategy(self):
+        """
+        Return the selected allocation strategy
+        """
+
+        strategy = self.request.POST.get('strategy', None) or self.request.GET.get('strategy', None)
+
+        if strategy not in [s[0] for s in AutoAllocator.STRATEGIES]:
+            strategy = AutoAllocator.FIFO
+
+        return strategy
+
     def get_form(self):
 
         form = super().get_form()
@@ -131,7 +144,7 @@ class BuildAutoAllocate(AjaxUpdateView):
         perform auto-allocations
         """
 
-        build.autoAllocate()
+        build.autoAllocate(self.get_strategy())
 
     def get_data(self):
         return {
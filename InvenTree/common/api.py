@@ -5,5 +5,83 @@ Provides a JSON API for common components.
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from django.conf.urls import url
+
+from rest_framework import permissions
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import SearchEntry
+from .search import SearchIndex
+
+
+class SearchView(APIView):
+    """
+    Endpoint for the full-text search index.
+
+    - GET: Return search results across all indexed models (best matches first)
+
+    Query parameters:
+    - search: Search text (all terms must match, by prefix)
+    - models: Optional comma separated list of model labels to search (e.g. 'part.part,stock.stockitem')
+
+    Only models which the user has permission to view are searched.
+    """
+
+    permission_classes = [
+        permissions.IsAuthenticated,
+    ]
+
+    def get(self, request, *args, **kwargs):
+
+        text = request.query_params.get('search', '')
+
+        models = request.query_params.get('models', None)
+
+        if models:
+            models = [label.strip().lower() for label in models.split(',')]
+
+        results = SearchIndex.search(text, models=models, user=request.user)
+
+        paginator = LimitOffsetPagination()
+
+        page = paginator.paginate_queryset(results, request, view=self)
+
+        paginated = page is not None
+
+        if not paginated:
+            page = results
+
+        # Load the entries for the selected results in a single query
+        entries = SearchEntry.objects.in_bulk([pk for pk, _score in page])
+
+        data = []
+
+        for pk, score in page:
+            entry = entries.get(pk, None)
+
+            if entry is None:
+                continue
+
+            data.append({
+                'model': entry.model,
+                'pk': entry.object_id,
+                'title': entry.title,
+                'description': entry.description,
+                'url': entry.url,
+                'score': score,
+            })
+
+        if paginated:
+            return paginator.get_paginated_response(data)
+
+        return Response(data)
+
+
 common_api_urls = [
 ]
+
+search_api_urls = [
+    url(r'^$', SearchView.as_view(), name='api-search'),
+]
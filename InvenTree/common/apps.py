@@ -7,4 +7,6 @@ class CommonConfig(AppConfig):
     name = 'common'
 
     def ready(self):
-        pass
+
+        # Connect the search index signals
+        import common.search  # noqa: F401
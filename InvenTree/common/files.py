@@ -98,6 +98,7 @@ class FileManager:
             self.ITEM_MATCH_HEADERS = [
                 'Manufacturer_MPN',
                 'Supplier_SKU',
+                'Part_Name',
             ]
 
             self.OPTIONAL_HEADERS = [
@@ -0,0 +1,26 @@
+"""
+Custom management command, rebuild the full-text search index
+"""
+
+from django.core.management.base import BaseCommand
+
+from common.models import SearchEntry
+from common.search import SearchIndex
+
+
+class Command(BaseCommand):
+    """
+    django command to rebuild the full-text search index
+    for every indexed object in the database.
+
+    The search index is kept up to date automatically,
+    but may need to be rebuilt (e.g. after bulk data import).
+    """
+
+    def handle(self, *args, **kwargs):
+
+        self.stdout.write("Rebuilding search index...")
+
+        SearchIndex.rebuild()
+
+        self.stdout.write(f"Indexed {SearchEntry.objects.count()} objects")
@@ -0,0 +1,101 @@
+# Generated by Django 3.2.4 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+
+FTS_TABLE = 'common_searchentry_fts'
+
+
+def create_fts_index(apps, schema_editor):
+    """
+    Create the database specific full-text search index for the SearchEntry table
+    """
+
+    connection = schema_editor.connection
+
+    # Remove any index left behind when the SearchEntry table was dropped
+    # (e.g. the FTS table is not removed when the schema is reset and re-migrated)
+    delete_fts_index(apps, schema_editor)
+
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS common_searchentry_text_fts ON common_searchentry "
+            "USING GIN (to_tsvector('simple'::regconfig, COALESCE(text, '')));"
+        )
+
+    elif connection.vendor == 'sqlite':
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5');")
+            fts5 = cursor.fetchone()[0]
+
+        if not fts5:
+            # Full-text search is performed in Python (see common.search)
+            return
+
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(text, content='common_searchentry', content_rowid='id');"
+        )
+
+        # Keep the FTS table synchronized with the SearchEntry table
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS common_searchentry_fts_ai AFTER INSERT ON common_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+            f"END;"
+        )
+
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS common_searchentry_fts_ad AFTER DELETE ON common_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); "
+            f"END;"
+        )
+
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS common_searchentry_fts_au AFTER UPDATE ON common_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); "
+            f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+            f"END;"
+        )
+
+
+def delete_fts_index(apps, schema_editor):
+    """
+    Remove the database specific full-text search index
+    """
+
+    connection = schema_editor.connection
+
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS common_searchentry_text_fts;")
+
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TRIGGER IF EXISTS common_searchentry_fts_ai;")
+        schema_editor.execute("DROP TRIGGER IF EXISTS common_searchentry_fts_ad;")
+        schema_editor.execute("DROP TRIGGER IF EXISTS common_searchentry_fts_au;")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE};")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0009_delete_currency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(db_index=True, max_length=50)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(blank=True, max_length=250)),
+                ('description', models.CharField(blank=True, max_length=250)),
+                ('url', models.CharField(blank=True, max_length=250)),
+                ('text', models.TextField(blank=True)),
+            ],
+            options={
+                'unique_together': {('model', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_fts_index, reverse_code=delete_fts_index),
+    ]
@@ -7,11 +7,15 @@ These models are 'generic' and do not fit a particular business logic object.
 from __future__ import unicode_literals
 
 import os
+import time
 import decimal
 import math
 
-from django.db import models, transaction
-from django.db.utils import IntegrityError, OperationalError
+from django.db import models, transaction, connection
+from django.db.utils import IntegrityError, OperationalError, ProgrammingError
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.core.cache import cache
 from django.conf import settings
 
 from djmoney.models.fields import MoneyField
@@ -88,6 +92,14 @@ class InvenTreeSetting(models.Model):
             'default': False,
         },
 
+        'INVENTREE_DASHBOARD_CACHE': {
+            'name': _('Dashboard Cache Timeout'),
+            'description': _('Time to cache dashboard data for each user (zero to disable caching)'),
+            'default': 60,
+            'units': _('seconds'),
+            'validator': [int, MinValueValidator(0)],
+        },
+
         'BARCODE_ENABLE': {
             'name': _('Barcode Support'),
             'description': _('Enable barcode scanner support'),
@@ -470,7 +482,12 @@ class InvenTreeSetting(models.Model):
         if backup_value is None:
             backup_value = cls.get_setting_default(key)
 
-        setting = InvenTreeSetting.get_setting_object(key)
+        # Try the process-wide settings cache first
+        # (returns False if the setting does not exist in the database)
+        setting = settings_cache.get_setting_object(key)
+
+        if setting is None:
+            setting = InvenTreeSetting.get_setting_object(key)
 
         if setting:
             value = setting.value
@@ -683,6 +700,154 @@ class InvenTreeSetting(models.Model):
         return value
 
 
+class InvenTreeSettingCache:
+    """
+    Process-wide cache of global InvenTreeSetting values.
+
+    InvenTreeSetting.get_setting() is called very frequently (often inside loops),
+    and would otherwise perform a database query for every call.
+
+    - All global settings are loaded into memory in a single query
+    - Settings which do not exist in the database are also served from memory
+    - The cache is invalidated whenever an InvenTreeSetting is saved or deleted
+    - Invalidation is propagated to other worker processes via a "version" stamp,
+      which is stored in the Django cache backend
+    - The loaded values expire after MAX_AGE seconds, as the default (process local)
+      cache backend does not propagate the version stamp to other worker processes
+    - Hit / miss counters are available via the stats() method
+    """
+
+    VERSION_KEY = 'inventree-settings-version'
+
+    # Maximum time (seconds) for which the loaded values are used
+    MAX_AGE = 5
+
+    def __init__(self):
+        # Tuple of (database name, version, time loaded, values)
+        self.data = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_version(self):
+        """ Return the current (shared) version stamp for the global settings """
+
+        version = cache.get(self.VERSION_KEY)
+
+        if version is None:
+            # Seed with a timestamp, so a restarted cache never matches a stale version
+            cache.add(self.VERSION_KEY, int(time.time() * 1000), None)
+            version = cache.get(self.VERSION_KEY)
+
+        return version
+
+    def increment_version(self):
+        """ Increment the shared version stamp (invalidates the cache in *all* worker processes) """
+
+        try:
+            cache.incr(self.VERSION_KEY)
+        except ValueError:
+            # Version key does not exist (yet)
+            self.get_version()
+
+    def invalidate(self):
+        """
+        Invalidate the cached settings.
+
+        The local cache is cleared immediately,
+        the other worker processes are notified once the transaction is committed.
+        """
+
+        self.data = None
+
+        transaction.on_commit(self.increment_version)
+
+    def get_values(self):
+        """
+        Return a dict of all global settings values (key -> (pk, value)),
+        or None if the values could not be loaded (e.g. inside a transaction).
+        """
+
+        database = connection.settings_dict.get('NAME', None)
+        version = self.get_version()
+
+        data = self.data
+
+        if data is not None and data[0] == database and data[1] == version and time.monotonic() - data[2] <= self.MAX_AGE:
+            self.hits += 1
+            return data[3]
+
+        self.misses += 1
+
+        if connection.in_atomic_block:
+            # Values read inside a transaction may not be committed yet,
+            # so the cache is not loaded (the setting is read directly from the database)
+            return None
+
+        values = {}
+
+        try:
+            for pk, key, value in InvenTreeSetting.objects.values_list('pk', 'key', 'value'):
+                values[str(key).strip().upper()] = (pk, value)
+        except (OperationalError, ProgrammingError):
+            # The database is not ready yet
+            return None
+
+        self.data = (database, version, time.monotonic(), values)
+
+        return values
+
+    def get_setting_object(self, key):
+        """
+        Return an (unsaved) InvenTreeSetting object for the given key.
+
+        Returns:
+            - An InvenTreeSetting object, if the setting exists
+            - False if the setting does not exist in the database
+            - None if the settings could not be loaded
+        """
+
+        key = str(key).strip().upper()
+
+        values = self.get_values()
+
+        if values is None:
+            return None
+
+        if key not in values:
+            return False
+
+        pk, value = values[key]
+
+        return InvenTreeSetting(pk=pk, key=key, value=value)
+
+    def stats(self):
+        """ Return hit / miss statistics for the settings cache """
+
+        data = self.data
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(data[3]) if data is not None else 0,
+        }
+
+
+# Global settings cache (one instance per worker process)
+settings_cache = InvenTreeSettingCache()
+
+
+@receiver(post_save, sender=InvenTreeSetting, dispatch_uid='inventree_setting_post_save_cache')
+@receiver(post_delete, sender=InvenTreeSetting, dispatch_uid='inventree_setting_post_delete_cache')
+def after_setting_change(sender, instance, **kwargs):
+    """ Receives post_save and post_delete signals for InvenTreeSetting objects.
+
+    The settings cache is invalidated whenever a setting value changes.
+    """
+
+    settings_cache.invalidate()
+
+
 class PriceBreak(models.Model):
     """
     Represents a PriceBreak model
@@ -726,15 +891,20 @@ class PriceBreak(models.Model):
         return converted.amount
 
 
-def get_price(instance, quantity, moq=True, multiples=True, currency=None):
+def get_price(instance, quantity, moq=True, multiples=True, currency=None, price_breaks=None):
     """ Calculate the price based on quantity price breaks.
 
     - Don't forget to add in flat-fee cost (base_cost field)
     - If MOQ (minimum order quantity) is required, bump quantity
     - If order multiples are to be observed, then we need to calculate based on that, too
+
+    Args:
+        price_breaks: Optional list of pre-loaded price breaks (sorted by quantity).
+                      If not provided, the price breaks are read from the database.
     """
 
-    price_breaks = instance.price_breaks.all()
+    if price_breaks is None:
+        price_breaks = instance.price_breaks.all()
 
     # No price break information available?
     if len(price_breaks) == 0:
@@ -756,7 +926,7 @@ def get_price(instance, quantity, moq=True, multiples=True, currency=None):
         currency = currency_code_default()
 
     pb_min = None
-    for pb in instance.price_breaks.all():
+    for pb in price_breaks:
         # Store smallest price break
         if not pb_min:
             pb_min = pb
@@ -836,3 +1006,41 @@ class ColorTheme(models.Model):
                 return True
 
         return False
+
+
+class SearchEntry(models.Model):
+    """
+    An entry in the full-text search index.
+
+    Each entry stores the searchable text for a single database object
+    (including text from related objects, e.g. the part name for a stock item).
+    Entries are maintained automatically (see common.search).
+
+    Attributes:
+        model: Model label (e.g. 'part.part')
+        object_id: Primary key of the indexed object
+        title: Display title for the object
+        description: Display description for the object
+        url: URL for the object
+        text: Normalized searchable text
+    """
+
+    class Meta:
+        unique_together = (
+            ('model', 'object_id'),
+        )
+
+    model = models.CharField(max_length=50, db_index=True)
+
+    object_id = models.PositiveIntegerField()
+
+    title = models.CharField(max_length=250, blank=True)
+
+    description = models.CharField(max_length=250, blank=True)
+
+    url = models.CharField(max_length=250, blank=True)
+
+    text = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}"
@@ -0,0 +1,679 @@
+"""
+Full-text search index.
+
+Searching across parts, stock, companies and orders using the DRF SearchFilter
+performs an "icontains" query against multiple (joined) columns for each model,
+requiring a separate table scan for every searched model.
+
+Instead, the searchable text for each object (including text from related objects)
+is stored in a single SearchEntry table, which is maintained automatically
+when indexed objects are saved or deleted.
+Objects which include text from a changed object (e.g. the stock items for a part)
+are updated by the background worker.
+
+The search backend is selected based on the database engine:
+
+- PostgreSQL: Full-text search using a GIN indexed tsvector expression
+- SQLite: Full-text search using an FTS5 virtual table (if FTS5 is available)
+- Otherwise: A pure-Python inverted index, loaded from the SearchEntry table
+
+All backends perform prefix matching against each search term,
+and require that all search terms are matched.
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import bisect
+import logging
+import re
+import threading
+import time
+
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.urls import reverse
+
+import InvenTree.tasks
+
+from users.models import RuleSet, check_user_role
+
+from common import models as CommonModels
+
+
+logger = logging.getLogger("inventree")
+
+
+# Name of the SQLite FTS5 table (see common/migrations/0010_searchentry.py)
+SQLITE_FTS_TABLE = 'common_searchentry_fts'
+
+# Time (seconds) after which the in-memory index is reloaded from the database
+PYTHON_INDEX_TIMEOUT = 300
+
+
+# Configuration for each indexed model:
+#
+# - fields: Attributes which provide the searchable text (related attributes are separated with '.')
+# - title: Attribute which provides the display title
+# - description: Attribute which provides the display description
+# - url: Optional function which returns the URL for an object (defaults to get_absolute_url)
+# - select_related: Related tables which are required to construct the index entries
+# - dependents: (model, lookup) pairs for other indexed objects which include text from this object
+SEARCH_MODELS = {
+    'part.part': {
+        'fields': ['name', 'IPN', 'revision', 'description', 'keywords', 'category.name'],
+        'title': 'full_name',
+        'description': 'description',
+        'select_related': ['category'],
+        'dependents': [
+            ('stock.stockitem', 'part'),
+            ('company.supplierpart', 'part'),
+            ('company.manufacturerpart', 'part'),
+            ('build.build', 'part'),
+        ],
+    },
+    'part.partcategory': {
+        'fields': ['name', 'description'],
+        'title': 'pathstring',
+        'description': 'description',
+        'select_related': ['parent'],
+        'dependents': [
+            ('part.part', 'category'),
+        ],
+    },
+    'stock.stocklocation': {
+        'fields': ['name', 'description'],
+        'title': 'pathstring',
+        'description': 'description',
+        'select_related': ['parent'],
+        'dependents': [
+            ('stock.stockitem', 'location'),
+        ],
+    },
+    'stock.stockitem': {
+        'fields': ['serial', 'batch', 'part.name', 'part.IPN', 'part.description', 'location.name'],
+        'title': '__str__',
+        'description': 'part.description',
+        'select_related': ['part', 'location'],
+    },
+    'company.company': {
+        'fields': ['name', 'description', 'website'],
+        'title': 'name',
+        'description': 'description',
+        'dependents': [
+            ('company.supplierpart', 'supplier'),
+            ('company.supplierpart', 'manufacturer_part__manufacturer'),
+            ('company.manufacturerpart', 'manufacturer'),
+            ('order.purchaseorder', 'supplier'),
+            ('order.salesorder', 'customer'),
+        ],
+    },
+    'company.manufacturerpart': {
+        'fields': ['MPN', 'description', 'manufacturer.name', 'part.name', 'part.description'],
+        'title': 'MPN',
+        'description': 'part.full_name',
+        'url': lambda item: reverse('manufacturer-part-detail', kwargs={'pk': item.pk}),
+        'select_related': ['part', 'manufacturer'],
+        'dependents': [
+            ('company.supplierpart', 'manufacturer_part'),
+        ],
+    },
+    'company.supplierpart': {
+        'fields': [
+            'SKU', 'description', 'supplier.name',
+            'manufacturer_part.MPN', 'manufacturer_part.manufacturer.name',
+            'part.name', 'part.description',
+        ],
+        'title': 'SKU',
+        'description': 'part.full_name',
+        'select_related': ['part', 'supplier', 'manufacturer_part__manufacturer'],
+    },
+    'build.build': {
+        'fields': ['reference', 'title', 'batch', 'part.name', 'part.IPN'],
+        'title': '__str__',
+        'description': 'title',
+        'select_related': ['part'],
+    },
+    'order.purchaseorder': {
+        'fields': ['reference', 'supplier.name', 'supplier_reference', 'description'],
+        'title': '__str__',
+        'description': 'description',
+        'select_related': ['supplier'],
+    },
+    'order.salesorder': {
+        'fields': ['reference', 'customer.name', 'customer_reference', 'description'],
+        'title': '__str__',
+        'description': 'description',
+        'select_related': ['customer'],
+    },
+}
+
+
+def tokenize(text):
+    """
+    Split text into a list of normalized (lower case, alphanumeric) search tokens
+    """
+
+    return re.findall(r'[^\W_]+', str(text).lower())
+
+
+def get_value(instance, path):
+    """
+    Return the value of a (related) attribute of a model instance, e.g. 'part.name'
+
+    Callable attributes are called, and missing related objects return None
+    """
+
+    value = instance
+
+    for attr in path.split('.'):
+        if value is None:
+            return None
+
+        try:
+            value = getattr(value, attr)
+        except ObjectDoesNotExist:
+            return None
+
+        if callable(value):
+            value = value()
+
+    return value
+
+
+def model_label(model):
+    """ Return the label (e.g. 'part.part') for a model class or instance """
+
+    return model._meta.label_lower
+
+
+def is_indexed(model):
+    """
+    Return True if the model class is indexed.
+
+    Historical models (e.g. in data migrations) are never indexed.
+    """
+
+    label = model_label(model)
+
+    return label in SEARCH_MODELS and apps.get_model(label) is model
+
+
+def get_search_models(user=None):
+    """
+    Return the labels of the indexed models which the user has permission to view
+    """
+
+    labels = []
+
+    for label in SEARCH_MODELS.keys():
+
+        if user is None:
+            labels.append(label)
+            continue
+
+        table = label.replace('.', '_')
+
+        for role, tables in RuleSet.RULESET_MODELS.items():
+            if table in tables and check_user_role(user, role, 'view'):
+                labels.append(label)
+                break
+
+    return labels
+
+
+class PythonSearchBackend:
+    """
+    Pure-Python inverted index of search tokens.
+
+    The index is loaded from the SearchEntry table (in a single query)
+    and updated incrementally as entries are changed (in this process).
+    The index is periodically reloaded, to pick up changes made by other processes.
+    """
+
+    def __init__(self, timeout=PYTHON_INDEX_TIMEOUT):
+
+        self.timeout = timeout
+        self.lock = threading.RLock()
+
+        self.clear()
+
+    def clear(self):
+
+        with self.lock:
+            # Map of entry pk -> (model, set of tokens)
+            self.entries = {}
+
+            # Map of token -> set of entry pk values
+            self.tokens = defaultdict(set)
+
+            # Sorted list of tokens (for prefix matching)
+            self.sorted_tokens = None
+
+            self.loaded = None
+
+    def load(self):
+
+        with self.lock:
+            self.clear()
+
+            for pk, model, text in CommonModels.SearchEntry.objects.values_list('pk', 'model', 'text'):
+                self._add(pk, model, text)
+
+            self.loaded = time.time()
+
+    def _add(self, pk, model, text):
+
+        tokens = set(tokenize(text))
+
+        self.entries[pk] = (model, tokens)
+
+        for token in tokens:
+            self.tokens[token].add(pk)
+
+        self.sorted_tokens = None
+
+    def _remove(self, pk):
+
+        model, tokens = self.entries.pop(pk, (None, set()))
+
+        for token in tokens:
+            entries = self.tokens.get(token, None)
+
+            if entries is not None:
+                entries.discard(pk)
+
+                if len(entries) == 0:
+                    del self.tokens[token]
+
+        self.sorted_tokens = None
+
+    def update(self, entries):
+        """ Update the provided SearchEntry objects in the index """
+
+        with self.lock:
+            if self.loaded is None:
+                return
+
+            for entry in entries:
+                self._remove(entry.pk)
+                self._add(entry.pk, entry.model, entry.text)
+
+    def remove(self, pk_list):
+        """ Remove the SearchEntry objects with the provided pk values from the index """
+
+        with self.lock:
+            for pk in pk_list:
+                self._remove(pk)
+
+    def match_term(self, term):
+        """
+        Return a dict of entry pk -> score for a single search term.
+
+        Exact token matches score higher than prefix matches.
+        """
+
+        if self.sorted_tokens is None:
+            self.sorted_tokens = sorted(self.tokens.keys())
+
+        scores = {}
+
+        idx = bisect.bisect_left(self.sorted_tokens, term)
+
+        while idx < len(self.sorted_tokens) and self.sorted_tokens[idx].startswith(term):
+            token = self.sorted_tokens[idx]
+            score = 2 if token == term else 1
+
+            for pk in self.tokens[token]:
+                scores[pk] = max(scores.get(pk, 0), score)
+
+            idx += 1
+
+        return scores
+
+    def search(self, terms, models):
+
+        with self.lock:
+            if self.loaded is None or (time.time() - self.loaded) > self.timeout:
+                self.load()
+
+            results = None
+
+            for term in terms:
+                scores = self.match_term(term)
+
+                if results is None:
+                    results = scores
+                else:
+                    results = {pk: results[pk] + score for pk, score in scores.items() if pk in results}
+
+            models = set(models)
+
+            results = [
+                (pk, score) for pk, score in (results or {}).items() if self.entries[pk][0] in models
+            ]
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+
+        return results
+
+
+class SQLiteSearchBackend:
+    """
+    Full-text search using an SQLite FTS5 virtual table.
+
+    The FTS5 table is maintained by database triggers.
+    """
+
+    def update(self, entries):
+        pass
+
+    def remove(self, pk_list):
+        pass
+
+    def search(self, terms, models):
+
+        # Search tokens are alphanumeric, so can be safely quoted
+        match = ' AND '.join([f'"{term}"*' for term in terms])
+
+        placeholders = ', '.join(['%s'] * len(models))
+
+        query = (
+            f"SELECT e.id, bm25({SQLITE_FTS_TABLE}) AS score "
+            f"FROM {SQLITE_FTS_TABLE} JOIN common_searchentry e ON e.id = {SQLITE_FTS_TABLE}.rowid "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND e.model IN ({placeholders}) "
+            f"ORDER BY score, e.id"
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, [match] + list(models))
+
+            # bm25() returns lower values for better matches
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search using a PostgreSQL tsvector expression (with GIN index)
+    """
+
+    def update(self, entries):
+        pass
+
+    def remove(self, pk_list):
+        pass
+
+    def search(self, terms, models):
+
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        query = SearchQuery(' & '.join([f"{term}:*" for term in terms]), config='simple', search_type='raw')
+
+        entries = CommonModels.SearchEntry.objects.filter(model__in=models).annotate(
+            search=SearchVector('text', config='simple'),
+        ).filter(search=query).annotate(
+            rank=SearchRank(SearchVector('text', config='simple'), query),
+        ).order_by('-rank', 'pk')
+
+        return list(entries.values_list('pk', 'rank'))
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Return the search backend for the current database engine
+    """
+
+    global _backend
+
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and SQLITE_FTS_TABLE in connection.introspection.table_names():
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = PythonSearchBackend()
+
+        logger.debug(f"Using search backend '{_backend.__class__.__name__}'")
+
+    return _backend
+
+
+class SearchIndex:
+    """
+    Maintain the SearchEntry objects for indexed models.
+    """
+
+    @staticmethod
+    def get_entry_data(instance, config):
+        """
+        Construct the SearchEntry data for a model instance
+        """
+
+        values = [get_value(instance, field) for field in config['fields']]
+
+        text = ' '.join(tokenize(' '.join([str(value) for value in values if value])))
+
+        url_func = config.get('url', None)
+
+        try:
+            url = url_func(instance) if url_func else instance.get_absolute_url()
+        except Exception:
+            url = ''
+
+        return {
+            'title': str(get_value(instance, config['title']) or '')[:250],
+            'description': str(get_value(instance, config['description']) or '')[:250],
+            'url': str(url)[:250],
+            'text': text,
+        }
+
+    @classmethod
+    def update_queryset(cls, queryset):
+        """
+        Update the search index for all objects in the provided queryset.
+
+        Existing entries are loaded in a single query,
+        and only changed entries are written (using bulk operations).
+
+        Returns a list of the objects whose indexed text has changed.
+        """
+
+        label = model_label(queryset.model)
+        config = SEARCH_MODELS[label]
+
+        instances = list(queryset.select_related(*config.get('select_related', [])))
+
+        if len(instances) == 0:
+            return []
+
+        existing = {
+            entry.object_id: entry for entry in CommonModels.SearchEntry.objects.filter(
+                model=label,
+                object_id__in=[instance.pk for instance in instances],
+            )
+        }
+
+        created = []
+        updated = []
+        changed = []
+
+        for instance in instances:
+            data = cls.get_entry_data(instance, config)
+
+            entry = existing.get(instance.pk, None)
+
+            if entry is None:
+                created.append(CommonModels.SearchEntry(model=label, object_id=instance.pk, **data))
+                continue
+
+            if any([getattr(entry, key) != value for key, value in data.items()]):
+
+                if entry.text != data['text']:
+                    changed.append(instance)
+
+                for key, value in data.items():
+                    setattr(entry, key, value)
+
+                updated.append(entry)
+
+        if len(created) > 0:
+            CommonModels.SearchEntry.objects.bulk_create(created, batch_size=500)
+
+            # Primary key values are not returned by bulk_create for all database backends
+            created = list(CommonModels.SearchEntry.objects.filter(
+                model=label,
+                object_id__in=[entry.object_id for entry in created],
+            ))
+
+        if len(updated) > 0:
+            CommonModels.SearchEntry.objects.bulk_update(updated, ['title', 'description', 'url', 'text'], batch_size=500)
+
+        get_backend().update(created + updated)
+
+        return changed
+
+    @classmethod
+    def update(cls, instance):
+        """
+        Update the search index for a single object,
+        and for any dependent objects (if the indexed text has changed)
+        """
+
+        label = model_label(instance)
+        config = SEARCH_MODELS[label]
+
+        model = instance.__class__
+
+        changed = cls.update_queryset(model.objects.filter(pk=instance.pk))
+
+        if len(changed) == 0 or len(config.get('dependents', [])) == 0:
+            return
+
+        # Dependent objects (e.g. all stock items for a part) are updated by the background worker,
+        # once the changes to this object have been committed
+        pk = instance.pk
+
+        transaction.on_commit(
+            lambda: InvenTree.tasks.offload_task('common.search.update_dependents', label, pk)
+        )
+
+    @classmethod
+    def update_dependents(cls, label, pk):
+        """
+        Update the search index for any objects which include text from an indexed object
+        (e.g. the stock items for a part)
+        """
+
+        config = SEARCH_MODELS.get(label, None)
+
+        if config is None:
+            return
+
+        for dependent, lookup in config.get('dependents', []):
+            dependent_model = apps.get_model(dependent)
+
+            cls.update_queryset(dependent_model.objects.filter(**{lookup: pk}))
+
+    @staticmethod
+    def remove(instance):
+        """
+        Remove a single object from the search index
+        """
+
+        entries = CommonModels.SearchEntry.objects.filter(model=model_label(instance), object_id=instance.pk)
+
+        pk_list = list(entries.values_list('pk', flat=True))
+
+        entries.delete()
+
+        get_backend().remove(pk_list)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls):
+        """
+        Rebuild the entire search index
+        """
+
+        CommonModels.SearchEntry.objects.all().delete()
+
+        for label in SEARCH_MODELS.keys():
+            model = apps.get_model(label)
+
+            pk_list = list(model.objects.values_list('pk', flat=True))
+
+            for idx in range(0, len(pk_list), 1000):
+                cls.update_queryset(model.objects.filter(pk__in=pk_list[idx:idx + 1000]))
+
+        backend = get_backend()
+
+        if isinstance(backend, PythonSearchBackend):
+            backend.clear()
+
+    @staticmethod
+    def search(text, models=None, user=None):
+        """
+        Search the index.
+
+        Args:
+            text: Search text
+            models: Optional list of model labels to search (default = all indexed models)
+            user: Only return results for models which the user has permission to view
+
+        Returns:
+            An ordered list of (SearchEntry pk, score) tuples (best matches first)
+        """
+
+        terms = tokenize(text)
+
+        allowed = get_search_models(user)
+
+        if models is not None:
+            allowed = [label for label in allowed if label in models]
+
+        if len(terms) == 0 or len(allowed) == 0:
+            return []
+
+        return get_backend().search(terms, allowed)
+
+
+def update_dependents(label, pk):
+    """
+    Background task: update the search index for the objects which depend on an indexed object
+    """
+
+    SearchIndex.update_dependents(label, pk)
+
+
+@receiver(post_save, dispatch_uid='search_index_post_save')
+def after_save_search_index(sender, instance, raw=False, **kwargs):
+    """ Receives post_save signals for *all* models.
+
+    Update the search index for any indexed model.
+    """
+
+    if raw or not is_indexed(sender):
+        return
+
+    SearchIndex.update(instance)
+
+
+@receiver(post_delete, dispatch_uid='search_index_post_delete')
+def after_delete_search_index(sender, instance, **kwargs):
+    """ Receives post_delete signals for *all* models.
+
+    Remove any indexed model from the search index.
+    """
+
+    if not is_indexed(sender):
+        return
+
+    SearchIndex.remove(instance)
@@ -1,10 +1,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 
-from .models import InvenTreeSetting
+from InvenTree.api_tester import InvenTreeAPITestCase
+
+from part.models import Part
+from stock.adjustment import StockAdjustment
+from stock.models import StockItem, StockLocation
+
+from .models import InvenTreeSetting, SearchEntry, settings_cache
+from .search import SearchIndex, tokenize, update_dependents
 
 
 class SettingsTest(TestCase):
@@ -85,3 +94,223 @@ class SettingsTest(TestCase):
 
                 if setting.default_value not in [True, False]:
                     raise ValueError(f'Non-boolean default value specified for {key}')
+
+
+class SettingsCacheTest(TransactionTestCase):
+    """
+    Tests for the process-wide settings cache
+    """
+
+    def setUp(self):
+        settings_cache.invalidate()
+
+    def tearDown(self):
+        # Ensure cached values do not leak into other tests
+        settings_cache.invalidate()
+
+    def test_cache(self):
+
+        InvenTreeSetting.set_setting('PART_COPY_BOM', False, None)
+
+        # First lookup loads the cache
+        self.assertFalse(InvenTreeSetting.get_setting('PART_COPY_BOM'))
+
+        stats = settings_cache.stats()
+
+        self.assertTrue(stats['size'] >= 1)
+
+        # Subsequent lookups do not hit the database
+        with self.assertNumQueries(0):
+            for i in range(10):
+                self.assertFalse(InvenTreeSetting.get_setting('PART_COPY_BOM'))
+
+        self.assertEqual(settings_cache.stats()['hits'], stats['hits'] + 10)
+        self.assertEqual(settings_cache.stats()['misses'], stats['misses'])
+
+        # Changing the setting invalidates the cache
+        InvenTreeSetting.set_setting('PART_COPY_BOM', True, None)
+
+        self.assertTrue(InvenTreeSetting.get_setting('PART_COPY_BOM'))
+
+        self.assertEqual(settings_cache.stats()['misses'], stats['misses'] + 1)
+
+    def test_missing(self):
+
+        InvenTreeSetting.objects.filter(key='PART_COPY_BOM').delete()
+
+        self.assertTrue(InvenTreeSetting.get_setting('PART_COPY_BOM', True))
+
+        # Settings which do not exist in the database are also served from the cache
+        with self.assertNumQueries(0):
+            for i in range(10):
+                self.assertTrue(InvenTreeSetting.get_setting('PART_COPY_BOM', True))
+
+    def test_transaction(self):
+
+        InvenTreeSetting.set_setting('PART_COPY_BOM', False, None)
+
+        settings_cache.data = None
+
+        with transaction.atomic():
+            # Inside a transaction, only the requested setting is loaded
+            with self.assertNumQueries(1):
+                self.assertFalse(InvenTreeSetting.get_setting('PART_COPY_BOM'))
+
+        self.assertIsNone(settings_cache.data)
+
+    def test_max_age(self):
+
+        InvenTreeSetting.set_setting('PART_COPY_BOM', False, None)
+
+        self.assertFalse(InvenTreeSetting.get_setting('PART_COPY_BOM'))
+
+        # Changes which do not send a signal (e.g. made by another worker process)
+        InvenTreeSetting.objects.filter(key='PART_COPY_BOM').update(value='True')
+
+        self.assertFalse(InvenTreeSetting.get_setting('PART_COPY_BOM'))
+
+        # Loaded values are reloaded once they expire
+        database, version, loaded, values = settings_cache.data
+        settings_cache.data = (database, version, loaded - settings_cache.MAX_AGE - 1, values)
+
+        self.assertTrue(InvenTreeSetting.get_setting('PART_COPY_BOM'))
+
+
+class SearchIndexTest(InvenTreeAPITestCase):
+    """
+    Tests for the full-text search index
+    """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'stock',
+    ]
+
+    roles = [
+        'part.view',
+    ]
+
+    def setUp(self):
+
+        super().setUp()
+
+        # Fixtures are loaded "raw", and are not indexed automatically
+        SearchIndex.rebuild()
+
+    def test_tokenize(self):
+
+        self.assertEqual(tokenize('M2x4 LPHS, (low-profile)'), ['m2x4', 'lphs', 'low', 'profile'])
+        self.assertEqual(tokenize('R_2K2_0805'), ['r', '2k2', '0805'])
+
+    def test_search(self):
+
+        results = SearchIndex.search('screw', models=['part.part'])
+
+        entries = SearchEntry.objects.in_bulk([pk for pk, _score in results])
+
+        self.assertEqual(
+            set([entries[pk].object_id for pk, _score in results]),
+            set([1, 2]),
+        )
+
+        # All terms must match (by prefix)
+        results = SearchIndex.search('sock scre', models=['part.part'])
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(SearchEntry.objects.get(pk=results[0][0]).object_id, 2)
+
+        self.assertEqual(SearchIndex.search('', models=['part.part']), [])
+        self.assertEqual(SearchIndex.search('zzzzz'), [])
+
+    def test_update(self):
+
+        part = Part.objects.get(pk=1)
+        part.name = 'Flanged hexagonal bolt'
+        part.save()
+
+        results = SearchIndex.search('flanged', models=['part.part'])
+
+        self.assertEqual(len(results), 1)
+
+        entry = SearchEntry.objects.get(pk=results[0][0])
+
+        self.assertEqual(entry.model, 'part.part')
+        self.assertEqual(entry.object_id, 1)
+
+        # Stock items (which include the name of the part) are updated by the background worker
+        self.assertFalse(SearchEntry.objects.filter(model='stock.stockitem', text__contains='flanged').exists())
+
+        update_dependents('part.part', 1)
+
+        self.assertTrue(SearchEntry.objects.filter(model='stock.stockitem', text__contains='flanged').exists())
+
+        part = Part.objects.create(name='Spring washer', description='A new part')
+
+        self.assertEqual(len(SearchIndex.search('spring wash')), 1)
+
+        part.delete()
+
+        self.assertEqual(SearchIndex.search('spring wash'), [])
+
+    def test_bulk_operations(self):
+        """
+        Stock items created or changed using bulk operations are indexed
+        """
+
+        item = StockItem.objects.get(pk=100)
+
+        items = item.bulkSerialize(['XQ-9001'], self.user)
+
+        results = SearchIndex.search('XQ-9001', models=['stock.stockitem'])
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(SearchEntry.objects.get(pk=results[0][0]).object_id, items[0].pk)
+
+        location = StockLocation.objects.create(name='Quarantine')
+
+        adjustment = StockAdjustment(self.user)
+
+        for item in adjustment.load_items([1, 2]).values():
+            adjustment.move(item, location)
+
+        adjustment.save()
+
+        results = SearchIndex.search('quarantine', models=['stock.stockitem'])
+
+        self.assertEqual(
+            set([SearchEntry.objects.get(pk=pk).object_id for pk, _score in results]),
+            set([1, 2]),
+        )
+
+    def test_api(self):
+
+        url = reverse('api-search')
+
+        self.assertEqual(url, '/api/search/')
+
+        # Revoke permission to view anything other than parts
+        # (new rulesets are created with "view" permission by default)
+        self.group.rule_sets.exclude(name='part').update(can_view=False)
+
+        response = self.get(url, {'search': 'resistor'})
+
+        self.assertEqual(response.status_code, 200)
+
+        n = len(response.data)
+
+        self.assertTrue(set([3, 4]).issubset(set([result['pk'] for result in response.data])))
+
+        # Only models which the user has permission to view are returned
+        for result in response.data:
+            self.assertEqual(result['model'], 'part.part')
+
+        response = self.get(url, {'search': 'resistor', 'limit': 1})
+
+        self.assertEqual(response.data['count'], n)
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.get(url, {'search': 'resistor', 'models': 'stock.stockitem'})
+
+        self.assertEqual(len(response.data), 0)
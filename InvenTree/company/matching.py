@@ -0,0 +1,168 @@
+"""
+Matching of uploaded data against SupplierPart objects.
+
+When a file (e.g. a purchase order) is uploaded, each row is matched
+against the parts provided by the supplier, using the supplier SKU
+or the manufacturer MPN. Performing a "contains" query for each row
+requires up to two full table scans per row.
+
+The SupplierPartResolver class loads the SKU and MPN values for a set of supplier parts
+(in a single query), and matches values in memory:
+
+- Exact (case insensitive) matches are checked first
+- Normalized values (ignoring case, whitespace and punctuation) are matched by prefix
+- Only values which cannot be matched in memory fall back to a database "contains" query
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import bisect
+import re
+
+from company import models as CompanyModels
+
+
+def normalize(value):
+    """
+    Normalize a SKU or MPN value for matching.
+
+    Case, whitespace and punctuation characters are ignored.
+    """
+
+    return re.sub(r'[\W_]', '', str(value)).upper()
+
+
+class ValueLookup:
+    """
+    In-memory lookup of supplier parts by a single value (e.g. SKU)
+    """
+
+    def __init__(self):
+
+        # Map of (upper case) value -> set of supplier parts
+        self.exact = {}
+
+        # Sorted list of (normalized value, supplier part pk)
+        self.normalized = []
+
+    def add(self, value, item):
+
+        if not value:
+            return
+
+        self.exact.setdefault(str(value).strip().upper(), set()).add(item.pk)
+        self.normalized.append((normalize(value), item.pk))
+
+    def sort(self):
+
+        self.normalized.sort()
+
+    def find(self, value):
+        """
+        Return the set of supplier part pk values which match the provided value
+        """
+
+        matches = self.exact.get(str(value).strip().upper(), None)
+
+        if matches:
+            return matches
+
+        value = normalize(value)
+
+        if len(value) == 0:
+            return set()
+
+        matches = set()
+
+        idx = bisect.bisect_left(self.normalized, (value, ))
+
+        while idx < len(self.normalized) and self.normalized[idx][0].startswith(value):
+            matches.add(self.normalized[idx][1])
+            idx += 1
+
+        return matches
+
+
+class SupplierPartResolver:
+    """
+    Resolve SKU and MPN values to SupplierPart objects.
+
+    Args:
+        queryset: SupplierPart queryset to match against (e.g. all parts for a given supplier)
+
+    Usage:
+        resolver = SupplierPartResolver(SupplierPart.objects.filter(supplier=supplier))
+        supplier_part = resolver.resolve(sku='ABC-123')
+    """
+
+    def __init__(self, queryset):
+
+        self.queryset = queryset
+
+        self.items = {}
+
+        self.sku = ValueLookup()
+        self.mpn = ValueLookup()
+
+        for item in queryset.select_related('manufacturer_part'):
+            self.items[item.pk] = item
+
+            self.sku.add(item.SKU, item)
+
+            if item.manufacturer_part is not None:
+                self.mpn.add(item.manufacturer_part.MPN, item)
+
+        self.sku.sort()
+        self.mpn.sort()
+
+    def match(self, lookup, value):
+        """
+        Return the supplier part which uniquely matches the value (or None)
+        """
+
+        if not value:
+            return None
+
+        matches = lookup.find(value)
+
+        if len(matches) == 1:
+            return self.items[next(iter(matches))]
+
+        return None
+
+    def fallback(self, **kwargs):
+        """
+        Fallback to a database "contains" query (only if exactly one item matches)
+        """
+
+        try:
+            return self.queryset.get(**kwargs)
+        except (ValueError, CompanyModels.SupplierPart.DoesNotExist, CompanyModels.SupplierPart.MultipleObjectsReturned):
+            return None
+
+    def resolve(self, sku=None, mpn=None):
+        """
+        Return the SupplierPart which matches the provided SKU and/or MPN value.
+
+        In-memory matches are checked first (SKU then MPN),
+        then the database is queried for any part which contains the value.
+
+        Returns None if the values do not match a single SupplierPart
+        """
+
+        sku = str(sku).strip() if sku else ''
+        mpn = str(mpn).strip() if mpn else ''
+
+        item = self.match(self.sku, sku) or self.match(self.mpn, mpn)
+
+        if item is not None:
+            return item
+
+        if sku:
+            item = self.fallback(SKU__contains=sku)
+
+        if item is None and mpn:
+            item = self.fallback(manufacturer_part__MPN__contains=mpn)
+
+        return item
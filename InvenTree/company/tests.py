@@ -9,6 +9,7 @@ from decimal import Decimal
 
 from .models import Company, Contact, ManufacturerPart, SupplierPart
 from .models import rename_company_image
+from .matching import SupplierPartResolver
 from part.models import Part
 
 
@@ -210,3 +211,53 @@ class ManufacturerPartSimpleTest(TestCase):
         Part.objects.get(pk=self.part.id).delete()
         # Check that ManufacturerPart was deleted
         self.assertEqual(ManufacturerPart.objects.count(), 3)
+
+
+class SupplierPartResolverTest(TestCase):
+
+    fixtures = [
+        'company',
+        'category',
+        'part',
+        'location',
+        'manufacturer_part',
+        'supplier_part',
+    ]
+
+    def test_resolve_sku(self):
+
+        with self.assertNumQueries(1):
+            resolver = SupplierPartResolver(SupplierPart.objects.filter(supplier=1))
+
+        with self.assertNumQueries(0):
+            # Exact match (case insensitive)
+            self.assertEqual(resolver.resolve(sku='acme0001').pk, 1)
+            self.assertEqual(resolver.resolve(sku='ACME0001').pk, 1)
+
+            # Whitespace and punctuation are ignored
+            self.assertEqual(resolver.resolve(sku=' ACME 0002 ').pk, 2)
+            self.assertEqual(resolver.resolve(sku='acme_widget').pk, 100)
+
+            # Unique prefix
+            self.assertEqual(resolver.resolve(sku='ACME-W').pk, 100)
+
+        # Value is contained within a single SKU (database fallback)
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver.resolve(sku='WIDGET').pk, 100)
+
+        # Ambiguous values do not match
+        self.assertIsNone(resolver.resolve(sku='ACME000'))
+        self.assertIsNone(resolver.resolve(sku='ZERGLPHS'))
+        self.assertIsNone(resolver.resolve(sku=''))
+
+    def test_resolve_mpn(self):
+
+        resolver = SupplierPartResolver(SupplierPart.objects.filter(supplier=2))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.resolve(mpn='mpn456').pk, 10)
+
+            # SKU values are checked before MPN values
+            self.assertEqual(resolver.resolve(sku='ZERGM312', mpn='MPN456').pk, 4)
+
+        self.assertIsNone(resolver.resolve(mpn='MPN123'))
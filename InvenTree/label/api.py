@@ -3,7 +3,6 @@ from __future__ import unicode_literals
 
 from django.utils.translation import ugettext_lazy as _
 from django.conf.urls import url, include
-from django.core.exceptions import ValidationError, FieldError
 from django.http import HttpResponse
 
 from django_filters.rest_framework import DjangoFilterBackend
@@ -17,6 +16,7 @@ import common.models
 from stock.models import StockItem, StockLocation
 
 from .models import StockItemLabel, StockLocationLabel
+from .rendering import LabelRenderer
 from .serializers import StockItemLabelSerializer, StockLocationLabelSerializer
 
 
@@ -58,27 +58,10 @@ class LabelPrintMixin:
 
             return Response(data, status=400)
 
-        outputs = []
-
         # In debug mode, generate single HTML output, rather than PDF
         debug_mode = common.models.InvenTreeSetting.get_setting('REPORT_DEBUG_MODE')
 
-        label_name = "label.pdf"
-
-        # Merge one or more PDF files into a single download
-        for item in items_to_print:
-            label = self.get_object()
-            label.object_to_print = item
-
-            label_name = label.generate_filename(request)
-
-            if debug_mode:
-                outputs.append(label.render_as_string(request))
-            else:
-                outputs.append(label.render(request))
-
-        if not label_name.endswith(".pdf"):
-            label_name += ".pdf"
+        renderer = LabelRenderer(self.get_object(), request)
 
         if debug_mode:
             """
@@ -86,7 +69,7 @@ class LabelPrintMixin:
             and return the string as a HTML response.
             """
 
-            html = "\n".join(outputs)
+            html = renderer.render_as_string(items_to_print)
 
             return HttpResponse(html)
         else:
@@ -95,18 +78,12 @@ class LabelPrintMixin:
             and return the resulting document!
             """
 
-            pages = []
+            pdf = renderer.render_pdf(items_to_print)
 
-            if len(outputs) > 1:
-                # If more than one output is generated, merge them into a single file
-                for output in outputs:
-                    doc = output.get_document()
-                    for page in doc.pages:
-                        pages.append(page)
+            label_name = renderer.filename
 
-                pdf = outputs[0].get_document().copy(pages).write_pdf()
-            else:
-                pdf = outputs[0].get_document().write_pdf()
+            if not label_name.endswith(".pdf"):
+                label_name += ".pdf"
 
             return InvenTree.helpers.DownloadFile(
                 pdf,
@@ -175,47 +152,16 @@ class StockItemLabelList(LabelListView, StockItemLabelMixin):
         # We wish to filter by stock items
         if len(items) > 0:
             """
-            At this point, we are basically forced to be inefficient,
-            as we need to compare the 'filters' string of each label,
-            and see if it matches against each of the requested items.
+            We wish to filter by stock items.
 
-            TODO: In the future, if this becomes excessively slow, it
-                  will need to be readdressed.
+            The 'filters' string of each label is evaluated against
+            the entire set of requested stock items (a single query per label).
             """
 
-            # Keep track of which labels match every specified stockitem
-            valid_label_ids = set()
-
-            for label in queryset.all():
-
-                matches = True
-
-                # Filter string defined for the StockItemLabel object
-                try:
-                    filters = InvenTree.helpers.validateFilterString(label.filters)
-                except ValidationError:
-                    continue
-
-                for item in items:
-
-                    item_query = StockItem.objects.filter(pk=item.pk)
-
-                    try:
-                        if not item_query.filter(**filters).exists():
-                            matches = False
-                            break
-                    except FieldError:
-                        matches = False
-                        break
-
-                # Matched all items
-                if matches:
-                    valid_label_ids.add(label.pk)
-                else:
-                    continue
+            valid_label_ids = InvenTree.helpers.getMatchingTemplates(queryset.all(), StockItem, items)
 
             # Reduce queryset to only valid matches
-            queryset = queryset.filter(pk__in=[pk for pk in valid_label_ids])
+            queryset = queryset.filter(pk__in=valid_label_ids)
 
         return queryset
 
@@ -307,47 +253,16 @@ class StockLocationLabelList(LabelListView, StockLocationLabelMixin):
         # We wish to filter by stock location(s)
         if len(locations) > 0:
             """
-            At this point, we are basically forced to be inefficient,
-            as we need to compare the 'filters' string of each label,
-            and see if it matches against each of the requested items.
+            We wish to filter by stock locations.
 
-            TODO: In the future, if this becomes excessively slow, it
-                  will need to be readdressed.
+            The 'filters' string of each label is evaluated against
+            the entire set of requested stock locations (a single query per label).
             """
 
-            valid_label_ids = set()
-
-            for label in queryset.all():
-
-                matches = True
-
-                # Filter string defined for the StockLocationLabel object
-                try:
-                    filters = InvenTree.helpers.validateFilterString(label.filters)
-                except:
-                    # Skip if there was an error validating the filters...
-                    continue
-
-                for loc in locations:
-
-                    loc_query = StockLocation.objects.filter(pk=loc.pk)
-
-                    try:
-                        if not loc_query.filter(**filters).exists():
-                            matches = False
-                            break
-                    except FieldError:
-                        matches = False
-                        break
-
-                # Matched all items
-                if matches:
-                    valid_label_ids.add(label.pk)
-                else:
-                    continue
+            valid_label_ids = InvenTree.helpers.getMatchingTemplates(queryset.all(), StockLocation, locations)
 
             # Reduce queryset to only valid matches
-            queryset = queryset.filter(pk__in=[pk for pk in valid_label_ids])
+            queryset = queryset.filter(pk__in=valid_label_ids)
 
         return queryset
 
@@ -161,6 +161,26 @@ class LabelTemplate(models.Model):
 
         return template
 
+    def get_template_version(self):
+        """
+        Return a version string for this label template,
+        which changes whenever the template file (or label dimensions) are updated.
+        """
+
+        try:
+            modified = os.path.getmtime(self.template_name)
+        except OSError:
+            modified = None
+
+        return "{cls}:{pk}:{name}:{modified}:{w}:{h}".format(
+            cls=self.__class__.__name__,
+            pk=self.pk,
+            name=self.label.name,
+            modified=modified,
+            w=self.width,
+            h=self.height,
+        )
+
     def get_context_data(self, request):
         """
         Supply custom context data to the template for rendering.
@@ -0,0 +1,202 @@
+"""
+Rendering pipeline for printing labels.
+
+Printing a label against multiple items previously rendered each label
+via a separate WeasyTemplateResponse, which re-loaded the template file,
+generated the context data twice (once for the filename),
+and then rendered each document a second time when merging the output pages.
+
+The LabelRenderer class:
+
+- Loads and compiles the label template once per print job
+- Generates the context data once for each item
+- Renders each label document once, and merges the pages in a single pass
+- Caches the rendered PDF output (within a fixed memory budget),
+  so that re-printing unchanged labels is fast
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import logging
+import sys
+import threading
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.template import Template, Context
+from django.template.loader import get_template
+
+try:
+    import weasyprint
+    from django_weasyprint.utils import django_url_fetcher
+except OSError as err:
+    print("OSError: {e}".format(e=err))
+    print("You may require some further system packages to be installed.")
+    sys.exit(1)
+
+
+logger = logging.getLogger("inventree")
+
+
+# Maximum total size (in bytes) of the rendered label PDF files which are retained in memory
+LABEL_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+class LabelOutputCache:
+    """
+    Least-recently-used cache of rendered label PDF files.
+
+    The cache is limited by the total size of the stored files (rather than the number of entries),
+    and is stored in memory (per process).
+    """
+
+    def __init__(self, max_bytes=LABEL_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.files = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+
+        with self.lock:
+            data = self.files.get(key, None)
+
+            if data is not None:
+                self.files.move_to_end(key)
+
+            return data
+
+    def set(self, key, data):
+
+        # Files larger than the entire cache are not stored
+        if len(data) > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.files.pop(key, None)
+
+            if previous is not None:
+                self.size -= len(previous)
+
+            self.files[key] = data
+            self.size += len(data)
+
+            while self.size > self.max_bytes:
+                _key, old = self.files.popitem(last=False)
+                self.size -= len(old)
+
+    def clear(self):
+
+        with self.lock:
+            self.files.clear()
+            self.size = 0
+
+
+label_cache = LabelOutputCache()
+
+
+class LabelRenderer:
+    """
+    Render a label template against multiple items.
+
+    Args:
+        label: LabelTemplate instance
+        request: The request which initiated the print job
+    """
+
+    def __init__(self, label, request):
+
+        self.label = label
+        self.request = request
+
+        # Compile the label template (only once for the entire print job)
+        self.template = get_template(label.template_name)
+        self.filename_template = Template(label.filename_pattern)
+
+        self.version = label.get_template_version()
+
+        self.base_url = getattr(settings, 'WEASYPRINT_BASEURL', request.build_absolute_uri('/'))
+
+        self.filename = 'label.pdf'
+
+    def render_html(self, item):
+        """
+        Render the label template (as a HTML string) for a single item
+        """
+
+        self.label.object_to_print = item
+
+        context = self.label.context(self.request)
+
+        # The filename is generated from the context data of the last item printed
+        self.filename = self.filename_template.render(Context(context))
+
+        return self.template.render(context, self.request)
+
+    def cache_key(self, item, html):
+        """
+        Construct the cache key for a single rendered label.
+
+        The key includes the template version, the item (and the time it was last updated),
+        and a digest of the rendered HTML (which captures any other changes in context data).
+        """
+
+        digest = hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+        return (
+            self.version,
+            item.__class__.__name__,
+            item.pk,
+            str(getattr(item, 'updated', None)),
+            digest,
+        )
+
+    def render_document(self, html):
+        """
+        Render the label document for a single item
+        """
+
+        return weasyprint.HTML(
+            string=html,
+            base_url=self.base_url,
+            url_fetcher=django_url_fetcher,
+        ).render()
+
+    def render_as_string(self, items):
+        """
+        Render all items into a single HTML string (for debug mode)
+        """
+
+        return "\n".join([self.render_html(item) for item in items])
+
+    def render_pdf(self, items):
+        """
+        Render all items and merge the pages into a single PDF file.
+
+        Returns the PDF data (as bytes)
+        """
+
+        html = [self.render_html(item) for item in items]
+
+        # The output is cached against the labels for *all* of the items
+        keys = [self.cache_key(item, text) for item, text in zip(items, html)]
+        key = hashlib.sha1(repr(keys).encode('utf-8')).hexdigest()
+
+        pdf = label_cache.get(key)
+
+        if pdf is None:
+            documents = [self.render_document(text) for text in html]
+
+            pages = []
+
+            for document in documents:
+                pages += document.pages
+
+            pdf = documents[0].copy(pages).write_pdf()
+
+            label_cache.set(key, pdf)
+
+        return pdf
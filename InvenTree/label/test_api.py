@@ -3,10 +3,17 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from django.core.files.base import ContentFile
+from django.test import RequestFactory
 from django.urls import reverse
 
 from InvenTree.api_tester import InvenTreeAPITestCase
 
+from stock.models import StockItem
+
+from .models import StockItemLabel
+from .rendering import LabelRenderer, label_cache
+
 
 class TestReportTests(InvenTreeAPITestCase):
     """
@@ -66,3 +73,94 @@ class TestReportTests(InvenTreeAPITestCase):
                 'items': [10, 11, 12],
             }
         )
+
+
+class LabelPrintTest(InvenTreeAPITestCase):
+    """
+    Tests for rendering and printing StockItem labels
+    """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'stock',
+    ]
+
+    roles = [
+        'stock.view',
+    ]
+
+    def setUp(self):
+
+        super().setUp()
+
+        self.label = StockItemLabel.objects.create(
+            name='Test label',
+            description='Label for testing the print endpoint',
+            filename_pattern='item-{{ item.pk }}.pdf',
+        )
+
+        self.label.label.save(
+            'test_print_label.html',
+            ContentFile(b'<html><body>{{ name }} - {{ quantity }}</body></html>'),
+        )
+
+        label_cache.clear()
+
+    def tearDown(self):
+
+        self.label.label.delete(save=False)
+        label_cache.clear()
+
+        super().tearDown()
+
+    def test_renderer(self):
+        """
+        Test the LabelRenderer class directly
+        """
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        items = list(StockItem.objects.filter(pk__in=[100, 101]).order_by('pk'))
+
+        renderer = LabelRenderer(self.label, request)
+
+        html = renderer.render_as_string(items)
+
+        for item in items:
+            self.assertIn(item.part.full_name, html)
+
+        # Filename is generated from the last item printed
+        self.assertEqual(renderer.filename, 'item-101.pdf')
+
+        pdf = renderer.render_pdf(items)
+
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+        # Re-printing the same labels returns the cached output
+        self.assertIs(LabelRenderer(self.label, request).render_pdf(items), pdf)
+
+        # Changed items are rendered again
+        items[0].quantity += 1
+        items[0].save()
+
+        self.assertIsNot(LabelRenderer(self.label, request).render_pdf(items), pdf)
+
+    def test_print(self):
+        """
+        Test the label print API endpoint
+        """
+
+        url = reverse('api-stockitem-label-print', kwargs={'pk': self.label.pk})
+
+        # No valid items provided
+        self.get(url, {'items[]': [999999]}, code=400)
+
+        response = self.get(url, {'items[]': [100, 101]})
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('item-101.pdf', response['Content-Disposition'])
+
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
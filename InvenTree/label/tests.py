@@ -5,13 +5,17 @@ from __future__ import unicode_literals
 
 import os
 
+from types import SimpleNamespace
+
 from django.test import TestCase
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
-from InvenTree.helpers import validateFilterString
+from InvenTree.helpers import validateFilterString, getMatchingTemplates
+from InvenTree.matching import TEMPLATE_INDEX_MAX_AGE, get_template_index
 
 from .models import StockItemLabel, StockLocationLabel
+from .rendering import LabelOutputCache
 from stock.models import StockItem
 
 
@@ -74,3 +78,162 @@ class LabelTest(TestCase):
 
         with self.assertRaises(ValidationError):
             validateFilterString(bad_filter_string, model=StockItem)
+
+    def test_output_cache(self):
+        """
+        Test that the rendered label cache discards the least-recently-used files
+        """
+
+        cache = LabelOutputCache(max_bytes=30)
+
+        for idx in range(3):
+            cache.set(idx, bytes(10))
+
+        # Access the first file, so it is no longer the least-recently-used
+        self.assertEqual(cache.get(0), bytes(10))
+
+        cache.set(3, bytes(10))
+
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.size, 30)
+
+        for idx in [0, 2, 3]:
+            self.assertEqual(cache.get(idx), bytes(10))
+
+        # A larger file displaces multiple entries
+        cache.set(4, bytes(25))
+
+        self.assertEqual(cache.size, 25)
+        self.assertIsNone(cache.get(0))
+        self.assertIsNone(cache.get(3))
+
+        # Files larger than the cache are not stored
+        cache.set(5, bytes(31))
+
+        self.assertIsNone(cache.get(5))
+        self.assertEqual(cache.get(4), bytes(25))
+
+        cache.clear()
+
+        self.assertIsNone(cache.get(4))
+        self.assertEqual(cache.size, 0)
+
+
+class LabelFilterTest(TestCase):
+    """
+    Tests for matching label filters against multiple items
+    """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'stock',
+    ]
+
+    def test_matching(self):
+
+        templates = [
+            SimpleNamespace(pk=1, filters=''),
+            SimpleNamespace(pk=2, filters='part=25'),
+            SimpleNamespace(pk=3, filters='part=25, batch=B1234'),
+            SimpleNamespace(pk=4, filters='part_pk=10'),
+            SimpleNamespace(pk=5, filters='not a filter'),
+        ]
+
+        items = list(StockItem.objects.filter(pk__in=[100, 101, 102]))
+
+        # A single query for each template with valid filters
+        with self.assertNumQueries(2):
+            matches = getMatchingTemplates(templates, StockItem, items)
+
+        self.assertEqual(matches, set([1, 2]))
+
+        self.assertEqual(getMatchingTemplates(templates, StockItem, [100]), set([1, 2, 3]))
+
+
+class LabelIndexTest(TestCase):
+    """
+    Tests for matching enabled label templates against a single item
+    """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'stock',
+    ]
+
+    def setUp(self):
+
+        filters = [
+            '',
+            'part=25',
+            'part__pk=1',
+            'part=25, batch=B1234',
+            'part__name=M2x4 LPHS',
+            'location__name=Bathroom',
+            'part_pk=10',
+            'not a filter',
+        ]
+
+        for idx, value in enumerate(filters):
+            StockItemLabel.objects.create(
+                name=f'Label {idx}',
+                label=f'label_{idx}.html',
+                filters=value,
+            )
+
+        StockItemLabel.objects.create(name='Disabled', label='label_disabled.html', enabled=False)
+
+    def test_matching(self):
+
+        for item in StockItem.objects.all():
+
+            expected = [
+                lbl.pk for lbl in StockItemLabel.objects.filter(enabled=True).order_by('pk') if lbl.matches_stock_item(item)
+            ]
+
+            self.assertEqual([lbl.pk for lbl in item.available_labels()], expected)
+
+    def test_queries(self):
+
+        item = StockItem.objects.get(pk=1)
+
+        # Load the templates, and a single query for the filters which cannot be evaluated in memory
+        with self.assertNumQueries(2):
+            labels = item.available_labels()
+
+        self.assertTrue(len(labels) > 0)
+
+        # Compiled templates are re-used
+        with self.assertNumQueries(1):
+            self.assertEqual(item.available_labels(), labels)
+
+        # Changing the templates invalidates the compiled templates
+        lbl = StockItemLabel.objects.create(name='New label', label='label_new.html', filters='part=1')
+
+        self.assertIn(lbl, item.available_labels())
+
+        lbl.enabled = False
+        lbl.save()
+
+        self.assertNotIn(lbl, item.available_labels())
+
+    def test_max_age(self):
+
+        item = StockItem.objects.get(pk=1)
+
+        labels = item.available_labels()
+
+        self.assertTrue(len(labels) > 0)
+
+        # Changes which do not send a signal (e.g. made by another server process)
+        StockItemLabel.objects.filter(pk=labels[0].pk).update(enabled=False)
+
+        self.assertIn(labels[0], item.available_labels())
+
+        # Compiled templates are reloaded once they expire
+        get_template_index(StockItemLabel, StockItem).loaded -= TEMPLATE_INDEX_MAX_AGE + 1
+
+        self.assertNotIn(labels[0], item.available_labels())
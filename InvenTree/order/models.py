@@ -9,6 +9,8 @@ from datetime import datetime
 from decimal import Decimal
 
 from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.db.models import Q, F, Sum
 from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
@@ -876,3 +878,41 @@ class SalesOrderAllocation(models.Model):
         # (It may have changed if the stock was split)
         self.item = item
         self.save()
+
+
+@receiver(post_save, sender=PurchaseOrder, dispatch_uid='purchase_order_post_save_quantities')
+def after_purchase_order_save(sender, instance, **kwargs):
+    """
+    Update the cached 'on order' quantities for all parts on the order
+    (the order status may have changed)
+    """
+
+    parts = SupplierPart.objects.filter(purchase_order_line_items__order=instance).values_list('part', flat=True).distinct()
+
+    for part_id in parts:
+        PartModels.update_part_quantities(part_id, 'ordering')
+
+
+@receiver(post_save, sender=PurchaseOrderLineItem, dispatch_uid='purchase_order_line_post_save_quantities')
+@receiver(post_delete, sender=PurchaseOrderLineItem, dispatch_uid='purchase_order_line_post_delete_quantities')
+def after_purchase_order_line_change(sender, instance, **kwargs):
+    """
+    Update the cached 'on order' quantity for the Part
+    """
+
+    part_id = SupplierPart.objects.filter(pk=instance.part_id).values_list('part', flat=True).first()
+
+    PartModels.update_part_quantities(part_id, 'ordering')
+
+
+@receiver(post_save, sender=SalesOrderAllocation, dispatch_uid='sales_order_allocation_post_save_quantities')
+@receiver(post_delete, sender=SalesOrderAllocation, dispatch_uid='sales_order_allocation_post_delete_quantities')
+def after_sales_order_allocation_change(sender, instance, **kwargs):
+    """
+    Update the cached 'allocated' quantity for the allocated Part
+    """
+
+    # Note: The StockItem may have already been deleted
+    part_id = stock_models.StockItem.objects.filter(pk=instance.item_id).values_list('part', flat=True).first()
+
+    PartModels.update_part_quantities(part_id, 'allocated')
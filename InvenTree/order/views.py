@@ -26,8 +26,10 @@ from .models import SalesOrderAllocation
 from .admin import POLineItemResource
 from build.models import Build
 from company.models import Company, SupplierPart  # ManufacturerPart
+from company.matching import SupplierPartResolver
 from stock.models import StockItem, StockLocation
 from part.models import Part
+from part import matching as part_matching
 
 from common.models import InvenTreeSetting
 from common.views import FileManagementFormView
@@ -616,10 +618,16 @@ class PurchaseOrderUpload(FileManagementFormView):
 
         self.allowed_items = SupplierPart.objects.filter(supplier=order.supplier).prefetch_related('manufacturer_part')
 
+        # Load the SKU and MPN values for all supplier parts (in a single query)
+        resolver = SupplierPartResolver(self.allowed_items)
+
+        allowed_parts = set([item.part_id for item in resolver.items.values()])
+
         # Fields prefixed with "Part_" can be used to do "smart matching" against Part objects in the database
         q_idx = self.get_column_index('Quantity')
         s_idx = self.get_column_index('Supplier_SKU')
         m_idx = self.get_column_index('Manufacturer_MPN')
+        name_idx = self.get_column_index('Part_Name')
         p_idx = self.get_column_index('Purchase_Price')
         r_idx = self.get_column_index('Reference')
         n_idx = self.get_column_index('Notes')
@@ -629,9 +637,6 @@ class PurchaseOrderUpload(FileManagementFormView):
             # Initially use a quantity of zero
             quantity = Decimal(0)
 
-            # Initially we do not have a part to reference
-            exact_match_part = None
-
             # Check if there is a column corresponding to "quantity"
             if q_idx >= 0:
                 q_val = row['data'][q_idx]['cell']
@@ -648,29 +653,25 @@ class PurchaseOrderUpload(FileManagementFormView):
                     except (ValueError, InvalidOperation):
                         pass
 
-            # Check if there is a column corresponding to "Supplier SKU"
-            if s_idx >= 0:
-                sku = row['data'][s_idx]['cell']
-
-                try:
-                    # Attempt SupplierPart lookup based on SKU value
-                    exact_match_part = self.allowed_items.get(SKU__contains=sku)
-                except (ValueError, SupplierPart.DoesNotExist, SupplierPart.MultipleObjectsReturned):
-                    exact_match_part = None
-
-            # Check if there is a column corresponding to "Manufacturer MPN" and no exact match found yet
-            if m_idx >= 0 and not exact_match_part:
-                mpn = row['data'][m_idx]['cell']
+            # Check if there is a column corresponding to "Supplier SKU" or "Manufacturer MPN"
+            sku = row['data'][s_idx]['cell'] if s_idx >= 0 else None
+            mpn = row['data'][m_idx]['cell'] if m_idx >= 0 else None
 
-                try:
-                    # Attempt SupplierPart lookup based on MPN value
-                    exact_match_part = self.allowed_items.get(manufacturer_part__MPN__contains=mpn)
-                except (ValueError, SupplierPart.DoesNotExist, SupplierPart.MultipleObjectsReturned):
-                    exact_match_part = None
+            # Attempt SupplierPart lookup based on SKU value (and then MPN value)
+            exact_match_part = resolver.resolve(sku=sku, mpn=mpn)
 
             # Supply list of part options for each row, sorted by how closely they match the part name
             row['item_options'] = self.allowed_items
 
+            if name_idx >= 0 and not exact_match_part:
+                part_name = row['data'][name_idx]['cell']
+
+                # Score the closest matching parts using the part name index
+                ratios = dict(part_matching.part_name_index.match(part_name, threshold=0, parts=allowed_parts))
+
+                if len(ratios) > 0:
+                    row['item_options'] = sorted(self.allowed_items, key=lambda item: ratios.get(item.part_id, 0), reverse=True)
+
             # Unless found, the 'part_match' is blank
             row['item_match'] = None
 
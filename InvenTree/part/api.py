@@ -7,7 +7,7 @@ from __future__ import unicode_literals
 
 from django_filters.rest_framework import DjangoFilterBackend
 from django.http import JsonResponse
-from django.db.models import Q, F, Count, Min, Max, Avg
+from django.db.models import Q, F, Count
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import status
@@ -15,10 +15,6 @@ from rest_framework.response import Response
 from rest_framework import filters, serializers
 from rest_framework import generics
 
-from djmoney.money import Money
-from djmoney.contrib.exchange.models import convert_money
-from djmoney.contrib.exchange.exceptions import MissingRate
-
 from django.conf.urls import url, include
 from django.urls import reverse
 
@@ -28,17 +24,18 @@ from .models import PartAttachment, PartTestTemplate
 from .models import PartSellPriceBreak
 from .models import PartCategoryParameterTemplate
 
-from common.models import InvenTreeSetting
-from build.models import Build
 
 from . import serializers as part_serializers
+from . import pricing as part_pricing
+from . import shortage as part_shortage
+from . import matching as part_matching
+from . import thumbnails as part_thumbnails
 
 from InvenTree.views import TreeSerializer
+from InvenTree.tree import get_item_counts
 from InvenTree.helpers import str2bool, isNull
 from InvenTree.api import AttachmentMixin
 
-from InvenTree.status_codes import BuildStatus
-
 
 class PartCategoryTree(TreeSerializer):
 
@@ -51,8 +48,8 @@ class PartCategoryTree(TreeSerializer):
     def root_url(self):
         return reverse('part-index')
 
-    def get_items(self):
-        return PartCategory.objects.all().prefetch_related('parts', 'children')
+    def get_item_counts(self):
+        return get_item_counts(Part.objects.all(), 'category')
 
 
 class CategoryList(generics.ListCreateAPIView):
@@ -276,18 +273,137 @@ class PartThumbs(generics.ListAPIView):
         """
         Serialize the available Part images.
         - Images may be used for multiple parts!
+        - The URLs of the (smaller) image variations are provided for display
         """
 
         queryset = self.get_queryset()
 
-        # TODO - We should return the thumbnails here, not the full image!
-
         # Return the most popular parts first
         data = queryset.values(
             'image',
-        ).annotate(count=Count('image')).order_by('-count')
+        ).annotate(count=Count('image')).order_by('-count', 'image')
+
+        page = self.paginate_queryset(data)
+
+        rows = list(page if page is not None else data)
+
+        for row in rows:
+            row.update(part_thumbnails.get_variation_urls(row['image']))
+
+        serializer = self.get_serializer(rows, many=True)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+
+        return Response(serializer.data)
+
+
+class PartShortageList(generics.ListAPIView):
+    """
+    API endpoint for listing parts which do not have sufficient stock
+    to complete all active build orders.
+
+    - GET: Return list of parts, with the total build demand and shortage quantity
+    """
 
-        return Response(data)
+    queryset = Part.objects.all()
+    serializer_class = part_serializers.PartShortageSerializer
+
+    def get_queryset(self):
+
+        queryset = super().get_queryset()
+
+        return part_shortage.get_build_shortages(queryset)
+
+    filter_backends = [
+        DjangoFilterBackend,
+        filters.SearchFilter,
+        filters.OrderingFilter,
+    ]
+
+    filter_fields = [
+        'active',
+        'category',
+    ]
+
+    ordering_fields = [
+        'name',
+        'IPN',
+        'build_demand',
+        'shortage',
+    ]
+
+    ordering = '-shortage'
+
+    search_fields = [
+        'name',
+        'description',
+        'IPN',
+    ]
+
+
+class PartMatch(generics.ListAPIView):
+    """
+    API endpoint for finding parts whose name matches a search term (using fuzzy matching)
+
+    - GET: Return list of matching parts, sorted by match ratio
+
+    Query parameters:
+    - name: The search term to match against part names
+    - threshold: Minimum match ratio (default = 80)
+    - limit: Maximum number of results (default = 10)
+    """
+
+    queryset = Part.objects.all()
+    serializer_class = part_serializers.PartMatchSerializer
+
+    filter_backends = [
+        DjangoFilterBackend,
+    ]
+
+    filter_fields = [
+        'active',
+        'category',
+        'assembly',
+        'component',
+        'purchaseable',
+        'salable',
+    ]
+
+    def list(self, request, *args, **kwargs):
+
+        params = request.query_params
+
+        name = params.get('name', '')
+
+        try:
+            threshold = float(params.get('threshold', 80))
+        except ValueError:
+            threshold = 80
+
+        try:
+            limit = int(params.get('limit', 10))
+        except ValueError:
+            limit = 10
+
+        # Only restrict the search if the queryset is actually filtered
+        queryset = None
+
+        if any([field in params for field in self.filter_fields]):
+            queryset = self.filter_queryset(self.get_queryset())
+
+        matches = part_matching.match_parts(name, threshold=threshold, queryset=queryset, limit=limit)
+
+        parts = []
+
+        for match in matches:
+            part = match['part']
+            part.ratio = match['ratio']
+            parts.append(part)
+
+        serializer = self.get_serializer(parts, many=True)
+
+        return Response(serializer.data)
 
 
 class PartThumbsUpdate(generics.RetrieveUpdateAPIView):
@@ -541,24 +657,12 @@ class PartList(generics.ListCreateAPIView):
         # Filter by whether the BOM has been validated (or not)
         bom_valid = params.get('bom_valid', None)
 
-        # TODO: Querying bom_valid status may be quite expensive
-        # TODO: (It needs to be profiled!)
-        # TODO: It might be worth caching the bom_valid status to a database column
-
         if bom_valid is not None:
 
             bom_valid = str2bool(bom_valid)
 
             # Limit queryset to active assemblies
-            queryset = queryset.filter(active=True, assembly=True)
-
-            pks = []
-
-            for part in queryset:
-                if part.is_bom_valid() == bom_valid:
-                    pks.append(part.pk)
-
-            queryset = queryset.filter(pk__in=pks)
+            queryset = queryset.filter(active=True, assembly=True, bom_valid=bom_valid)
 
         # Filter by 'starred' parts?
         starred = params.get('starred', None)
@@ -633,22 +737,24 @@ class PartList(generics.ListCreateAPIView):
                 # Filter items which have an 'in_stock' level higher than 'minimum_stock'
                 queryset = queryset.filter(Q(in_stock__gte=F('minimum_stock')))
 
+        # Filter by whether the part can be built from available stock
+        can_build = params.get('can_build', None)
+
+        if can_build is not None:
+            can_build = str2bool(can_build)
+
+            if can_build:
+                queryset = queryset.filter(buildable__gt=0)
+            else:
+                queryset = queryset.filter(assembly=True, buildable__lte=0)
+
         # Filter by "parts which need stock to complete build"
         stock_to_build = params.get('stock_to_build', None)
 
-        # TODO: This is super expensive, database query wise...
-        # TODO: Need to figure out a cheaper way of making this filter query
-
         if stock_to_build is not None:
-            # Get active builds
-            builds = Build.objects.filter(status__in=BuildStatus.ACTIVE_CODES)
-            # Store parts with builds needing stock
-            parts_needed_to_complete_builds = []
-            # Filter required parts
-            for build in builds:
-                parts_needed_to_complete_builds += [part.pk for part in build.required_parts_to_complete_build]
+            shortages = part_shortage.get_build_shortages()
 
-            queryset = queryset.filter(pk__in=parts_needed_to_complete_builds)
+            queryset = queryset.filter(pk__in=shortages.values('pk'))
 
         # Optionally limit the maximum number of returned results
         # e.g. for displaying "recent part" list
@@ -688,6 +794,7 @@ class PartList(generics.ListCreateAPIView):
         'creation_date',
         'IPN',
         'in_stock',
+        'buildable',
     ]
 
     # Default ordering
@@ -786,11 +893,21 @@ class BomList(generics.ListCreateAPIView):
         except AttributeError:
             pass
 
+        try:
+            kwargs['include_pricing'] = self.include_pricing()
+        except AttributeError:
+            pass
+
         # Ensure the request context is passed through!
         kwargs['context'] = self.get_serializer_context()
 
         return self.serializer_class(*args, **kwargs)
 
+    def include_pricing(self):
+        """ Determine if BOM pricing information should be included in the response """
+
+        return str2bool(self.request.query_params.get('include_pricing', False))
+
     def get_queryset(self, *args, **kwargs):
 
         queryset = BomItem.objects.all()
@@ -890,59 +1007,27 @@ class BomList(generics.ListCreateAPIView):
             else:
                 queryset = queryset.exclude(pk__in=pks)
 
-        # Annotate with purchase prices
-        queryset = queryset.annotate(
-            purchase_price_min=Min('sub_part__stock_items__purchase_price'),
-            purchase_price_max=Max('sub_part__stock_items__purchase_price'),
-            purchase_price_avg=Avg('sub_part__stock_items__purchase_price'),
+        # Annotate with purchase prices (converted to the default currency)
+        purchase_prices = part_pricing.get_purchase_prices(
+            set([bom_item.sub_part_id for bom_item in queryset])
         )
 
-        # Get values for currencies
-        currencies = queryset.annotate(
-            purchase_price_currency=F('sub_part__stock_items__purchase_price_currency'),
-        ).values('pk', 'sub_part', 'purchase_price_currency')
-
-        def convert_price(price, currency, decimal_places=4):
-            """ Convert price field, returns Money field """
-
-            price_adjusted = None
-
-            # Get default currency from settings
-            default_currency = InvenTreeSetting.get_setting('INVENTREE_DEFAULT_CURRENCY')
-            
-            if price:
-                if currency and default_currency:
-                    try:
-                        # Get adjusted price
-                        price_adjusted = convert_money(Money(price, currency), default_currency)
-                    except MissingRate:
-                        # No conversion rate set
-                        price_adjusted = Money(price, currency)
-                else:
-                    # Currency exists
-                    if currency:
-                        price_adjusted = Money(price, currency)
-                    # Default currency exists
-                    if default_currency:
-                        price_adjusted = Money(price, default_currency)
+        for bom_item in queryset:
+            prices = purchase_prices.get(bom_item.sub_part_id, (None, None, None))
 
-            if price_adjusted and decimal_places:
-                price_adjusted.decimal_places = decimal_places
+            bom_item.purchase_price_min, bom_item.purchase_price_max, bom_item.purchase_price_avg = prices
 
-            return price_adjusted
+        if self.include_pricing():
+            # Price all the sub-parts using a single pricing engine,
+            # so that the BOM tree under the sub-parts is only loaded once
+            pricing = part_pricing.BomPricing([bom_item.sub_part_id for bom_item in queryset])
 
-        # Convert prices to default currency (using backend conversion rates)
-        for bom_item in queryset:
-            # Find associated currency (select first found)
-            purchase_price_currency = None
-            for currency_item in currencies:
-                if currency_item['pk'] == bom_item.pk and currency_item['sub_part'] == bom_item.sub_part.pk:
-                    purchase_price_currency = currency_item['purchase_price_currency']
-                    break
-            # Convert prices
-            bom_item.purchase_price_min = convert_price(bom_item.purchase_price_min, purchase_price_currency)
-            bom_item.purchase_price_max = convert_price(bom_item.purchase_price_max, purchase_price_currency)
-            bom_item.purchase_price_avg = convert_price(bom_item.purchase_price_avg, purchase_price_currency)
+            for bom_item in queryset:
+                bom_item.bom_price_range = part_pricing.get_price_range(
+                    bom_item.sub_part_id,
+                    bom_item.quantity,
+                    engine=pricing
+                )
 
         return queryset
 
@@ -1025,6 +1110,11 @@ part_api_urls = [
         url(r'^.*$', PartParameterList.as_view(), name='api-part-param-list'),
     ])),
 
+    url(r'^shortage/?', PartShortageList.as_view(), name='api-part-shortage-list'),
+
+    # Fuzzy part name matching
+    url(r'^match/?', PartMatch.as_view(), name='api-part-match'),
+
     url(r'^thumbs/', include([
         url(r'^$', PartThumbs.as_view(), name='api-part-thumbs'),
         url(r'^(?P<pk>\d+)/?', PartThumbsUpdate.as_view(), name='api-part-thumbs-update'),
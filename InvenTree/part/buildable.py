@@ -0,0 +1,107 @@
+"""
+Buildable quantity calculations for assembly parts.
+
+The number of assemblies which can be built is limited by the available
+stock of each sub-part in the Bill of Materials:
+
+    can_build = min(floor(available(sub_part) / quantity) for each BOM line)
+
+Calculating this via the Part.can_build property for each assembly in turn
+requires multiple aggregate queries for every BOM line.
+
+Here the calculation is performed entirely in the database,
+using the cached stock and allocation quantities stored against each sub-part.
+The buildable quantity for any number of assemblies can be provided as a
+queryset annotation, or calculated in a single query via get_buildable_quantities()
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models
+from django.db.models import F, Q, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Floor, Greatest
+
+from part import models as PartModels
+
+
+def buildable_subquery():
+    """
+    Construct a subquery expression which returns the buildable quantity
+    for the Part referenced by the outer query.
+
+    - BOM items defined directly against the part are included
+    - Inherited BOM items defined against template parts are included
+    - BOM items with an invalid (zero) quantity are ignored
+    - Parts without a BOM return None
+    """
+
+    bom_items = PartModels.BomItem.objects.filter(
+        Q(part=OuterRef('pk')) | Q(
+            inherited=True,
+            part__tree_id=OuterRef('tree_id'),
+            part__lft__lt=OuterRef('lft'),
+            part__rght__gt=OuterRef('rght'),
+        ),
+        quantity__gt=0,
+    )
+
+    # Available stock for each sub-part (this can never be negative)
+    available = Greatest(
+        F('sub_part__in_stock') - F('sub_part__allocated'),
+        Value(0),
+        output_field=models.DecimalField(),
+    )
+
+    n = Floor(available / F('quantity'), output_field=models.DecimalField())
+
+    # Group all BOM lines together, to calculate the minimum across the entire BOM
+    bom_items = bom_items.order_by().annotate(
+        group=Value(1, output_field=models.IntegerField())
+    ).values('group').annotate(
+        can_build=Min(n)
+    ).values('can_build')
+
+    return Subquery(bom_items, output_field=models.DecimalField())
+
+
+def annotate_buildable(queryset, name='buildable'):
+    """
+    Annotate a Part queryset with the quantity of each part which can be built.
+
+    Parts which do not have a BOM are annotated with zero.
+
+    Note: The default annotation name differs from the Part.can_build property,
+          which cannot be overwritten by a queryset annotation.
+    """
+
+    return queryset.annotate(**{
+        name: Cast(
+            Coalesce(buildable_subquery(), Value(0), output_field=models.DecimalField()),
+            models.IntegerField()
+        )
+    })
+
+
+def get_buildable_quantities(parts):
+    """
+    Calculate the buildable quantity for multiple parts, in a single query.
+
+    Args:
+        parts: List of Part objects (or primary keys)
+
+    Returns:
+        A dict of part pk -> buildable quantity
+    """
+
+    part_ids = set()
+
+    for part in parts:
+        part_ids.add(part.pk if isinstance(part, PartModels.Part) else int(part))
+
+    if len(part_ids) == 0:
+        return {}
+
+    queryset = annotate_buildable(PartModels.Part.objects.filter(pk__in=part_ids))
+
+    return {pk: int(n) for pk, n in queryset.values_list('pk', 'buildable')}
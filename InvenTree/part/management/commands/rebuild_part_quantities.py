@@ -0,0 +1,31 @@
+"""
+Custom management command, rebuild the cached quantities for all parts
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from part.models import Part
+
+
+class Command(BaseCommand):
+    """
+    django command to recalculate the cached stock / allocation / order / build quantities
+    for every Part in the database.
+
+    The cached quantities are kept up to date automatically,
+    but may need to be rebuilt (e.g. after bulk data import).
+    """
+
+    def handle(self, *args, **kwargs):
+
+        self.stdout.write("Rebuilding cached part quantities...")
+
+        n = 0
+
+        with transaction.atomic():
+            for part in Part.objects.all().iterator():
+                part.update_quantities()
+                n += 1
+
+        self.stdout.write(f"Updated quantities for {n} parts")
@@ -0,0 +1,38 @@
+"""
+Custom management command, render missing image variations for all Part images
+"""
+
+from django.core.management.base import BaseCommand
+
+from part.thumbnails import rebuild_variations
+
+
+class Command(BaseCommand):
+    """
+    django command to render the image variations (thumbnail, preview)
+    for every image referenced by a Part.
+
+    Variations are rendered automatically when an image is uploaded,
+    but may be missing (e.g. after images are copied into the media directory,
+    or after a new variation is added).
+    """
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--replace', action='store_true', help='Re-render existing image variations')
+        parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+
+    def handle(self, *args, **kwargs):
+
+        self.stdout.write("Rendering image variations...")
+
+        n = 0
+
+        for file_name, rendered, error in rebuild_variations(replace=kwargs['replace'], workers=kwargs['workers']):
+
+            if error is not None:
+                self.stderr.write(f"Could not render variations for '{file_name}': {error}")
+
+            n += rendered
+
+        self.stdout.write(f"Rendered {n} image variations")
@@ -0,0 +1,274 @@
+"""
+Fuzzy part name matching.
+
+Matching a search term against part names (e.g. when uploading a BOM file,
+or checking for duplicate parts when creating a new part) previously loaded every Part
+from the database and ran a fuzzy comparison against each part name in turn,
+for every search term.
+
+The PartNameIndex class maintains an in-memory n-gram index of part names:
+
+- Candidate parts are selected by counting the n-grams they share with the search term
+- Only a bounded number of candidates are scored using fuzzy string matching
+- The index is built once (per process) and updated incrementally when parts are saved or deleted
+- The index is periodically rebuilt, to pick up changes made by other processes
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+from collections import Counter, defaultdict
+
+from rapidfuzz import fuzz
+
+from part import models as PartModels
+
+
+logger = logging.getLogger("inventree")
+
+
+# Length of the n-grams used to select candidate matches
+NGRAM_SIZE = 3
+
+# Maximum number of candidate parts which are scored for each search term
+MAX_CANDIDATES = 500
+
+# Time (seconds) after which the index is rebuilt from the database
+INDEX_TIMEOUT = 600
+
+
+def normalize(text):
+    """ Normalize a string for matching (case and whitespace insensitive) """
+
+    return ' '.join(str(text).lower().split())
+
+
+def ngrams(text):
+    """
+    Return the set of n-grams for a (normalized) string.
+
+    Each word is padded with whitespace, so that short words still generate n-grams,
+    and word order does not affect the result.
+    """
+
+    grams = set()
+
+    for word in text.split():
+        word = ' ' + word + ' '
+
+        for idx in range(max(len(word) - NGRAM_SIZE + 1, 1)):
+            grams.add(word[idx:idx + NGRAM_SIZE])
+
+    return grams
+
+
+class PartNameIndex:
+    """
+    In-memory n-gram index of part names.
+
+    Usage:
+        index = PartNameIndex()
+        matches = index.match('M2x4 LPHS')
+
+    The index is loaded from the database on first use.
+    """
+
+    def __init__(self, timeout=INDEX_TIMEOUT):
+
+        self.timeout = timeout
+        self.lock = threading.RLock()
+
+        self.clear()
+
+    def clear(self):
+        """ Clear the index (it will be reloaded on next use) """
+
+        with self.lock:
+            # Map of part pk -> normalized part name
+            self.names = {}
+
+            # Map of n-gram -> set of part pk values
+            self.grams = defaultdict(set)
+
+            self.loaded = None
+
+    @property
+    def expired(self):
+
+        return self.loaded is None or (time.time() - self.loaded) > self.timeout
+
+    def load(self):
+        """ Build the index from the database (in a single query) """
+
+        with self.lock:
+            self.clear()
+
+            for pk, name in PartModels.Part.objects.values_list('pk', 'name'):
+                self._add(pk, name)
+
+            self.loaded = time.time()
+
+            logger.debug(f"Loaded part name index ({len(self.names)} parts)")
+
+    def _add(self, pk, name):
+
+        name = normalize(name)
+
+        if len(name) == 0:
+            return
+
+        self.names[pk] = name
+
+        for gram in ngrams(name):
+            self.grams[gram].add(pk)
+
+    def _remove(self, pk):
+
+        name = self.names.pop(pk, None)
+
+        if name is None:
+            return
+
+        for gram in ngrams(name):
+            parts = self.grams.get(gram, None)
+
+            if parts is not None:
+                parts.discard(pk)
+
+                if len(parts) == 0:
+                    del self.grams[gram]
+
+    def update(self, pk, name):
+        """ Add (or update) a single part in the index """
+
+        with self.lock:
+            # Nothing to do if the index has not been loaded yet
+            if self.loaded is None:
+                return
+
+            self._remove(pk)
+            self._add(pk, name)
+
+    def remove(self, pk):
+        """ Remove a single part from the index """
+
+        with self.lock:
+            self._remove(pk)
+
+    def candidates(self, match, parts=None, limit=MAX_CANDIDATES):
+        """
+        Return the pk values of the parts which share the most n-grams with the search term.
+
+        Args:
+            match: Normalized search term
+            parts: Optional set of part pk values to restrict the search to
+            limit: Maximum number of candidates to return
+        """
+
+        counts = Counter()
+
+        for gram in ngrams(match):
+            matched = self.grams.get(gram, None)
+
+            if not matched:
+                continue
+
+            if parts is not None:
+                matched = matched.intersection(parts)
+
+            counts.update(matched)
+
+        return [pk for pk, _count in counts.most_common(limit)]
+
+    def match(self, match, threshold=80, compare_length=False, parts=None, limit=MAX_CANDIDATES):
+        """
+        Return a list of (part pk, ratio) tuples for parts whose name matches the search term.
+
+        Args:
+            match: Term to match against
+            threshold: Match percentage that must be exceeded
+            compare_length: Include string length checks
+            parts: Optional list of part pk values to restrict the search to
+            limit: Maximum number of candidates to score
+
+        Results are sorted by match ratio (highest first)
+        """
+
+        match = normalize(match)
+
+        if len(match) == 0:
+            return []
+
+        if parts is not None:
+            parts = set(parts)
+
+        with self.lock:
+            if self.expired:
+                self.load()
+
+            names = [(pk, self.names[pk]) for pk in self.candidates(match, parts=parts, limit=limit)]
+
+        matches = []
+
+        for pk, compare in names:
+
+            ratio = fuzz.partial_token_sort_ratio(compare, match)
+
+            if compare_length:
+                # Also employ primitive length comparison
+                l_min = min(len(match), len(compare))
+                l_max = max(len(match), len(compare))
+
+                ratio *= (l_min / l_max)
+
+            if ratio >= threshold:
+                matches.append((pk, round(ratio, 1)))
+
+        matches.sort(key=lambda item: item[1], reverse=True)
+
+        return matches
+
+
+part_name_index = PartNameIndex()
+
+
+def match_parts(match, threshold=80, compare_length=False, queryset=None, limit=None):
+    """
+    Return a list of parts whose name matches the search term.
+
+    Args:
+        match: Term to match against
+        threshold: Match percentage that must be exceeded
+        compare_length: Include string length checks
+        queryset: Optional Part queryset to restrict the search to
+        limit: Maximum number of matches to return
+
+    Returns:
+        A list of dict objects (sorted by match ratio) containing:
+            - 'part' : The matched part
+            - 'ratio' : The matched ratio
+    """
+
+    parts = None
+
+    if queryset is not None:
+        parts = queryset.values_list('pk', flat=True)
+
+    matches = part_name_index.match(match, threshold=threshold, compare_length=compare_length, parts=parts)
+
+    if limit is not None:
+        matches = matches[:limit]
+
+    # Load the matching parts in a single query
+    instances = PartModels.Part.objects.in_bulk([pk for pk, _ratio in matches])
+
+    return [
+        {
+            'part': instances[pk],
+            'ratio': ratio,
+        } for pk, ratio in matches if pk in instances
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.4 on 2021-06-20 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('part', '0066_bomitem_allow_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='part',
+            name='allocated',
+            field=models.DecimalField(decimal_places=5, default=0, editable=False, help_text='Quantity allocated to build orders and sales orders (cached)', max_digits=15, verbose_name='Allocated'),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='building',
+            field=models.DecimalField(decimal_places=5, default=0, editable=False, help_text='Quantity being built (cached)', max_digits=15, verbose_name='Building'),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='in_stock',
+            field=models.DecimalField(db_index=True, decimal_places=5, default=0, editable=False, help_text='Total quantity in stock (cached)', max_digits=15, verbose_name='In Stock'),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='ordering',
+            field=models.DecimalField(decimal_places=5, default=0, editable=False, help_text='Quantity on order from suppliers (cached)', max_digits=15, verbose_name='On Order'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.4 on 2021-06-21 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('part', '0067_auto_20210620_1130'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='part',
+            name='bom_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Current BOM checksum (cached, empty if the part has no BOM)', max_length=128, verbose_name='BOM hash'),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='bom_valid',
+            field=models.BooleanField(db_index=True, default=True, editable=False, help_text='Does the stored BOM checksum match the current BOM? (cached)', verbose_name='BOM valid'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.4 on 2021-06-22 08:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_usage_index(apps, schema_editor):
+    """
+    Construct the "where-used" index for all existing BomItem objects
+    """
+
+    Part = apps.get_model('part', 'part')
+    BomItem = apps.get_model('part', 'bomitem')
+    BomUsage = apps.get_model('part', 'bomusage')
+
+    usages = []
+
+    for item in BomItem.objects.all().select_related('part'):
+
+        usages.append(BomUsage(bom_item=item, assembly_id=item.part_id, sub_part_id=item.sub_part_id))
+
+        if item.inherited:
+            # Variants are found using the MPTT tree fields (historical models do not provide MPTT methods)
+            variants = Part.objects.filter(
+                tree_id=item.part.tree_id,
+                lft__gt=item.part.lft,
+                rght__lt=item.part.rght,
+            )
+
+            for variant in variants:
+                usages.append(BomUsage(bom_item=item, assembly=variant, sub_part_id=item.sub_part_id, inherited=True))
+
+    if len(usages) > 0:
+        print(f"\nCreated {len(usages)} BOM usage entries")
+
+    BomUsage.objects.bulk_create(usages)
+
+
+def reverse_usage_index(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('part', '0068_auto_20210621_0915'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BomUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inherited', models.BooleanField(default=False)),
+                ('assembly', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bom_usages', to='part.part')),
+                ('bom_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usages', to='part.bomitem')),
+                ('sub_part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='used_in_usages', to='part.part')),
+            ],
+            options={
+                'unique_together': {('bom_item', 'assembly')},
+            },
+        ),
+        migrations.RunPython(build_usage_index, reverse_code=reverse_usage_index),
+    ]
@@ -19,7 +19,7 @@ from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 
 from django.contrib.auth.models import User
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, post_save, post_delete
 from django.dispatch import receiver
 
 from markdownx.models import MarkdownxField
@@ -32,7 +32,6 @@ from stdimage.models import StdImageField
 
 from decimal import Decimal
 from datetime import datetime
-from rapidfuzz import fuzz
 import hashlib
 
 from InvenTree import helpers
@@ -45,11 +44,14 @@ from InvenTree.status_codes import BuildStatus, PurchaseOrderStatus, SalesOrderS
 
 from build import models as BuildModels
 from order import models as OrderModels
-from company.models import SupplierPart
+from company.models import SupplierPart, SupplierPriceBreak
 from stock import models as StockModels
 
 import common.models
 import part.settings as part_settings
+import part.pricing as part_pricing
+import part.buildable as part_buildable
+import part.matching as part_matching
 
 
 logger = logging.getLogger("inventree")
@@ -232,9 +234,11 @@ def rename_part_image(instance, filename):
 def match_part_names(match, threshold=80, reverse=True, compare_length=False):
     """ Return a list of parts whose name matches the search term using fuzzy search.
 
+    Matching is performed against the in-memory part name index (see part.matching)
+
     Args:
         match: Term to match against
-        threshold: Match percentage that must be exceeded (default = 65)
+        threshold: Match percentage that must be exceeded (default = 80)
         reverse: Ordering for search results (default = True - highest match is first)
         compare_length: Include string length checks
 
@@ -244,38 +248,10 @@ def match_part_names(match, threshold=80, reverse=True, compare_length=False):
             - 'ratio' : The matched ratio
     """
 
-    match = str(match).strip().lower()
-
-    if len(match) == 0:
-        return []
-
-    parts = Part.objects.all()
-
-    matches = []
-
-    for part in parts:
-        compare = str(part.name).strip().lower()
-
-        if len(compare) == 0:
-            continue
-
-        ratio = fuzz.partial_token_sort_ratio(compare, match)
+    matches = part_matching.match_parts(match, threshold=threshold, compare_length=compare_length)
 
-        if compare_length:
-            # Also employ primitive length comparison
-            # TODO - Improve this somewhat...
-            l_min = min(len(match), len(compare))
-            l_max = max(len(match), len(compare))
-
-            ratio *= (l_min / l_max)
-
-        if ratio >= threshold:
-            matches.append({
-                'part': part,
-                'ratio': round(ratio, 1)
-            })
-
-    matches = sorted(matches, key=lambda item: item['ratio'], reverse=reverse)
+    if not reverse:
+        matches.reverse()
 
     return matches
 
@@ -366,9 +342,17 @@ class Part(MPTTModel):
         # Get category templates settings
         add_category_templates = kwargs.pop('add_category_templates', None)
 
+        previous = None
+
         if self.pk:
             previous = Part.objects.get(pk=self.pk)
 
+            # Cached quantities are maintained separately, do not overwrite with stale values
+            for field in self.QUANTITY_FIELDS:
+                setattr(self, field, getattr(previous, field))
+
+            self.bom_hash = previous.bom_hash
+
             # Image has been changed
             if previous.image is not None and not self.image == previous.image:
 
@@ -379,11 +363,37 @@ class Part(MPTTModel):
                     logger.info(f"Deleting unused image file '{previous.image}'")
                     previous.image.delete(save=False)
 
+        # The stored BOM checksum may have been changed
+        self.bom_valid = self.bom_hash in ['', self.bom_checksum]
+
         self.clean()
         self.validate_unique()
 
         super().save(*args, **kwargs)
 
+        if previous is None:
+            variant_changed = self.variant_of_id is not None
+        else:
+            variant_changed = previous.variant_of_id != self.variant_of_id
+
+        if variant_changed:
+            # Inherited BOM items may have changed, for this part and any variants
+            BomUsage.update_inherited(self)
+            update_part_bom_status(self.pk)
+
+            # Stock for this part (and its variants) is counted against the new template, not the previous one
+            # (the templates are reloaded, as the tree structure has changed)
+            if previous is not None:
+                update_part_quantities(previous.variant_of_id, 'in_stock')
+
+            update_part_quantities(self.variant_of_id, 'in_stock')
+
+        if previous is not None:
+            if previous.full_name != self.full_name:
+                # The name of a part forms part of the BOM checksum for any assembly which uses it
+                for assembly in self.get_used_in():
+                    assembly.update_bom_status()
+
         if add_category_templates:
             # Get part category
             category = self.category
@@ -463,6 +473,16 @@ class Part(MPTTModel):
             # And recursively check too
             item.sub_part.checkAddToBOM(parent)
 
+    def get_serialized_stock(self):
+        """
+        Return a queryset of all serialized StockItem objects for this Part.
+
+        Note: Serial numbers must be unique across an entire Part "tree",
+        so here we filter by the entire tree.
+        """
+
+        return StockModels.StockItem.objects.filter(part__tree_id=self.tree_id).exclude(serial=None)
+
     def checkIfSerialNumberExists(self, sn, exclude_self=False):
         """
         Check if a serial number exists for this Part.
@@ -471,9 +491,7 @@ class Part(MPTTModel):
         so here we filter by the entire tree.
         """
 
-        parts = Part.objects.filter(tree_id=self.tree_id)
-
-        stock = StockModels.StockItem.objects.filter(part__in=parts, serial=sn)
+        stock = self.get_serialized_stock().filter(serial=str(sn))
 
         if exclude_self:
             stock = stock.exclude(pk=self.pk)
@@ -483,15 +501,25 @@ class Part(MPTTModel):
     def find_conflicting_serial_numbers(self, serials):
         """
         For a provided list of serials, return a list of those which are conflicting.
+
+        The serial numbers are checked in batches (one query per batch),
+        rather than performing a separate query for each serial number.
         """
 
-        conflicts = []
+        stock = self.get_serialized_stock()
+
+        serials = list(serials)
+
+        existing = set()
+
+        batch_size = 500
 
-        for serial in serials:
-            if self.checkIfSerialNumberExists(serial, exclude_self=True):
-                conflicts.append(serial)
+        for idx in range(0, len(serials), batch_size):
+            batch = [str(serial) for serial in serials[idx:idx + batch_size]]
 
-        return conflicts
+            existing.update(stock.filter(serial__in=batch).values_list('serial', flat=True))
+
+        return [serial for serial in serials if str(serial) in existing]
 
     def getLatestSerialNumber(self):
         """
@@ -502,30 +530,20 @@ class Part(MPTTModel):
 
         Note: Serial numbers must be unique across an entire Part "tree",
         so we filter by the entire tree.
-        """
-
-        parts = Part.objects.filter(tree_id=self.tree_id)
-        stock = StockModels.StockItem.objects.filter(part__in=parts).exclude(serial=None)
 
-        # There are no matchin StockItem objects (skip further tests)
-        if not stock.exists():
-            return None
-
-        # Attempt to coerce the returned serial numbers to integers
-        # If *any* are not integers, fail!
-        try:
-            ordered = sorted(stock.all(), reverse=True, key=lambda n: int(n.serial))
+        Note: The integer value of each serial number is stored (and indexed) in the database,
+        so the highest serial number can be found with a single query.
+        """
 
-            if len(ordered) > 0:
-                return ordered[0].serial
+        stock = self.get_serialized_stock()
 
-        # One or more of the serial numbers was non-numeric
+        # One or more of the serial numbers is non-numeric
         # In this case, the "best" we can do is return the most recent
-        except ValueError:
+        if stock.filter(serial_int=None).exists():
             return stock.last().serial
 
-        # No serial numbers found
-        return None
+        # Return the highest serial number (or None if there are no serialized items)
+        return stock.order_by('-serial_int').values_list('serial', flat=True).first()
 
     def getSerialNumberString(self, quantity=1):
         """
@@ -748,7 +766,10 @@ class Part(MPTTModel):
         upload_to=rename_part_image,
         null=True,
         blank=True,
-        variations={'thumbnail': (128, 128)},
+        variations={
+            'thumbnail': (128, 128),
+            'preview': (256, 256),
+        },
         delete_orphans=False,
         verbose_name=_('Image'),
     )
@@ -822,6 +843,44 @@ class Part(MPTTModel):
         help_text=_('Minimum allowed stock level')
     )
 
+    # Cached quantities, which are updated whenever the underlying data change.
+    # These are used for efficient sorting / filtering of the part list.
+    # The "live" values are available via total_stock, allocation_count(), on_order and quantity_being_built
+    QUANTITY_FIELDS = [
+        'in_stock',
+        'allocated',
+        'ordering',
+        'building',
+    ]
+
+    in_stock = models.DecimalField(
+        max_digits=15, decimal_places=5, default=0,
+        editable=False, db_index=True,
+        verbose_name=_('In Stock'),
+        help_text=_('Total quantity in stock (cached)'),
+    )
+
+    allocated = models.DecimalField(
+        max_digits=15, decimal_places=5, default=0,
+        editable=False,
+        verbose_name=_('Allocated'),
+        help_text=_('Quantity allocated to build orders and sales orders (cached)'),
+    )
+
+    ordering = models.DecimalField(
+        max_digits=15, decimal_places=5, default=0,
+        editable=False,
+        verbose_name=_('On Order'),
+        help_text=_('Quantity on order from suppliers (cached)'),
+    )
+
+    building = models.DecimalField(
+        max_digits=15, decimal_places=5, default=0,
+        editable=False,
+        verbose_name=_('Building'),
+        help_text=_('Quantity being built (cached)'),
+    )
+
     units = models.CharField(
         max_length=20, default="",
         blank=True, null=True,
@@ -879,6 +938,20 @@ class Part(MPTTModel):
 
     bom_checked_date = models.DateField(blank=True, null=True, verbose_name=_('BOM checked date'))
 
+    # Cached BOM status, which is updated whenever the BOM data change.
+    # The "live" status is available via is_bom_valid()
+    bom_hash = models.CharField(
+        max_length=128, blank=True, editable=False,
+        verbose_name=_('BOM hash'),
+        help_text=_('Current BOM checksum (cached, empty if the part has no BOM)'),
+    )
+
+    bom_valid = models.BooleanField(
+        default=True, editable=False, db_index=True,
+        verbose_name=_('BOM valid'),
+        help_text=_('Does the stored BOM checksum match the current BOM? (cached)'),
+    )
+
     creation_date = models.DateField(auto_now_add=True, editable=False, blank=True, null=True, verbose_name=_('Creation Date'))
 
     creation_user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, verbose_name=_('Creation User'), related_name='parts_created')
@@ -1090,32 +1163,7 @@ class Part(MPTTModel):
         """ Return the number of units that can be build with available stock
         """
 
-        # If this part does NOT have a BOM, result is simply the currently available stock
-        if not self.has_bom:
-            return 0
-
-        total = None
-
-        bom_items = self.get_bom_items().prefetch_related('sub_part__stock_items')
-
-        # Calculate the minimum number of parts that can be built using each sub-part
-        for item in bom_items.all():
-            stock = item.sub_part.available_stock
-
-            # If (by some chance) we get here but the BOM item quantity is invalid,
-            # ignore!
-            if item.quantity <= 0:
-                continue
-
-            n = int(stock / item.quantity)
-
-            if total is None or n < total:
-                total = n
-
-        if total is None:
-            total = 0
-
-        return max(total, 0)
+        return part_buildable.get_buildable_quantities([self]).get(self.pk, 0)
 
     @property
     def active_builds(self):
@@ -1249,6 +1297,41 @@ class Part(MPTTModel):
 
         return query['t']
 
+    def update_quantities(self, *fields):
+        """
+        Recalculate the cached quantity fields for this part.
+
+        Args:
+            fields: Names of the fields to update (default = all cached quantity fields)
+
+        Note: The stock quantity of a template part includes the stock of all variants,
+              so the stock quantity of all parent (template) parts are also updated.
+        """
+
+        if len(fields) == 0:
+            fields = self.QUANTITY_FIELDS
+
+        values = {}
+
+        for field in fields:
+            if field == 'in_stock':
+                values[field] = self.total_stock
+            elif field == 'allocated':
+                values[field] = self.allocation_count()
+            elif field == 'ordering':
+                values[field] = self.on_order
+            elif field == 'building':
+                values[field] = self.quantity_being_built
+
+        for field, value in values.items():
+            setattr(self, field, value)
+
+        # Update the database directly, bypassing the custom save() logic
+        Part.objects.filter(pk=self.pk).update(**values)
+
+        if 'in_stock' in fields and self.variant_of is not None:
+            self.variant_of.update_quantities('in_stock')
+
     def get_bom_item_filter(self, include_inherited=True):
         """
         Returns a query filter for all BOM items associated with this Part.
@@ -1309,40 +1392,42 @@ class Part(MPTTModel):
               The Q object is used to filter against a list of Part objects
         """
 
-        # This is pretty expensive - we need to traverse multiple variant lists!
-        # TODO - In the future, could this be improved somehow?
+        usages = BomUsage.objects.filter(sub_part=self)
 
-        # Keep a set of Part ID values
-        parts = set()
+        if not include_inherited:
+            usages = usages.filter(inherited=False)
 
-        # First, grab a list of all BomItem objects which "require" this part
-        bom_items = BomItem.objects.filter(sub_part=self)
+        return Q(id__in=usages.values('assembly'))
 
-        for bom_item in bom_items:
+    def get_used_in(self, include_inherited=True, recursive=False):
+        """
+        Return a queryset containing all parts this part is used in.
 
-            # Add the directly referenced part
-            parts.add(bom_item.part)
+        Includes consideration of inherited BOMs
 
-            # Traverse down the variant tree?
-            if include_inherited and bom_item.inherited:
+        Args:
+            include_inherited: Include assemblies which inherit a BOM item from a template part
+            recursive: Include assemblies which use this part at any level of a multi-level BOM
+        """
 
-                part_variants = bom_item.part.get_descendants(include_self=False)
+        if not recursive:
+            return Part.objects.filter(self.get_used_in_filter(include_inherited=include_inherited))
 
-                for variant in part_variants:
-                    parts.add(variant)
+        usages = BomUsage.objects.all()
 
-        # Turn into a list of valid IDs (for matching against a Part query)
-        part_ids = [part.pk for part in parts]
+        if not include_inherited:
+            usages = usages.filter(inherited=False)
 
-        return Q(id__in=part_ids)
+        # Walk up the BOM tree, one level at a time
+        part_ids = set()
+        frontier = set([self.pk])
 
-    def get_used_in(self, include_inherited=True):
-        """
-        Return a queryset containing all parts this part is used in.
+        while len(frontier) > 0:
+            assemblies = set(usages.filter(sub_part__in=frontier).values_list('assembly', flat=True))
+            frontier = assemblies - part_ids
+            part_ids.update(assemblies)
 
-        Includes consideration of inherited BOMs
-        """
-        return Part.objects.filter(self.get_used_in_filter(include_inherited=include_inherited))
+        return Part.objects.filter(pk__in=part_ids)
 
     @property
     def has_bom(self):
@@ -1396,6 +1481,20 @@ class Part(MPTTModel):
 
         return self.get_bom_hash() == self.bom_checksum or not self.has_bom
 
+    def update_bom_status(self):
+        """
+        Recalculate the cached BOM checksum and validity status for this part.
+
+        Note: This does not update any variant parts which inherit BOM items from this part,
+              use update_part_bom_status() to update an entire variant tree.
+        """
+
+        self.bom_hash = self.get_bom_hash() if self.has_bom else ''
+        self.bom_valid = self.bom_hash in ['', self.bom_checksum]
+
+        # Update the database directly, bypassing the custom save() logic
+        Part.objects.filter(pk=self.pk).update(bom_hash=self.bom_hash, bom_valid=self.bom_valid)
+
     @transaction.atomic
     def validate_bom(self, user):
         """ Validate the BOM (mark the BOM as validated by the given User.
@@ -1467,10 +1566,10 @@ class Part(MPTTModel):
         # Exclude this part
         parts = parts.exclude(id=self.id)
 
-        # Exclude any parts that this part is used *in* (to prevent recursive BOMs)
-        used_in = self.get_used_in().all()
+        # Exclude any parts that this part is used *in*, at any level (to prevent recursive BOMs)
+        used_in = self.get_used_in(recursive=True)
 
-        parts = parts.exclude(id__in=[item.part.id for item in used_in])
+        parts = parts.exclude(id__in=used_in.values('pk'))
 
         return parts
 
@@ -1550,40 +1649,12 @@ class Part(MPTTModel):
 
         Note: If the BOM contains items without pricing information,
         these items cannot be included in the BOM!
-        """
-
-        min_price = None
-        max_price = None
-
-        for item in self.get_bom_items().all().select_related('sub_part'):
 
-            if item.sub_part.pk == self.pk:
-                print("Warning: Item contains itself in BOM")
-                continue
-
-            prices = item.sub_part.get_price_range(quantity * item.quantity)
-
-            if prices is None:
-                continue
-
-            low, high = prices
-
-            if min_price is None:
-                min_price = 0
-
-            if max_price is None:
-                max_price = 0
-
-            min_price += low
-            max_price += high
-
-        if min_price is None or max_price is None:
-            return None
-
-        min_price = normalize(min_price)
-        max_price = normalize(max_price)
+        Note: The multi-level BOM is priced using the BomPricing engine,
+        which loads the entire BOM tree once and prices each sub-part only once.
+        """
 
-        return (min_price, max_price)
+        return part_pricing.BomPricing([self]).get_bom_price_range(self, quantity)
 
     def get_price_range(self, quantity=1, buy=True, bom=True):
 
@@ -1596,20 +1667,7 @@ class Part(MPTTModel):
             Minimum of the supplier price or BOM price. If no pricing available, returns None
         """
 
-        buy_price_range = self.get_supplier_price_range(quantity) if buy else None
-        bom_price_range = self.get_bom_price_range(quantity) if bom else None
-
-        if buy_price_range is None:
-            return bom_price_range
-
-        elif bom_price_range is None:
-            return buy_price_range
-
-        else:
-            return (
-                min(buy_price_range[0], bom_price_range[0]),
-                max(buy_price_range[1], bom_price_range[1])
-            )
+        return part_pricing.BomPricing([self]).get_price_range(self, quantity, buy=buy, bom=bom)
 
     base_cost = models.DecimalField(max_digits=10, decimal_places=3, default=0, validators=[MinValueValidator(0)], verbose_name=_('base cost'), help_text=_('Minimum charge (e.g. stocking fee)'))
 
@@ -1941,6 +1999,24 @@ class Part(MPTTModel):
         return len(self.get_related_parts())
 
 
+@receiver(post_save, sender=Part, dispatch_uid='part_post_save_match_index')
+def after_save_part_match_index(sender, instance, **kwargs):
+    """
+    Update the part name matching index
+    """
+
+    part_matching.part_name_index.update(instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Part, dispatch_uid='part_post_delete_match_index')
+def after_delete_part_match_index(sender, instance, **kwargs):
+    """
+    Remove the deleted part from the part name matching index
+    """
+
+    part_matching.part_name_index.remove(instance.pk)
+
+
 def attach_file(instance, filename):
     """ Function for storing a file for a PartAttachment
 
@@ -2478,7 +2554,11 @@ class BomItem(models.Model):
     def price_range(self):
         """ Return the price-range for this BOM item. """
 
-        prange = self.sub_part.get_price_range(self.quantity)
+        return self.format_price_range(self.sub_part.get_price_range(self.quantity))
+
+    @staticmethod
+    def format_price_range(prange):
+        """ Return a string representation of a (min, max) price range """
 
         if prange is None:
             return prange
@@ -2495,6 +2575,163 @@ class BomItem(models.Model):
         return "{pmin} to {pmax}".format(pmin=pmin, pmax=pmax)
 
 
+class BomUsage(models.Model):
+    """ A BomUsage object records that a part is used in the BOM for an assembly.
+
+    This is a "where-used" index, which allows efficient lookup of all the assemblies
+    which use a particular part, without traversing the variant tree for every BOM item.
+
+    - Each BomItem creates a BomUsage entry for the assembly it is defined against
+    - Inherited BomItems also create a BomUsage entry for each variant of the assembly
+
+    The index is maintained automatically when BomItem objects are changed,
+    or when parts are moved within the variant tree.
+
+    Attributes:
+        bom_item: Link to the BomItem which defines the usage
+        assembly: Link to the assembly part (which uses the sub_part)
+        sub_part: Link to the part which is used
+        inherited: True if the BomItem is inherited from a template of the assembly
+    """
+
+    class Meta:
+        unique_together = ('bom_item', 'assembly')
+
+    bom_item = models.ForeignKey(BomItem, on_delete=models.CASCADE, related_name='usages')
+
+    assembly = models.ForeignKey(Part, on_delete=models.CASCADE, related_name='bom_usages')
+
+    sub_part = models.ForeignKey(Part, on_delete=models.CASCADE, related_name='used_in_usages')
+
+    inherited = models.BooleanField(default=False)
+
+    @staticmethod
+    def update_bom_item(item):
+        """
+        Rebuild the usage entries for a single BomItem
+        """
+
+        BomUsage.objects.filter(bom_item=item).delete()
+
+        usages = [
+            BomUsage(bom_item=item, assembly_id=item.part_id, sub_part_id=item.sub_part_id)
+        ]
+
+        if item.inherited:
+            for variant in item.part.get_descendants(include_self=False):
+                usages.append(
+                    BomUsage(bom_item=item, assembly=variant, sub_part_id=item.sub_part_id, inherited=True)
+                )
+
+        BomUsage.objects.bulk_create(usages)
+
+    @staticmethod
+    def update_inherited(part):
+        """
+        Rebuild the inherited usage entries for a part (and all variants underneath it),
+        e.g. after the part has been moved within the variant tree
+        """
+
+        variants = part.get_descendants(include_self=True)
+
+        BomUsage.objects.filter(assembly__in=variants, inherited=True).delete()
+
+        usages = []
+
+        for variant in variants:
+            parents = variant.get_ancestors(include_self=False)
+
+            for item in BomItem.objects.filter(part__in=parents, inherited=True):
+                usages.append(
+                    BomUsage(bom_item=item, assembly=variant, sub_part_id=item.sub_part_id, inherited=True)
+                )
+
+        BomUsage.objects.bulk_create(usages)
+
+
+def update_part_quantities(part_id, *fields):
+    """
+    Update the cached quantities for the Part with the provided primary key.
+
+    Called when the underlying stock / order / build data are changed.
+    If the Part does not (or no longer) exist, no action is performed.
+    """
+
+    if part_id is None:
+        return
+
+    try:
+        part = Part.objects.get(pk=part_id)
+    except Part.DoesNotExist:
+        return
+
+    part.update_quantities(*fields)
+
+
+@receiver(post_save, sender=BomItem, dispatch_uid='bom_item_post_save_usage')
+def after_save_bom_item_usage(sender, instance, **kwargs):
+    """
+    Update the "where-used" index for the BomItem
+    """
+
+    BomUsage.update_bom_item(instance)
+
+
+def update_part_bom_status(part_id):
+    """
+    Update the cached BOM status for the Part with the provided primary key,
+    and for any variants (which may inherit BOM items from that part).
+
+    If the Part does not (or no longer) exist, no action is performed.
+    """
+
+    if part_id is None:
+        return
+
+    try:
+        part = Part.objects.get(pk=part_id)
+    except Part.DoesNotExist:
+        return
+
+    for variant in part.get_descendants(include_self=True):
+        variant.update_bom_status()
+
+
+@receiver(post_save, sender=BomItem, dispatch_uid='bom_item_post_save_status')
+def after_save_bom_item(sender, instance, **kwargs):
+    """
+    Update the cached BOM status for the associated Part
+    """
+
+    update_part_bom_status(instance.part_id)
+
+
+@receiver(post_delete, sender=BomItem, dispatch_uid='bom_item_post_delete_status')
+def after_delete_bom_item(sender, instance, **kwargs):
+    """
+    Update the cached BOM status for the associated Part
+    """
+
+    update_part_bom_status(instance.part_id)
+
+
+@receiver(post_save, sender=BomItem, dispatch_uid='part_pricing_invalidate_save')
+@receiver(post_delete, sender=BomItem, dispatch_uid='part_pricing_invalidate_delete')
+@receiver(post_save, sender=PartSellPriceBreak, dispatch_uid='part_pricing_invalidate_save')
+@receiver(post_delete, sender=PartSellPriceBreak, dispatch_uid='part_pricing_invalidate_delete')
+@receiver(post_save, sender=SupplierPart, dispatch_uid='part_pricing_invalidate_save')
+@receiver(post_delete, sender=SupplierPart, dispatch_uid='part_pricing_invalidate_delete')
+@receiver(post_save, sender=SupplierPriceBreak, dispatch_uid='part_pricing_invalidate_save')
+@receiver(post_delete, sender=SupplierPriceBreak, dispatch_uid='part_pricing_invalidate_delete')
+def after_pricing_data_change(sender, instance, **kwargs):
+    """ Receives post_save and post_delete signals for BOM and price-break data.
+
+    Any change to this data invalidates the cached pricing information.
+    """
+
+    part_pricing.invalidate_pricing_cache()
+
+
 class PartRelated(models.Model):
     """ Store and handle related parts (eg. mating connector, crimps, etc.) """
 
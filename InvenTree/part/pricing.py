@@ -0,0 +1,528 @@
+"""
+Pricing calculations for Part objects.
+
+Calculating the price range for an assembly requires walking the entire
+(multi-level) Bill of Materials. Performing this walk via the individual
+model methods re-queries the BOM, supplier parts and price breaks at every level,
+and prices shared sub-components many times over.
+
+The BomPricing class loads the entire BOM tree (a directed acyclic graph)
+in a small number of queries, and then calculates pricing bottom-up,
+pricing each sub-part only once for any given quantity.
+
+Calculated price ranges are also cached (using the Django cache backend).
+The cache is invalidated whenever BOM or price-break data changes.
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+import logging
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q, Prefetch, Min, Max, Sum, Count
+
+from djmoney.money import Money
+from djmoney.contrib.exchange.exceptions import MissingRate
+
+from InvenTree.helpers import normalize
+from InvenTree.exchange import ExchangeRateTable
+from common.settings import currency_code_default
+
+from company.models import SupplierPart, SupplierPriceBreak
+from part import models as PartModels
+from stock import models as StockModels
+
+
+logger = logging.getLogger("inventree")
+
+
+# Cache key which stores the current "version" of all cached pricing data
+PRICING_CACHE_VERSION_KEY = 'part-pricing-version'
+
+# Cached pricing data expires after one hour
+PRICING_CACHE_TIMEOUT = 3600
+
+
+def get_pricing_cache_version():
+    """
+    Return the current version stamp for cached pricing data.
+    """
+
+    version = cache.get(PRICING_CACHE_VERSION_KEY)
+
+    if version is None:
+        # Seed with a timestamp, so stale entries are never matched
+        cache.add(PRICING_CACHE_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(PRICING_CACHE_VERSION_KEY)
+
+    return version
+
+
+def invalidate_pricing_cache():
+    """
+    Invalidate *all* cached pricing data,
+    by incrementing the pricing cache version stamp.
+    """
+
+    try:
+        cache.incr(PRICING_CACHE_VERSION_KEY)
+    except ValueError:
+        # Version key does not exist (yet)
+        get_pricing_cache_version()
+
+
+def _part_pk(part):
+    """ Return the primary key for a Part instance (or a raw pk value) """
+
+    return part.pk if isinstance(part, PartModels.Part) else int(part)
+
+
+def _decimal(quantity):
+    """ Coerce a quantity value to Decimal """
+
+    if isinstance(quantity, Decimal):
+        return quantity
+
+    return Decimal(str(quantity))
+
+
+class BomPricing:
+    """
+    Calculates price ranges for one or more parts,
+    rolling up pricing through a multi-level Bill of Materials.
+
+    - The BOM tree is loaded once (one pass per BOM level)
+    - Supplier parts and price breaks are loaded in a single query
+    - Each sub-part is priced exactly once for a given quantity
+
+    Args:
+        parts: List of Part objects (or primary keys) which will be priced
+        currency: Currency code for calculated prices (defaults to the base currency)
+    """
+
+    def __init__(self, parts=None, currency=None):
+
+        if currency is None:
+            currency = currency_code_default()
+
+        self.currency = currency
+
+        # Map of part pk -> list of (sub_part pk, quantity) tuples
+        self.bom_lines = {}
+
+        # Map of part pk -> list of SupplierPart objects (with price breaks pre-loaded)
+        self.supplier_parts = {}
+
+        # Memoized price ranges
+        self.price_ranges = {}
+
+        # Parts which are currently being priced (prevents infinite recursion)
+        self.pricing = set()
+
+        self.pending = set()
+
+        for part in parts or []:
+            self.pending.add(_part_pk(part))
+
+    def load(self, *parts):
+        """
+        Load BOM and supplier pricing data for the specified parts,
+        and every part underneath them in the BOM tree.
+        """
+
+        for part in parts:
+            self.pending.add(_part_pk(part))
+
+        frontier = set([pk for pk in self.pending if pk not in self.bom_lines])
+
+        self.pending = set()
+
+        loaded = set()
+
+        # Walk down the BOM tree, one level at a time
+        while len(frontier) > 0:
+            lines = self.load_bom_lines(frontier)
+
+            for pk in frontier:
+                self.bom_lines[pk] = lines.get(pk, [])
+
+            loaded.update(frontier)
+
+            frontier = set()
+
+            for pk in loaded:
+                for sub_part, _quantity in self.bom_lines[pk]:
+                    if sub_part not in self.bom_lines:
+                        frontier.add(sub_part)
+
+        if len(loaded) > 0:
+            self.load_supplier_parts(loaded)
+
+    def load_bom_lines(self, part_ids):
+        """
+        Return the BOM lines for the provided parts, as a dict of:
+
+        part pk -> [(sub_part pk, quantity), ...]
+
+        Inherited BOM items (defined against template parts further up
+        the variant tree) are included, matching Part.get_bom_items()
+        """
+
+        part_ids = set(part_ids)
+
+        parts = PartModels.Part.objects.filter(pk__in=part_ids).values('pk', 'tree_id', 'lft', 'rght')
+
+        tree_ids = set([part['tree_id'] for part in parts])
+
+        # Find any template parts (in the same variant trees) which define inherited BOM items
+        templates = PartModels.Part.objects.filter(
+            tree_id__in=tree_ids,
+            bom_items__inherited=True
+        ).values('pk', 'tree_id', 'lft', 'rght').distinct()
+
+        # Map of template pk -> list of parts which inherit BOM items from that template
+        inheritors = {}
+
+        for template in templates:
+            for part in parts:
+                if part['tree_id'] == template['tree_id'] and template['lft'] < part['lft'] and template['rght'] > part['rght']:
+                    inheritors.setdefault(template['pk'], []).append(part['pk'])
+
+        items = PartModels.BomItem.objects.filter(
+            Q(part__in=part_ids) | Q(part__in=inheritors.keys(), inherited=True)
+        ).values_list('part', 'sub_part', 'quantity', 'inherited')
+
+        lines = {}
+
+        for part, sub_part, quantity, inherited in items:
+
+            if part in part_ids:
+                lines.setdefault(part, []).append((sub_part, quantity))
+
+            if inherited:
+                for variant in inheritors.get(part, []):
+                    lines.setdefault(variant, []).append((sub_part, quantity))
+
+        return lines
+
+    def load_supplier_parts(self, part_ids):
+        """
+        Load all SupplierPart objects (and associated price breaks) for the provided parts
+        """
+
+        supplier_parts = SupplierPart.objects.filter(part__in=part_ids).prefetch_related(
+            Prefetch(
+                'pricebreaks',
+                queryset=SupplierPriceBreak.objects.order_by('quantity'),
+            )
+        )
+
+        for supplier_part in supplier_parts:
+            self.supplier_parts.setdefault(supplier_part.part_id, []).append(supplier_part)
+
+    def get_bom_lines(self, part):
+        """ Return the list of (sub_part pk, quantity) BOM lines for a given part """
+
+        pk = _part_pk(part)
+
+        if pk not in self.bom_lines:
+            self.load(pk)
+
+        return self.bom_lines[pk]
+
+    def get_supplier_price_range(self, part, quantity=1):
+        """ Return the (min, max) supplier price range for a part, or None """
+
+        pk = _part_pk(part)
+
+        if pk not in self.bom_lines:
+            self.load(pk)
+
+        quantity = _decimal(quantity)
+
+        min_price = None
+        max_price = None
+
+        for supplier_part in self.supplier_parts.get(pk, []):
+
+            price = supplier_part.get_price(
+                quantity,
+                currency=self.currency,
+                price_breaks=supplier_part.pricebreaks.all(),
+            )
+
+            if price is None:
+                continue
+
+            if min_price is None or price < min_price:
+                min_price = price
+
+            if max_price is None or price > max_price:
+                max_price = price
+
+        if min_price is None or max_price is None:
+            return None
+
+        return (normalize(min_price), normalize(max_price))
+
+    def get_bom_price_range(self, part, quantity=1):
+        """
+        Return the (min, max) BOM price range for a part, or None
+
+        Note: If the BOM contains items without pricing information,
+        these items cannot be included in the BOM!
+        """
+
+        pk = _part_pk(part)
+
+        quantity = _decimal(quantity)
+
+        min_price = None
+        max_price = None
+
+        for sub_part, line_quantity in self.get_bom_lines(pk):
+
+            if sub_part == pk:
+                logger.warning(f"Part <{pk}> contains itself in BOM")
+                continue
+
+            prices = self.get_price_range(sub_part, quantity * line_quantity)
+
+            if prices is None:
+                continue
+
+            low, high = prices
+
+            if min_price is None:
+                min_price = 0
+
+            if max_price is None:
+                max_price = 0
+
+            min_price += low
+            max_price += high
+
+        if min_price is None or max_price is None:
+            return None
+
+        return (normalize(min_price), normalize(max_price))
+
+    def get_price_range(self, part, quantity=1, buy=True, bom=True):
+        """
+        Return the overall (min, max) price range for a part, or None.
+
+        Matches the behaviour of Part.get_price_range()
+        """
+
+        pk = _part_pk(part)
+
+        quantity = _decimal(quantity)
+
+        key = (pk, quantity, buy, bom)
+
+        if key in self.price_ranges:
+            return self.price_ranges[key]
+
+        if pk in self.pricing:
+            # Recursive BOM detected - cannot price this part
+            logger.warning(f"Recursive BOM detected for part <{pk}>")
+            return None
+
+        self.pricing.add(pk)
+
+        try:
+            buy_price_range = self.get_supplier_price_range(pk, quantity) if buy else None
+            bom_price_range = self.get_bom_price_range(pk, quantity) if bom else None
+        finally:
+            self.pricing.remove(pk)
+
+        if buy_price_range is None:
+            result = bom_price_range
+
+        elif bom_price_range is None:
+            result = buy_price_range
+
+        else:
+            result = (
+                min(buy_price_range[0], bom_price_range[0]),
+                max(buy_price_range[1], bom_price_range[1])
+            )
+
+        self.price_ranges[key] = result
+
+        return result
+
+
+def _cache_key(name, part, quantity, currency, *args):
+    """ Construct a cache key for a particular pricing calculation """
+
+    items = [
+        'part-pricing',
+        str(get_pricing_cache_version()),
+        name,
+        str(_part_pk(part)),
+        str(_decimal(quantity).normalize()),
+        str(currency or currency_code_default()),
+    ]
+
+    items += [str(arg) for arg in args]
+
+    return ':'.join(items)
+
+
+def _cached(key, func):
+    """ Return the cached result for a given key, or calculate (and cache) the result """
+
+    result = cache.get(key)
+
+    if result is not None:
+        # Results are wrapped in a tuple, so that 'None' can also be cached
+        return result[0]
+
+    result = func()
+
+    cache.set(key, (result, ), PRICING_CACHE_TIMEOUT)
+
+    return result
+
+
+def get_price_range(part, quantity=1, buy=True, bom=True, engine=None):
+    """
+    Return the (cached) overall price range for a part.
+
+    Args:
+        part: Part object (or primary key)
+        quantity: Quantity to calculate pricing for
+        buy: Include supplier pricing (default = True)
+        bom: Include BOM pricing (default = True)
+        engine: Optional BomPricing instance (allows pre-loading of multiple parts)
+    """
+
+    currency = engine.currency if engine else None
+
+    def calculate():
+        pricing = engine or BomPricing([part])
+        return pricing.get_price_range(part, quantity, buy=buy, bom=bom)
+
+    return _cached(_cache_key('range', part, quantity, currency, buy, bom), calculate)
+
+
+def get_supplier_price_range(part, quantity=1, engine=None):
+    """ Return the (cached) supplier price range for a part """
+
+    currency = engine.currency if engine else None
+
+    def calculate():
+        pricing = engine or BomPricing([part])
+        return pricing.get_supplier_price_range(part, quantity)
+
+    return _cached(_cache_key('buy', part, quantity, currency), calculate)
+
+
+def get_bom_price_range(part, quantity=1, engine=None):
+    """ Return the (cached) BOM price range for a part """
+
+    currency = engine.currency if engine else None
+
+    def calculate():
+        pricing = engine or BomPricing([part])
+        return pricing.get_bom_price_range(part, quantity)
+
+    return _cached(_cache_key('bom', part, quantity, currency), calculate)
+
+
+def get_purchase_prices(part_ids, currency=None, rates=None):
+    """
+    Return the (min, max, avg) purchase price of stock items for multiple parts.
+
+    Purchase prices are grouped (per part and per currency) in a single query,
+    and then converted to the target currency using an in-memory exchange rate table.
+
+    Args:
+        part_ids: List of Part primary keys
+        currency: Target currency (defaults to the base currency)
+        rates: Optional ExchangeRateTable (loaded if not provided)
+
+    Returns:
+        A dict of part pk -> (min, max, avg) Money values.
+        Prices which cannot be converted (no exchange rate available) are returned in the original currency.
+    """
+
+    if currency is None:
+        currency = currency_code_default()
+
+    groups = StockModels.StockItem.objects.filter(
+        part__in=part_ids,
+        purchase_price__isnull=False,
+    ).order_by().values(
+        'part',
+        'purchase_price_currency',
+    ).annotate(
+        price_min=Min('purchase_price'),
+        price_max=Max('purchase_price'),
+        price_sum=Sum('purchase_price'),
+        count=Count('pk'),
+    )
+
+    groups = list(groups)
+
+    if len(groups) == 0:
+        return {}
+
+    if rates is None:
+        rates = ExchangeRateTable()
+
+    # Map of part pk -> {currency: [min, max, total, count]}
+    prices = {}
+
+    for group in groups:
+
+        price_currency = group['purchase_price_currency'] or currency
+
+        values = [group['price_min'], group['price_max'], group['price_sum']]
+
+        try:
+            values = [rates.convert(value, price_currency, currency) for value in values]
+            price_currency = currency
+        except MissingRate:
+            pass
+
+        part_prices = prices.setdefault(group['part'], {})
+
+        if price_currency not in part_prices:
+            part_prices[price_currency] = values + [group['count']]
+            continue
+
+        existing = part_prices[price_currency]
+
+        existing[0] = min(existing[0], values[0])
+        existing[1] = max(existing[1], values[1])
+        existing[2] += values[2]
+        existing[3] += group['count']
+
+    results = {}
+
+    for part, part_prices in prices.items():
+
+        # Prices which cannot be converted to the target currency are not combined
+        if currency in part_prices:
+            price_currency = currency
+        else:
+            price_currency = sorted(part_prices.keys())[0]
+
+        price_min, price_max, total, count = part_prices[price_currency]
+
+        values = []
+
+        for value in [price_min, price_max, total / count]:
+            money = Money(value, price_currency)
+            money.decimal_places = 4
+            values.append(money)
+
+        results[part] = tuple(values)
+
+    return results
@@ -5,20 +5,19 @@ import imghdr
 from decimal import Decimal
 
 from django.db import models
-from django.db.models import Q
 from django.db.models.functions import Coalesce
 from InvenTree.serializers import (InvenTreeAttachmentSerializerField,
                                    InvenTreeModelSerializer)
-from InvenTree.status_codes import BuildStatus, PurchaseOrderStatus
 from rest_framework import serializers
-from sql_util.utils import SubqueryCount, SubquerySum
+from sql_util.utils import SubqueryCount
 from djmoney.contrib.django_rest_framework import MoneyField
-from stock.models import StockItem
 
 from .models import (BomItem, Part, PartAttachment, PartCategory,
                      PartParameter, PartParameterTemplate, PartSellPriceBreak,
                      PartStar, PartTestTemplate, PartCategoryParameterTemplate)
 
+import part.buildable as part_buildable
+
 
 class CategorySerializer(InvenTreeModelSerializer):
     """ Serializer for PartCategory """
@@ -106,10 +105,72 @@ class PartThumbSerializer(serializers.Serializer):
     Used to serve and display existing Part images.
     """
 
-    image = serializers.URLField(read_only=True)
+    image = serializers.CharField(read_only=True)
+    thumbnail = serializers.CharField(read_only=True)
+    preview = serializers.CharField(read_only=True)
     count = serializers.IntegerField(read_only=True)
 
 
+class PartShortageSerializer(InvenTreeModelSerializer):
+    """
+    Serializer for parts which are required to complete active build orders
+    """
+
+    thumbnail = serializers.CharField(source='get_thumbnail_url', read_only=True)
+
+    in_stock = serializers.FloatField(read_only=True)
+    allocated = serializers.FloatField(read_only=True)
+    ordering = serializers.FloatField(read_only=True)
+
+    build_demand = serializers.FloatField(read_only=True)
+    net_quantity = serializers.FloatField(read_only=True)
+    shortage = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Part
+        fields = [
+            'pk',
+            'full_name',
+            'description',
+            'IPN',
+            'thumbnail',
+            'units',
+            'in_stock',
+            'allocated',
+            'ordering',
+            'build_demand',
+            'net_quantity',
+            'shortage',
+        ]
+
+
+class PartMatchSerializer(InvenTreeModelSerializer):
+    """
+    Serializer for parts which match a fuzzy name search
+    """
+
+    thumbnail = serializers.CharField(source='get_thumbnail_url', read_only=True)
+
+    in_stock = serializers.FloatField(read_only=True)
+
+    ratio = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Part
+        fields = [
+            'pk',
+            'IPN',
+            'name',
+            'revision',
+            'full_name',
+            'description',
+            'thumbnail',
+            'active',
+            'in_stock',
+            'ratio',
+        ]
+
+
 class PartThumbSerializerUpdate(InvenTreeModelSerializer):
     """ Serializer for updating Part thumbnail """
 
@@ -206,52 +267,14 @@ class PartSerializer(InvenTreeModelSerializer):
         to reduce database trips.
         """
 
-        # Annotate with the total 'in stock' quantity
-        queryset = queryset.annotate(
-            in_stock=Coalesce(
-                SubquerySum('stock_items__quantity', filter=StockItem.IN_STOCK_FILTER),
-                Decimal(0),
-                output_field=models.DecimalField(),
-            ),
-        )
+        # Note: The 'in_stock', 'allocated', 'ordering' and 'building' quantities
+        # are cached against the Part model, and do not need to be annotated
 
         # Annotate with the total number of stock items
         queryset = queryset.annotate(
             stock_item_count=SubqueryCount('stock_items')
         )
 
-        # Filter to limit builds to "active"
-        build_filter = Q(
-            status__in=BuildStatus.ACTIVE_CODES
-        )
-
-        # Annotate with the total 'building' quantity
-        queryset = queryset.annotate(
-            building=Coalesce(
-                SubquerySum('builds__quantity', filter=build_filter),
-                Decimal(0),
-                output_field=models.DecimalField(),
-            )
-        )
-
-        # Filter to limit orders to "open"
-        order_filter = Q(
-            order__status__in=PurchaseOrderStatus.OPEN
-        )
-
-        # Annotate with the total 'on order' quantity
-        queryset = queryset.annotate(
-            ordering=Coalesce(
-                SubquerySum('supplier_parts__purchase_order_line_items__quantity', filter=order_filter),
-                Decimal(0),
-                output_field=models.DecimalField(),
-            ) - Coalesce(
-                SubquerySum('supplier_parts__purchase_order_line_items__received', filter=order_filter),
-                Decimal(0),
-                output_field=models.DecimalField(),
-            )
-        )
-
         # Annotate with the number of 'suppliers'
         queryset = queryset.annotate(
             suppliers=Coalesce(
@@ -261,6 +284,9 @@ class PartSerializer(InvenTreeModelSerializer):
             ),
         )
 
+        # Annotate with the number of units which can be built from available stock
+        queryset = part_buildable.annotate_buildable(queryset)
+
         return queryset
 
     def get_starred(self, part):
@@ -277,6 +303,7 @@ class PartSerializer(InvenTreeModelSerializer):
     in_stock = serializers.FloatField(read_only=True)
     ordering = serializers.FloatField(read_only=True)
     building = serializers.FloatField(read_only=True)
+    can_build = serializers.IntegerField(source='buildable', read_only=True)
     stock_item_count = serializers.IntegerField(read_only=True)
     suppliers = serializers.IntegerField(read_only=True)
 
@@ -287,8 +314,9 @@ class PartSerializer(InvenTreeModelSerializer):
     # PrimaryKeyRelated fields (Note: enforcing field type here results in much faster queries, somehow...)
     category = serializers.PrimaryKeyRelatedField(queryset=PartCategory.objects.all())
 
+    allocated_stock = serializers.FloatField(source='allocated', read_only=True)
+
     # TODO - Include annotation for the following fields:
-    # allocated_stock = serializers.FloatField(source='allocation_count', read_only=True)
     # bom_items = serializers.IntegerField(source='bom_count', read_only=True)
     # used_in = serializers.IntegerField(source='used_in_count', read_only=True)
 
@@ -297,7 +325,7 @@ class PartSerializer(InvenTreeModelSerializer):
         partial = True
         fields = [
             'active',
-            # 'allocated_stock',
+            'allocated_stock',
             'assembly',
             # 'bom_items',
             'category',
@@ -311,6 +339,7 @@ class PartSerializer(InvenTreeModelSerializer):
             'in_stock',
             'ordering',
             'building',
+            'can_build',
             'IPN',
             'is_template',
             'keywords',
@@ -354,7 +383,7 @@ class PartStarSerializer(InvenTreeModelSerializer):
 class BomItemSerializer(InvenTreeModelSerializer):
     """ Serializer for BomItem object """
 
-    # price_range = serializers.CharField(read_only=True)
+    price_range = serializers.SerializerMethodField()
 
     quantity = serializers.FloatField()
 
@@ -382,6 +411,7 @@ class BomItemSerializer(InvenTreeModelSerializer):
 
         part_detail = kwargs.pop('part_detail', False)
         sub_part_detail = kwargs.pop('sub_part_detail', False)
+        include_pricing = kwargs.pop('include_pricing', False)
 
         super(BomItemSerializer, self).__init__(*args, **kwargs)
 
@@ -391,6 +421,9 @@ class BomItemSerializer(InvenTreeModelSerializer):
         if sub_part_detail is not True:
             self.fields.pop('sub_part_detail')
 
+        if include_pricing is not True:
+            self.fields.pop('price_range')
+
     @staticmethod
     def setup_eager_loading(queryset):
         queryset = queryset.prefetch_related('part')
@@ -403,6 +436,16 @@ class BomItemSerializer(InvenTreeModelSerializer):
         queryset = queryset.prefetch_related('sub_part__supplier_parts__pricebreaks')
         return queryset
 
+    def get_price_range(self, obj):
+        """ Return the price range for this BOM item (calculated by the BomList API) """
+
+        try:
+            prange = obj.bom_price_range
+        except AttributeError:
+            return None
+
+        return BomItem.format_price_range(prange)
+
     def get_purchase_price_range(self, obj):
         """ Return purchase price range """
 
@@ -469,7 +512,7 @@ class BomItemSerializer(InvenTreeModelSerializer):
             'reference',
             'sub_part',
             'sub_part_detail',
-            # 'price_range',
+            'price_range',
             'validated',
         ]
 
@@ -0,0 +1,76 @@
+"""
+Stock shortage calculations for outstanding build orders.
+
+A part is "required to complete builds" if the total quantity required
+by all active build orders is greater than the net stock for that part.
+
+The build demand for each sub-part is calculated from the "where-used" index
+(which includes BOM items inherited from template parts),
+summed across all active builds in a single grouped query,
+and compared against the cached stock quantities for each part.
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models
+from django.db.models import F, Sum, Value, ExpressionWrapper
+from django.db.models.functions import Greatest
+
+from InvenTree.status_codes import BuildStatus
+
+from part import models as PartModels
+
+
+def get_build_shortages(queryset=None):
+    """
+    Return a queryset of parts which do not have sufficient stock
+    to complete all active build orders.
+
+    Each part is annotated with:
+
+    - build_demand: Total quantity required by all active builds
+    - net_quantity: Net stock (in stock - allocated + on order)
+    - shortage: Additional quantity required to complete all active builds
+
+    Args:
+        queryset: Part queryset to filter (default = all parts)
+    """
+
+    if queryset is None:
+        queryset = PartModels.Part.objects.all()
+
+    # Restrict BOM usage to assemblies which have active build orders
+    queryset = queryset.filter(
+        used_in_usages__assembly__builds__status__in=BuildStatus.ACTIVE_CODES
+    )
+
+    # Quantity remaining to be built (for each active build)
+    remaining = Greatest(
+        F('used_in_usages__assembly__builds__quantity') - F('used_in_usages__assembly__builds__completed'),
+        Value(0),
+    )
+
+    queryset = queryset.annotate(
+        build_demand=Sum(
+            ExpressionWrapper(
+                F('used_in_usages__bom_item__quantity') * remaining,
+                output_field=models.DecimalField(),
+            )
+        ),
+        net_quantity=ExpressionWrapper(
+            F('in_stock') - F('allocated') + F('ordering'),
+            output_field=models.DecimalField(),
+        ),
+    )
+
+    queryset = queryset.filter(build_demand__gt=F('net_quantity'))
+
+    queryset = queryset.annotate(
+        shortage=ExpressionWrapper(
+            F('build_demand') - F('net_quantity'),
+            output_field=models.DecimalField(),
+        )
+    )
+
+    return queryset
@@ -2,12 +2,14 @@ from rest_framework import status
 
 from django.urls import reverse
 
-from part.models import Part
+from part.models import Part, PartCategory
+from part import matching as part_matching
 from stock.models import StockItem
 from company.models import Company
+from build.models import Build
 
 from InvenTree.api_tester import InvenTreeAPITestCase
-from InvenTree.status_codes import StockStatus
+from InvenTree.status_codes import StockStatus, BuildStatus
 
 
 class PartAPITest(InvenTreeAPITestCase):
@@ -277,6 +279,23 @@ class PartAPITest(InvenTreeAPITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+        # Assign images to some parts (one image is shared)
+        Part.objects.filter(pk__in=[1, 2]).update(image='part_images/motor.png')
+        Part.objects.filter(pk=3).update(image='part_images/widget.jpg')
+
+        response = self.get(url, {'limit': 1})
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+
+        # Most popular image is returned first
+        image = response.data['results'][0]
+
+        self.assertEqual(image['image'], 'part_images/motor.png')
+        self.assertEqual(image['count'], 2)
+        self.assertEqual(image['thumbnail'], '/media/part_images/motor.thumbnail.png')
+        self.assertEqual(image['preview'], '/media/part_images/motor.preview.png')
+
     def test_paginate(self):
         """
         Test pagination of the Part list API
@@ -292,6 +311,86 @@ class PartAPITest(InvenTreeAPITestCase):
 
             self.assertEqual(len(data['results']), n)
 
+    def test_match(self):
+        """
+        Test fuzzy part name matching via the API
+        """
+
+        part_matching.part_name_index.clear()
+
+        url = reverse('api-part-match')
+
+        response = self.get(url, {'name': 'chair'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        names = [item['name'] for item in response.data]
+
+        self.assertIn('Blue Chair', names)
+        self.assertNotIn('Bob', names)
+
+        for item in response.data:
+            self.assertGreaterEqual(item['ratio'], 80)
+
+        # Limit the number of results
+        response = self.get(url, {'name': 'chair', 'limit': 2})
+
+        self.assertEqual(len(response.data), 2)
+
+        # Filter the parts which can be matched
+        response = self.get(url, {'name': 'chair', 'category': 8})
+
+        self.assertEqual(len(response.data), 0)
+
+        response = self.get(url, {'name': 'chair', 'category': 7})
+
+        self.assertEqual(len(response.data), 5)
+
+    def test_category_tree(self):
+        """
+        Test the (cached) part category tree
+        """
+
+        url = reverse('api-part-tree')
+
+        def get_nodes():
+            nodes = {}
+
+            def collect(node):
+                nodes[node['pk']] = node
+
+                for child in node.get('nodes', []):
+                    collect(child)
+
+            collect(self.get(url).json()['tree'][0])
+
+            return nodes
+
+        nodes = get_nodes()
+
+        categories = PartCategory.objects.all()
+
+        self.assertEqual(len(nodes), categories.count() + 1)
+
+        # Cascaded part counts match the per-category calculation
+        for category in categories:
+            node = nodes[category.pk]
+
+            self.assertEqual(node['tags'][0], category.partcount())
+            self.assertEqual(node['text'], category.name)
+            self.assertEqual('nodes' in node, category.has_children)
+
+        self.assertEqual(nodes[None]['tags'][0], sum([cat.partcount() for cat in categories if cat.parent is None]))
+
+        # Changing a part invalidates the cached tree
+        count = nodes[2]['tags'][0]
+
+        Part.objects.create(name='Tree part', description='A new part', category=PartCategory.objects.get(pk=2))
+
+        nodes = get_nodes()
+
+        self.assertEqual(nodes[2]['tags'][0], count + 1)
+
 
 class PartAPIAggregationTest(InvenTreeAPITestCase):
     """
@@ -369,6 +468,77 @@ class PartAPIAggregationTest(InvenTreeAPITestCase):
         self.assertEqual(data['stock_item_count'], 105)
 
 
+class PartShortageTest(InvenTreeAPITestCase):
+    """
+    Tests for the build order stock shortage calculations
+    """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'bom',
+    ]
+
+    roles = [
+        'part.view',
+    ]
+
+    def setUp(self):
+
+        super().setUp()
+
+        self.bob = Part.objects.get(pk=100)
+
+        # Enough stock for 10 x 'M2x4 LPHS'
+        StockItem.objects.create(part=Part.objects.get(pk=1), quantity=100)
+
+        Build.objects.create(part=self.bob, quantity=5, reference='1234', title='Making Bob')
+
+    def test_shortage_list(self):
+
+        url = reverse('api-part-shortage-list')
+
+        response = self.get(url)
+
+        self.assertEqual(response.status_code, 200)
+
+        # 5 x Bob requires 50 x M2x4 LPHS (in stock)
+        shortages = {item['pk']: item for item in response.data}
+
+        self.assertEqual(set(shortages.keys()), set([3, 5, 50]))
+
+        self.assertEqual(shortages[3]['build_demand'], 200)
+        self.assertEqual(shortages[3]['shortage'], 200)
+
+        # Demand from multiple builds is combined
+        Build.objects.create(part=self.bob, quantity=6, reference='1235', title='Making more Bob')
+
+        response = self.get(url)
+
+        shortages = {item['pk']: item for item in response.data}
+
+        self.assertEqual(set(shortages.keys()), set([1, 3, 5, 50]))
+
+        self.assertEqual(shortages[1]['build_demand'], 110)
+        self.assertEqual(shortages[1]['shortage'], 10)
+
+    def test_stock_to_build(self):
+
+        response = self.get(reverse('api-part-list'), {'stock_to_build': True})
+
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(set([part['pk'] for part in response.data]), set([3, 5, 50]))
+
+        # Completed builds are not counted
+        Build.objects.all().update(status=BuildStatus.COMPLETE)
+
+        response = self.get(reverse('api-part-list'), {'stock_to_build': True})
+
+        self.assertEqual(len(response.data), 0)
+
+
 class PartParameterTest(InvenTreeAPITestCase):
     """
     Tests for the ParParameter API
@@ -111,3 +111,114 @@ class BomItemTest(TestCase):
         item.validate_hash()
 
         self.assertNotEqual(h1, h2)
+
+    def test_bom_status(self):
+        """ The cached BOM status is updated when the BOM changes """
+
+        # Fixture BOM has not been validated
+        self.assertFalse(self.bob.is_bom_valid())
+        self.assertFalse(Part.objects.get(pk=100).bom_valid)
+
+        # Parts without a BOM are always valid
+        self.assertTrue(self.orphan.bom_valid)
+
+        self.bob.validate_bom(None)
+
+        self.bob.refresh_from_db()
+        self.assertTrue(self.bob.bom_valid)
+
+        # Changing a BOM line invalidates the BOM
+        item = BomItem.objects.get(part=100, sub_part=50)
+        item.quantity = 5
+        item.save()
+
+        self.bob.refresh_from_db()
+        self.assertFalse(self.bob.bom_valid)
+        self.assertFalse(self.bob.is_bom_valid())
+
+        self.bob.validate_bom(None)
+        self.bob.refresh_from_db()
+        self.assertTrue(self.bob.bom_valid)
+
+        # Renaming a sub-part invalidates the BOM
+        self.orphan.name = 'Adopted'
+        self.orphan.save()
+
+        self.bob.refresh_from_db()
+        self.assertFalse(self.bob.bom_valid)
+        self.assertEqual(self.bob.bom_valid, self.bob.is_bom_valid())
+
+    def test_inherited_bom_status(self):
+        """ Inherited BOM lines update the cached status of variant parts """
+
+        Part.objects.rebuild()
+
+        chair = Part.objects.get(pk=10000)
+        green = Part.objects.get(pk=10004)
+
+        self.assertTrue(green.bom_valid)
+
+        BomItem.objects.create(part=chair, sub_part=self.orphan, quantity=1, inherited=True)
+
+        green.refresh_from_db()
+        self.assertFalse(green.bom_valid)
+
+        green.validate_bom(None)
+        green.refresh_from_db()
+        self.assertTrue(green.bom_valid)
+
+        # Changing the inherited line invalidates the variant BOM
+        BomItem.objects.filter(part=chair).update(quantity=2)
+        BomItem.objects.get(part=chair).save()
+
+        green.refresh_from_db()
+        self.assertFalse(green.bom_valid)
+        self.assertEqual(green.bom_valid, green.is_bom_valid())
+
+    def test_where_used(self):
+        """ The "where-used" index includes inherited and multi-level BOM usage """
+
+        Part.objects.rebuild()
+
+        chair = Part.objects.get(pk=10000)
+        green = Part.objects.get(pk=10004)
+
+        BomItem.objects.create(part=chair, sub_part=self.orphan, quantity=1, inherited=True)
+
+        used_in = self.orphan.get_used_in()
+
+        self.assertIn(self.bob, used_in)
+        self.assertIn(chair, used_in)
+        self.assertIn(green, used_in)
+
+        direct = self.orphan.get_used_in(include_inherited=False)
+
+        self.assertIn(chair, direct)
+        self.assertNotIn(green, direct)
+
+        # A part moved out of the variant tree no longer inherits the BOM item
+        green.variant_of = None
+        green.save()
+
+        self.assertNotIn(green, self.orphan.get_used_in())
+
+        green.variant_of = Part.objects.get(pk=10003)
+        green.save()
+
+        self.assertIn(green, self.orphan.get_used_in())
+
+        # Multi-level usage
+        top = Part.objects.create(name='Top', description='Top level assembly', assembly=True)
+        BomItem.objects.create(part=top, sub_part=self.bob, quantity=1)
+
+        self.assertNotIn(top, self.orphan.get_used_in())
+        self.assertIn(top, self.orphan.get_used_in(recursive=True))
+
+        # Cannot add an assembly to the BOM of one of its sub-components
+        self.assertNotIn(top, self.orphan.get_allowed_bom_items())
+
+        # Removing the BOM item removes the usage
+        BomItem.objects.filter(part=chair).delete()
+
+        self.assertNotIn(chair, self.orphan.get_used_in())
+        self.assertNotIn(green, self.orphan.get_used_in())
@@ -8,16 +8,22 @@ from django.contrib.auth import get_user_model
 
 from django.test import TestCase
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 
+import io
 import os
 
-from .models import Part, PartTestTemplate
+from .models import Part, PartTestTemplate, BomItem
 from .models import rename_part_image, match_part_names
 from .templatetags import inventree_extras
 
 import part.settings
+import part.buildable as part_buildable
+import part.matching as part_matching
 
 from common.models import InvenTreeSetting
+from stock.models import StockItem
+from InvenTree.status_codes import StockStatus
 
 
 class TemplateTagTest(TestCase):
@@ -109,11 +115,235 @@ class PartTest(TestCase):
 
     def test_match_names(self):
 
+        part_matching.part_name_index.clear()
+
         matches = match_part_names('M2x5 LPHS')
 
         self.assertTrue(len(matches) > 0)
 
 
+class PartMatchTest(TestCase):
+    """ Tests for the part name matching index """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+    ]
+
+    def setUp(self):
+        part_matching.part_name_index.clear()
+
+    def test_match(self):
+
+        matches = part_matching.match_parts('chair')
+
+        names = [match['part'].name for match in matches]
+
+        self.assertIn('Red chair', names)
+        self.assertIn('Chair Template', names)
+        self.assertNotIn('Widget', names)
+
+        # Word order does not matter
+        matches = part_matching.match_parts('LPHS M2x4')
+
+        self.assertEqual(matches[0]['part'].name, 'M2x4 LPHS')
+        self.assertEqual(matches[0]['ratio'], 100)
+
+        # Restrict the search to a subset of parts
+        matches = part_matching.match_parts('chair', queryset=Part.objects.filter(name__icontains='green'))
+
+        self.assertEqual(len(matches), 2)
+
+    def test_incremental_update(self):
+        """ The index is updated when parts are created, renamed or deleted """
+
+        # Load the index
+        self.assertEqual(len(part_matching.match_parts('Sprocket')), 0)
+
+        sprocket = Part.objects.create(name='Sprocket', description='A sprocket')
+
+        with self.assertNumQueries(1):
+            # Only the matching parts are loaded from the database
+            matches = part_matching.match_parts('Sprocket')
+
+        self.assertEqual(matches[0]['part'], sprocket)
+
+        sprocket.name = 'Gear'
+        sprocket.save()
+
+        self.assertEqual(len(part_matching.match_parts('Sprocket')), 0)
+        self.assertEqual(len(part_matching.match_parts('Gear')), 1)
+
+        sprocket.delete()
+
+        self.assertEqual(len(part_matching.match_parts('Gear')), 0)
+
+
+class PartQuantityTest(TestCase):
+    """ Tests for the cached Part quantities """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+    ]
+
+    def setUp(self):
+
+        Part.objects.rebuild()
+
+        self.chair = Part.objects.get(pk=10000)
+        self.green = Part.objects.get(pk=10004)
+
+    def test_stock_quantity(self):
+
+        item = StockItem.objects.create(part=self.green, quantity=10)
+        StockItem.objects.create(part=self.green, quantity=5, status=StockStatus.LOST)
+
+        self.green.refresh_from_db()
+        self.chair.refresh_from_db()
+
+        self.assertEqual(self.green.in_stock, 10)
+        self.assertEqual(self.green.in_stock, self.green.total_stock)
+
+        # Template part includes the stock of all variants
+        self.assertEqual(self.chair.in_stock, 10)
+        self.assertEqual(self.chair.in_stock, self.chair.total_stock)
+
+        item.take_stock(3, None)
+
+        self.green.refresh_from_db()
+        self.assertEqual(self.green.in_stock, 7)
+
+        item.delete()
+
+        self.green.refresh_from_db()
+        self.chair.refresh_from_db()
+
+        self.assertEqual(self.green.in_stock, 0)
+        self.assertEqual(self.chair.in_stock, 0)
+
+    def test_change_part(self):
+        """ Moving stock (or variants) to a different part updates the previous part """
+
+        blue = Part.objects.get(pk=10001)
+        green = Part.objects.get(pk=10003)
+
+        item = StockItem.objects.create(part=self.green, quantity=10)
+
+        # Convert the stock item to a different variant
+        item.part = blue
+        item.save()
+
+        self.green.refresh_from_db()
+        green.refresh_from_db()
+        blue.refresh_from_db()
+
+        self.assertEqual(self.green.in_stock, 0)
+        self.assertEqual(green.in_stock, 0)
+        self.assertEqual(blue.in_stock, 10)
+
+        StockItem.objects.create(part=self.green, quantity=5)
+
+        green.refresh_from_db()
+        self.chair.refresh_from_db()
+
+        self.assertEqual(green.in_stock, 5)
+        self.assertEqual(self.chair.in_stock, 15)
+
+        # The variant is no longer a variant of the previous template
+        variant = Part.objects.get(pk=self.green.pk)
+        variant.variant_of = None
+        variant.save()
+
+        green.refresh_from_db()
+        self.chair.refresh_from_db()
+
+        self.assertEqual(green.in_stock, 0)
+        self.assertEqual(self.chair.in_stock, 10)
+
+    def test_save(self):
+        """ Saving a (stale) Part instance does not overwrite the cached quantities """
+
+        StockItem.objects.create(part=self.green, quantity=25)
+
+        self.green.description = 'A very green chair'
+        self.green.save()
+
+        self.green.refresh_from_db()
+
+        self.assertEqual(self.green.in_stock, 25)
+
+        # Calculated values are also restored by the management command
+        Part.objects.filter(pk=self.green.pk).update(in_stock=0)
+
+        call_command('rebuild_part_quantities', stdout=io.StringIO())
+
+        self.green.refresh_from_db()
+
+        self.assertEqual(self.green.in_stock, 25)
+
+
+class PartBuildableTest(TestCase):
+    """ Tests for the buildable quantity calculations """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'bom',
+    ]
+
+    def setUp(self):
+
+        Part.objects.rebuild()
+
+        self.bob = Part.objects.get(pk=100)
+        self.chair = Part.objects.get(pk=10000)
+        self.green = Part.objects.get(pk=10004)
+
+        # Enough stock to build 10 x 'Bob'
+        for pk, quantity in [(1, 100), (3, 400), (5, 250), (50, 30)]:
+            StockItem.objects.create(part=Part.objects.get(pk=pk), quantity=quantity)
+
+    def test_can_build(self):
+
+        self.assertEqual(self.bob.can_build, 10)
+
+        # Reduce the stock of one of the sub-parts
+        StockItem.objects.filter(part=3).update(quantity=200)
+        Part.objects.get(pk=3).update_quantities()
+
+        self.assertEqual(self.bob.can_build, 5)
+
+        # Parts without a BOM cannot be built
+        self.assertEqual(Part.objects.get(pk=1).can_build, 0)
+
+    def test_inherited(self):
+        """ Inherited BOM items are included for variant parts """
+
+        BomItem.objects.create(part=self.chair, sub_part=Part.objects.get(pk=1), quantity=3, inherited=True)
+
+        self.assertEqual(self.chair.can_build, 33)
+        self.assertEqual(self.green.can_build, 33)
+
+    def test_bulk(self):
+        """ Buildable quantities for multiple parts are calculated in a single query """
+
+        parts = [self.bob, self.chair, self.green, 1, 3]
+
+        with self.assertNumQueries(1):
+            quantities = part_buildable.get_buildable_quantities(parts)
+
+        self.assertEqual(quantities, {100: 10, 10000: 0, 10004: 0, 1: 0, 3: 0})
+
+        queryset = part_buildable.annotate_buildable(Part.objects.filter(pk__in=[100, 1]))
+
+        for assembly in queryset:
+            self.assertEqual(assembly.buildable, assembly.can_build)
+
+
 class TestTemplateTest(TestCase):
 
     fixtures = [
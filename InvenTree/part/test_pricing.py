@@ -0,0 +1,167 @@
+"""
+Unit tests for the BOM pricing engine
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from decimal import Decimal
+
+from django.test import TestCase
+
+from djmoney.money import Money
+from djmoney.contrib.exchange.models import ExchangeBackend, Rate
+from djmoney.contrib.exchange.exceptions import MissingRate
+
+from InvenTree.exchange import ExchangeRateTable
+from company.models import SupplierPart, SupplierPriceBreak
+from stock.models import StockItem
+
+from .models import Part, BomItem
+from . import pricing as part_pricing
+
+
+class BomPricingTest(TestCase):
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'bom',
+        'company',
+        'manufacturer_part',
+        'supplier_part',
+        'price_breaks',
+    ]
+
+    def setUp(self):
+        self.m2x4 = Part.objects.get(name='M2x4 LPHS')
+        self.bob = Part.objects.get(pk=100)
+
+        # Construct a multi-level assembly on top of 'Bob'
+        self.top = Part.objects.create(name='Top', description='Top level assembly', assembly=True)
+        self.mid = Part.objects.create(name='Mid', description='Mid level assembly', assembly=True, component=True)
+
+        BomItem.objects.create(part=self.mid, sub_part=self.bob, quantity=2)
+        BomItem.objects.create(part=self.top, sub_part=self.mid, quantity=3)
+        BomItem.objects.create(part=self.top, sub_part=self.m2x4, quantity=5)
+
+    def test_supplier_pricing(self):
+        """ Supplier pricing matches the values calculated by the SupplierPart model """
+
+        pricing = part_pricing.BomPricing([self.m2x4])
+
+        pmin, pmax = pricing.get_supplier_price_range(self.m2x4, 5)
+
+        self.assertEqual(pmin, 35)
+        self.assertEqual(pmax, Decimal('37.5'))
+
+        # No pricing available for a part without supplier price breaks
+        self.assertIsNone(pricing.get_supplier_price_range(self.bob, 1))
+
+    def test_bom_rollup(self):
+        """ Multi-level BOM pricing is rolled up correctly """
+
+        pricing = part_pricing.BomPricing([self.top])
+
+        # 'Bob' requires 10 x M2x4
+        self.assertEqual(pricing.get_bom_price_range(self.bob, 1), (70, 75))
+
+        # 'Mid' requires 2 x 'Bob'
+        self.assertEqual(pricing.get_bom_price_range(self.mid, 1), (140, 150))
+
+        # 'Top' requires 3 x 'Mid' (60 x M2x4) + 5 x M2x4
+        low = pricing.get_price_range(self.m2x4, 60)[0] + pricing.get_price_range(self.m2x4, 5)[0]
+        high = pricing.get_price_range(self.m2x4, 60)[1] + pricing.get_price_range(self.m2x4, 5)[1]
+
+        self.assertEqual(pricing.get_bom_price_range(self.top, 1), (low, high))
+
+        # Results match the Part model methods
+        for part in [self.bob, self.mid, self.top]:
+            for quantity in [1, 3, 25]:
+                self.assertEqual(
+                    pricing.get_price_range(part, quantity),
+                    part.get_price_range(quantity)
+                )
+
+    def test_queries(self):
+        """ Once loaded, pricing the BOM does not require additional queries """
+
+        pricing = part_pricing.BomPricing([self.top])
+        pricing.load()
+
+        with self.assertNumQueries(0):
+            pricing.get_price_range(self.top, 10)
+            pricing.get_price_range(self.mid, 10)
+            pricing.get_price_range(self.bob, 7)
+
+    def test_cache_invalidation(self):
+        """ Cached pricing is invalidated when price breaks change """
+
+        self.assertEqual(part_pricing.get_bom_price_range(self.bob, 1), (70, 75))
+
+        # Add a new (more expensive) supplier part
+        supplier_part = SupplierPart.objects.get(SKU='ACME0003')
+
+        SupplierPriceBreak.objects.create(part=supplier_part, quantity=1, price=100)
+
+        self.assertEqual(part_pricing.get_bom_price_range(self.bob, 1), (70, 1000))
+
+        # Removing the BOM line also invalidates the cached data
+        BomItem.objects.filter(part=self.bob, sub_part=self.m2x4).delete()
+
+        self.assertIsNone(part_pricing.get_bom_price_range(self.bob, 1))
+
+
+class PurchasePriceTest(TestCase):
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+    ]
+
+    def setUp(self):
+        self.part = Part.objects.get(name='M2x4 LPHS')
+
+        backend = ExchangeBackend.objects.create(name='InvenTreeExchange', base_currency='USD')
+
+        Rate.objects.create(backend=backend, currency='USD', value=1)
+        Rate.objects.create(backend=backend, currency='AUD', value=2)
+
+    def test_exchange_table(self):
+        """ Exchange rates are loaded into memory once """
+
+        rates = ExchangeRateTable()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(rates.get_rate('USD', 'AUD'), 2)
+            self.assertEqual(rates.convert(10, 'AUD', 'USD'), 5)
+
+            with self.assertRaises(MissingRate):
+                rates.get_rate('USD', 'NZD')
+
+    def test_purchase_prices(self):
+        """ Purchase prices in multiple currencies are converted to the target currency """
+
+        for price, currency in [(10, 'USD'), (40, 'AUD'), (5, 'USD')]:
+            StockItem.objects.create(part=self.part, quantity=1, purchase_price=Money(price, currency))
+
+        prices = part_pricing.get_purchase_prices([self.part.pk], currency='USD')
+
+        pmin, pmax, pavg = prices[self.part.pk]
+
+        self.assertEqual(pmin.amount, 5)
+        self.assertEqual(pmax.amount, 20)
+        self.assertAlmostEqual(float(pavg.amount), 35 / 3, places=4)
+        self.assertEqual(str(pavg.currency), 'USD')
+
+        # Prices which cannot be converted are not mixed with other currencies
+        Rate.objects.filter(currency='AUD').delete()
+
+        prices = part_pricing.get_purchase_prices([self.part.pk], currency='USD')
+
+        pmin, pmax, pavg = prices[self.part.pk]
+
+        self.assertEqual(pmin.amount, 5)
+        self.assertEqual(pmax.amount, 10)
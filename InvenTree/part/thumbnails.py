@@ -0,0 +1,158 @@
+"""
+Pre-generated image variants (thumbnail / preview) for Part images.
+
+Part images are stored using a StdImageField, which renders a set of
+smaller "variations" of each uploaded image (e.g. part_images/motor.thumbnail.png).
+Views which display many images (e.g. the part image picker) should
+serve these variations, rather than the full-size images.
+
+This module provides:
+
+- Helper functions for determining the variation files for an image
+- Detection of missing variation files (e.g. for images imported directly into the media directory)
+- Rendering of the missing variations, in parallel (see the 'rebuild_thumbnails' command)
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+
+from stdimage.models import StdImageFieldFile
+
+from InvenTree.helpers import getMediaUrl
+
+from part import models as PartModels
+
+
+# Time (seconds) for which browsers may cache an image variation without revalidation
+VARIATION_CACHE_MAX_AGE = 86400
+
+
+def get_variations():
+    """
+    Return the image variations defined for the Part image field.
+
+    Returns a dict of variation name -> variation (dict of name, width, height, crop, etc)
+    """
+
+    return PartModels.Part._meta.get_field('image').variations
+
+
+def get_variation_name(file_name, variation):
+    """
+    Return the file name of a particular variation of an image
+    (e.g. 'part_images/motor.png' -> 'part_images/motor.thumbnail.png')
+    """
+
+    return StdImageFieldFile.get_variation_name(str(file_name), variation)
+
+
+def get_variation_urls(file_name):
+    """
+    Return a dict of variation name -> media URL for an image
+    """
+
+    return {
+        variation: getMediaUrl(get_variation_name(file_name, variation)) for variation in get_variations().keys()
+    }
+
+
+def is_variation(path):
+    """
+    Return True if the provided (media) path refers to a variation of an image
+    """
+
+    base, _ext = os.path.splitext(str(path))
+    _base, variation = os.path.splitext(base)
+
+    return variation[1:] in get_variations()
+
+
+def get_missing_variations(file_name, storage=default_storage):
+    """
+    Return a list of the variations which do not exist (yet) for an image
+    """
+
+    return [
+        variation for variation in get_variations().keys() if not storage.exists(get_variation_name(file_name, variation))
+    ]
+
+
+def render_variations(file_name, variations, replace=False):
+    """
+    Render the provided variations for a single image.
+
+    This function is executed in a worker process,
+    and must not access the database.
+
+    Returns:
+        (file_name, number of variations rendered, error message or None)
+    """
+
+    rendered = 0
+
+    try:
+        if not default_storage.exists(file_name):
+            return file_name, rendered, 'Image file does not exist'
+
+        for variation in variations:
+            StdImageFieldFile.render_variation(file_name, variation, replace=replace, storage=default_storage)
+            rendered += 1
+
+    except Exception as e:
+        return file_name, rendered, str(e)
+
+    return file_name, rendered, None
+
+
+def get_images():
+    """
+    Return a list of the (distinct) image files referenced by Part objects
+    """
+
+    images = PartModels.Part.objects.exclude(image='').exclude(image=None)
+
+    return list(images.order_by('image').values_list('image', flat=True).distinct())
+
+
+def rebuild_variations(images=None, replace=False, workers=None):
+    """
+    Render image variations for Part images, using a pool of worker processes.
+
+    Args:
+        images: List of image file names (default = all images referenced by Part objects)
+        replace: If True, re-render all variations. Otherwise, only missing variations are rendered
+        workers: Number of worker processes (default = number of processors)
+
+    Yields:
+        (file_name, number of variations rendered, error message or None) for each image
+    """
+
+    if images is None:
+        images = get_images()
+
+    variations = get_variations()
+
+    jobs = []
+
+    for file_name in images:
+        if replace:
+            names = list(variations.keys())
+        else:
+            names = get_missing_variations(file_name)
+
+        if len(names) > 0:
+            jobs.append((file_name, [variations[name] for name in names]))
+
+    if len(jobs) == 0:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_variations, file_name, job, replace) for file_name, job in jobs]
+
+        for future in futures:
+            yield future.result()
@@ -27,7 +27,6 @@ import requests
 import os
 import io
 
-from rapidfuzz import fuzz
 from decimal import Decimal, InvalidOperation
 
 from .models import PartCategory, Part, PartAttachment, PartRelated
@@ -35,6 +34,7 @@ from .models import PartParameterTemplate, PartParameter
 from .models import PartCategoryParameterTemplate
 from .models import BomItem
 from .models import match_part_names
+from . import matching as part_matching
 from .models import PartTestTemplate
 from .models import PartSellPriceBreak
 
@@ -44,6 +44,7 @@ from company.models import SupplierPart
 import common.settings as inventree_settings
 
 from . import forms as part_forms
+from . import pricing as part_pricing
 from .bom import MakeBomTemplate, BomUploadManager, ExportBom, IsValidBOMFormat
 
 from .admin import PartResource
@@ -846,7 +847,19 @@ class PartPricingView(PartDetail):
             ctx['price_history'] = ret
 
         # BOM Information for Pie-Chart
-        bom_items = [{'name': str(a.sub_part), 'price': a.sub_part.get_price_range(quantity), 'q': a.quantity} for a in part.bom_items.all()]
+        pricing = part_pricing.BomPricing([part])
+
+        bom_items = []
+
+        for a in part.bom_items.all().select_related('sub_part'):
+            price = part_pricing.get_price_range(a.sub_part, quantity, engine=pricing)
+
+            # Lines without pricing information cannot be displayed
+            if price is None:
+                continue
+
+            bom_items.append({'name': str(a.sub_part), 'price': price, 'q': a.quantity})
+
         if [True for a in bom_items if len(set(a['price'])) == 2]:
             ctx['bom_parts'] = [{
                 'name': a['name'],
@@ -1372,6 +1385,8 @@ class BomUpload(InvenTreeRoleMixin, FormView):
         o_idx = self.getColumnIndex('Overage')
         n_idx = self.getColumnIndex('Note')
 
+        allowed_ids = [part.pk for part in self.allowed_parts]
+
         for row in self.bom_rows:
             """
 
@@ -1437,17 +1452,11 @@ class BomUpload(InvenTreeRoleMixin, FormView):
 
                 row['part_name'] = part_name
 
-                matches = []
-
-                for part in self.allowed_parts:
-                    ratio = fuzz.partial_ratio(part.name + part.description, part_name)
-                    matches.append({'part': part, 'match': ratio})
+                # Score the closest matching parts using the part name index
+                ratios = dict(part_matching.part_name_index.match(part_name, threshold=0, parts=allowed_ids))
 
-                # Sort matches by the 'strength' of the match ratio
-                if len(matches) > 0:
-                    matches = sorted(matches, key=lambda item: item['match'], reverse=True)
-
-                    part_options = [m['part'] for m in matches]
+                # Sort parts by the 'strength' of the match ratio
+                part_options = sorted(self.allowed_parts, key=lambda part: ratios.get(part.pk, 0), reverse=True)
 
             # Check if there is a column corresponding to "Part IPN"
             if i_idx >= 0:
@@ -2078,9 +2087,12 @@ class PartPricing(AjaxView):
         if part is None:
             return ctx
 
+        # Pricing engine (shared between supplier and BOM pricing calculations)
+        pricing = part_pricing.BomPricing([part])
+
         # Supplier pricing information
         if part.supplier_count > 0:
-            buy_price = part.get_supplier_price_range(quantity)
+            buy_price = part_pricing.get_supplier_price_range(part, quantity, engine=pricing)
 
             if buy_price is not None:
                 min_buy_price, max_buy_price = buy_price
@@ -2105,7 +2117,7 @@ class PartPricing(AjaxView):
         # BOM pricing information
         if part.bom_count > 0:
 
-            bom_price = part.get_bom_price_range(quantity)
+            bom_price = part_pricing.get_bom_price_range(part, quantity, engine=pricing)
 
             if bom_price is not None:
                 min_bom_price, max_bom_price = bom_price
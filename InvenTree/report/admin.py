@@ -9,6 +9,7 @@ from .models import BuildReport
 from .models import BillOfMaterialsReport
 from .models import PurchaseOrderReport
 from .models import SalesOrderReport
+from .models import ReportJob
 
 
 class ReportTemplateAdmin(admin.ModelAdmin):
@@ -26,6 +27,11 @@ class ReportAssetAdmin(admin.ModelAdmin):
     list_display = ('id', 'asset', 'description')
 
 
+class ReportJobAdmin(admin.ModelAdmin):
+
+    list_display = ('id', 'report_type', 'report_id', 'user', 'created', 'status', 'progress')
+
+
 admin.site.register(ReportSnippet, ReportSnippetAdmin)
 admin.site.register(ReportAsset, ReportAssetAdmin)
 
@@ -34,3 +40,4 @@ admin.site.register(BuildReport, ReportTemplateAdmin)
 admin.site.register(BillOfMaterialsReport, ReportTemplateAdmin)
 admin.site.register(PurchaseOrderReport, ReportTemplateAdmin)
 admin.site.register(SalesOrderReport, ReportTemplateAdmin)
+admin.site.register(ReportJob, ReportJobAdmin)
@@ -1,18 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import os
+
 from django.utils.translation import ugettext_lazy as _
 from django.conf.urls import url, include
-from django.core.exceptions import ValidationError, FieldError
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse
 
 from django_filters.rest_framework import DjangoFilterBackend
 
-from rest_framework import generics, filters
+from rest_framework import generics, filters, status
 from rest_framework.response import Response
 
 import common.models
 import InvenTree.helpers
+import InvenTree.tasks
 
 from stock.models import StockItem
 
@@ -25,12 +27,14 @@ from .models import BuildReport
 from .models import BillOfMaterialsReport
 from .models import PurchaseOrderReport
 from .models import SalesOrderReport
+from .models import ReportJob
 
 from .serializers import TestReportSerializer
 from .serializers import BuildReportSerializer
 from .serializers import BOMReportSerializer
 from .serializers import POReportSerializer
 from .serializers import SOReportSerializer
+from .serializers import ReportJobSerializer
 
 
 class ReportListView(generics.ListAPIView):
@@ -203,6 +207,10 @@ class ReportPrintMixin:
 
             return Response(data, status=400)
 
+        # Render the report in the background?
+        if InvenTree.helpers.str2bool(request.query_params.get('background', False)):
+            return self.print_background(request, items_to_print)
+
         outputs = []
 
         # In debug mode, generate single HTML output, rather than PDF
@@ -260,6 +268,84 @@ class ReportPrintMixin:
                 content_type='application/pdf'
             )
 
+    def print_background(self, request, items_to_print):
+        """
+        Create a ReportJob to render this report template in the background worker.
+
+        Returns the job details, which can be polled (via the job detail endpoint)
+        until the rendered report is available for download.
+        """
+
+        report = self.get_object()
+
+        job = ReportJob.objects.create(
+            report_type=report._meta.model_name,
+            report_id=report.pk,
+            item_type=items_to_print[0]._meta.label_lower,
+            items=[item.pk for item in items_to_print],
+            user=request.user if request.user.is_authenticated else None,
+            base_url=request.build_absolute_uri('/'),
+        )
+
+        InvenTree.tasks.offload_task('InvenTree.tasks.render_report_job', job.pk)
+
+        serializer = ReportJobSerializer(job, context={'request': request})
+
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class ReportJobMixin:
+    """
+    Mixin for accessing ReportJob objects.
+
+    Users can only access the report jobs which they created.
+    """
+
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+
+    def get_queryset(self):
+
+        queryset = super().get_queryset()
+
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(user=self.request.user)
+
+        return queryset
+
+
+class ReportJobDetail(ReportJobMixin, generics.RetrieveAPIView):
+    """
+    API endpoint for polling the status of a ReportJob
+    """
+
+    pass
+
+
+class ReportJobDownload(ReportJobMixin, generics.RetrieveAPIView):
+    """
+    API endpoint for downloading the output of a completed ReportJob
+    """
+
+    def get(self, request, *args, **kwargs):
+
+        job = self.get_object()
+
+        if not job.is_complete or not job.output:
+            data = {
+                'error': _('Report is not yet available'),
+                'status': job.get_status_display(),
+            }
+
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+
+        return FileResponse(
+            job.output.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.output.name),
+            content_type='application/pdf',
+        )
+
 
 class StockItemTestReportList(ReportListView, StockItemReportMixin):
     """
@@ -286,42 +372,14 @@ class StockItemTestReportList(ReportListView, StockItemReportMixin):
             """
             We wish to filter by stock items.
 
-            We need to compare the 'filters' string of each report,
-            and see if it matches against each of the specified stock items.
-
-            TODO: In the future, perhaps there is a way to make this more efficient.
+            The 'filters' string of each report is evaluated against
+            the entire set of requested stock items (a single query per report).
             """
 
-            valid_report_ids = set()
-
-            for report in queryset.all():
-
-                matches = True
-
-                # Filter string defined for the report object
-                try:
-                    filters = InvenTree.helpers.validateFilterString(report.filters)
-                except:
-                    continue
-
-                for item in items:
-                    item_query = StockItem.objects.filter(pk=item.pk)
-
-                    try:
-                        if not item_query.filter(**filters).exists():
-                            matches = False
-                            break
-                    except FieldError:
-                        matches = False
-                        break
-
-                if matches:
-                    valid_report_ids.add(report.pk)
-                else:
-                    continue
+            valid_report_ids = InvenTree.helpers.getMatchingTemplates(queryset.all(), StockItem, items)
 
             # Reduce queryset to only valid matches
-            queryset = queryset.filter(pk__in=[pk for pk in valid_report_ids])
+            queryset = queryset.filter(pk__in=valid_report_ids)
         return queryset
 
 
@@ -374,42 +432,16 @@ class BOMReportList(ReportListView, PartReportMixin):
 
         if len(parts) > 0:
             """
-            We wish to filter by part(s).
+            We wish to filter by parts.
 
-            We need to compare the 'filters' string of each report,
-            and see if it matches against each of the specified parts.
+            The 'filters' string of each report is evaluated against
+            the entire set of requested parts (a single query per report).
             """
 
-            valid_report_ids = set()
-
-            for report in queryset.all():
-
-                matches = True
-
-                try:
-                    filters = InvenTree.helpers.validateFilterString(report.filters)
-                except ValidationError:
-                    # Filters are ill-defined
-                    continue
-
-                for p in parts:
-                    part_query = part.models.Part.objects.filter(pk=p.pk)
-
-                    try:
-                        if not part_query.filter(**filters).exists():
-                            matches = False
-                            break
-                    except FieldError:
-                        matches = False
-                        break
-
-                if matches:
-                    valid_report_ids.add(report.pk)
-                else:
-                    continue
+            valid_report_ids = InvenTree.helpers.getMatchingTemplates(queryset.all(), part.models.Part, parts)
 
             # Reduce queryset to only valid matches
-            queryset = queryset.filter(pk__in=[pk for pk in valid_report_ids])
+            queryset = queryset.filter(pk__in=valid_report_ids)
 
         return queryset
 
@@ -463,43 +495,16 @@ class BuildReportList(ReportListView, BuildReportMixin):
 
         if len(builds) > 0:
             """
-            We wish to filter by Build(s)
-
-            We need to compare the 'filters' string of each report,
-            and see if it matches against each of the specified parts
+            We wish to filter by builds.
 
-            # TODO: This code needs some refactoring!
+            The 'filters' string of each report is evaluated against
+            the entire set of requested builds (a single query per report).
             """
 
-            valid_build_ids = set()
-
-            for report in queryset.all():
-
-                matches = True
-
-                try:
-                    filters = InvenTree.helpers.validateFilterString(report.filters)
-                except ValidationError:
-                    continue
-
-                for b in builds:
-                    build_query = build.models.Build.objects.filter(pk=b.pk)
-
-                    try:
-                        if not build_query.filter(**filters).exists():
-                            matches = False
-                            break
-                    except FieldError:
-                        matches = False
-                        break
-
-                if matches:
-                    valid_build_ids.add(report.pk)
-                else:
-                    continue
+            valid_build_ids = InvenTree.helpers.getMatchingTemplates(queryset.all(), build.models.Build, builds)
 
             # Reduce queryset to only valid matches
-            queryset = queryset.filter(pk__in=[pk for pk in valid_build_ids])
+            queryset = queryset.filter(pk__in=valid_build_ids)
 
         return queryset
 
@@ -543,44 +548,16 @@ class POReportList(ReportListView, OrderReportMixin):
 
         if len(orders) > 0:
             """
-            We wish to filter by purchase orders
-
-            We need to compare the 'filters' string of each report,
-            and see if it matches against each of the specified orders.
+            We wish to filter by purchase orders.
 
-            TODO: In the future, perhaps there is a way to make this more efficient.
+            The 'filters' string of each report is evaluated against
+            the entire set of requested purchase orders (a single query per report).
             """
 
-            valid_report_ids = set()
-
-            for report in queryset.all():
-
-                matches = True
-
-                # Filter string defined for the report object
-                try:
-                    filters = InvenTree.helpers.validateFilterString(report.filters)
-                except:
-                    continue
-
-                for o in orders:
-                    order_query = order.models.PurchaseOrder.objects.filter(pk=o.pk)
-
-                    try:
-                        if not order_query.filter(**filters).exists():
-                            matches = False
-                            break
-                    except FieldError:
-                        matches = False
-                        break
-
-                if matches:
-                    valid_report_ids.add(report.pk)
-                else:
-                    continue
+            valid_report_ids = InvenTree.helpers.getMatchingTemplates(queryset.all(), order.models.PurchaseOrder, orders)
 
             # Reduce queryset to only valid matches
-            queryset = queryset.filter(pk__in=[pk for pk in valid_report_ids])
+            queryset = queryset.filter(pk__in=valid_report_ids)
 
         return queryset
 
@@ -626,44 +603,16 @@ class SOReportList(ReportListView, OrderReportMixin):
 
         if len(orders) > 0:
             """
-            We wish to filter by purchase orders
+            We wish to filter by sales orders.
 
-            We need to compare the 'filters' string of each report,
-            and see if it matches against each of the specified orders.
-
-            TODO: In the future, perhaps there is a way to make this more efficient.
+            The 'filters' string of each report is evaluated against
+            the entire set of requested sales orders (a single query per report).
             """
 
-            valid_report_ids = set()
-
-            for report in queryset.all():
-
-                matches = True
-
-                # Filter string defined for the report object
-                try:
-                    filters = InvenTree.helpers.validateFilterString(report.filters)
-                except:
-                    continue
-
-                for o in orders:
-                    order_query = order.models.SalesOrder.objects.filter(pk=o.pk)
-
-                    try:
-                        if not order_query.filter(**filters).exists():
-                            matches = False
-                            break
-                    except FieldError:
-                        matches = False
-                        break
-
-                if matches:
-                    valid_report_ids.add(report.pk)
-                else:
-                    continue
+            valid_report_ids = InvenTree.helpers.getMatchingTemplates(queryset.all(), order.models.SalesOrder, orders)
 
             # Reduce queryset to only valid matches
-            queryset = queryset.filter(pk__in=[pk for pk in valid_report_ids])
+            queryset = queryset.filter(pk__in=valid_report_ids)
 
         return queryset
 
@@ -696,6 +645,12 @@ class SOReportPrint(generics.RetrieveAPIView, OrderReportMixin, ReportPrintMixin
 
 report_api_urls = [
 
+    # Background report jobs
+    url(r'^job/(?P<pk>\d+)/', include([
+        url(r'^download/?$', ReportJobDownload.as_view(), name='api-report-job-download'),
+        url(r'^.*$', ReportJobDetail.as_view(), name='api-report-job-detail'),
+    ])),
+
     # Purchase order reports
     url(r'po/', include([
         # Detail views
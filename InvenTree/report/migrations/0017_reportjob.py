@@ -0,0 +1,34 @@
+# Generated by Django 3.2.4 on 2021-06-20 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import report.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('report', '0016_auto_20210513_1303'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=100, verbose_name='Report Type')),
+                ('report_id', models.PositiveIntegerField(verbose_name='Report ID')),
+                ('item_type', models.CharField(max_length=100, verbose_name='Item Type')),
+                ('items', models.JSONField(default=list, verbose_name='Items')),
+                ('base_url', models.CharField(blank=True, max_length=250, verbose_name='Base URL')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created')),
+                ('status', models.PositiveIntegerField(choices=[(10, 'Pending'), (20, 'Running'), (30, 'Complete'), (40, 'Failed')], default=10, verbose_name='Status')),
+                ('progress', models.PositiveIntegerField(default=0, verbose_name='Progress')),
+                ('output', models.FileField(blank=True, help_text='Rendered report file', null=True, storage=report.models.get_report_output_storage, upload_to=report.models.rename_report_output, verbose_name='Output')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+        ),
+    ]
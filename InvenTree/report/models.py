@@ -7,12 +7,17 @@ from __future__ import unicode_literals
 
 import os
 import sys
+import uuid
 import logging
 
 import datetime
 
 from django.db import models
+from django.apps import apps
 from django.conf import settings
+from django.contrib.auth.models import User, AnonymousUser
+from django.core.files.base import ContentFile
+from django.http import HttpRequest
 from django.core.exceptions import ValidationError, FieldError
 
 from django.template.loader import render_to_string
@@ -32,7 +37,9 @@ from InvenTree.helpers import validateFilterString
 from django.utils.translation import gettext_lazy as _
 
 try:
+    import weasyprint
     from django_weasyprint import WeasyTemplateResponseMixin
+    from django_weasyprint.utils import django_url_fetcher
 except OSError as err:
     print("OSError: {e}".format(e=err))
     print("You may require some further system packages to be installed.")
@@ -285,6 +292,25 @@ class ReportTemplateBase(ReportBase):
             self.context(request),
             **kwargs)
 
+    def render_document(self, request, base_url=None):
+        """
+        Render the template to a weasyprint Document object.
+
+        Used for rendering reports outside of the request / response cycle
+        (e.g. in a background worker).
+        """
+
+        if base_url is None:
+            base_url = request.build_absolute_uri("/")
+
+        html = weasyprint.HTML(
+            string=self.render_as_string(request),
+            base_url=base_url,
+            url_fetcher=django_url_fetcher,
+        )
+
+        return html.render()
+
     filename_pattern = models.CharField(
         default="report.pdf",
         verbose_name=_('Filename Pattern'),
@@ -567,3 +593,189 @@ class ReportAsset(models.Model):
     )
 
     description = models.CharField(max_length=250, verbose_name=_('Description'), help_text=_("Asset file description"))
+
+
+def get_report_output_storage():
+    """
+    Rendered reports are stored outside of the MEDIA_ROOT directory,
+    so they can only be accessed via the report download API (which checks the job owner).
+    """
+
+    return FileSystemStorage(location=settings.REPORT_OUTPUT_ROOT)
+
+
+def rename_report_output(instance, filename):
+    """
+    Rendered reports are stored in a randomly named directory,
+    so the files cannot be found by enumerating the job IDs.
+    """
+
+    filename = os.path.basename(filename)
+
+    return os.path.join(uuid.uuid4().hex, filename)
+
+
+class ReportJob(models.Model):
+    """
+    A report which is rendered (against one or more items) by the background worker.
+
+    The rendered PDF file is stored in REPORT_OUTPUT_ROOT (not accessible as a media file),
+    and can be downloaded via the API once the job is complete.
+
+    Attributes:
+        report_type: Model name of the report template (e.g. 'testreport')
+        report_id: Primary key of the report template
+        item_type: Model label of the items to print (e.g. 'stock.stockitem')
+        items: List of primary keys of the items to print
+        user: User who requested the report
+        base_url: Base URL used for loading report assets
+        created: Date the job was created
+        status: Job status code
+        progress: Number of items which have been rendered
+        output: Rendered PDF file
+        error: Error message (if the job failed)
+    """
+
+    PENDING = 10
+    RUNNING = 20
+    COMPLETE = 30
+    FAILED = 40
+
+    STATUS_CHOICES = [
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (COMPLETE, _('Complete')),
+        (FAILED, _('Failed')),
+    ]
+
+    # Number of items rendered between progress updates
+    CHUNK_SIZE = 10
+
+    def __str__(self):
+        return f"{self.report_type} <{self.report_id}> - {self.get_status_display()}"
+
+    report_type = models.CharField(max_length=100, verbose_name=_('Report Type'))
+
+    report_id = models.PositiveIntegerField(verbose_name=_('Report ID'))
+
+    item_type = models.CharField(max_length=100, verbose_name=_('Item Type'))
+
+    items = models.JSONField(default=list, verbose_name=_('Items'))
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True, null=True,
+        verbose_name=_('User'),
+    )
+
+    base_url = models.CharField(max_length=250, blank=True, verbose_name=_('Base URL'))
+
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_('Created'))
+
+    status = models.PositiveIntegerField(
+        default=PENDING,
+        choices=STATUS_CHOICES,
+        verbose_name=_('Status'),
+    )
+
+    progress = models.PositiveIntegerField(default=0, verbose_name=_('Progress'))
+
+    output = models.FileField(
+        upload_to=rename_report_output,
+        storage=get_report_output_storage,
+        blank=True, null=True,
+        verbose_name=_('Output'),
+        help_text=_('Rendered report file'),
+    )
+
+    error = models.TextField(blank=True, verbose_name=_('Error'))
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    @property
+    def is_complete(self):
+        return self.status == self.COMPLETE
+
+    def get_report(self):
+        """ Return the report template associated with this job """
+
+        model = apps.get_model('report', self.report_type)
+
+        return model.objects.get(pk=self.report_id)
+
+    def get_items(self):
+        """ Return the items to print (in the order they were requested) """
+
+        model = apps.get_model(self.item_type)
+
+        items = model.objects.in_bulk(self.items)
+
+        return [items[pk] for pk in self.items if pk in items]
+
+    def get_request(self):
+        """
+        Construct a request object for rendering the report.
+
+        The report is rendered by the background worker,
+        outside of the request / response cycle.
+        """
+
+        request = HttpRequest()
+        request.user = self.user or AnonymousUser()
+
+        return request
+
+    def run(self):
+        """
+        Render the report against each item, and save the merged output to a PDF file.
+
+        Items are rendered in chunks, and the job progress is updated after each chunk.
+        """
+
+        self.status = self.RUNNING
+        self.progress = 0
+        self.save()
+
+        try:
+            report = self.get_report()
+            request = self.get_request()
+            items = self.get_items()
+
+            if len(items) == 0:
+                raise ValueError(_('No valid objects provided to template'))
+
+            documents = []
+
+            for idx in range(0, len(items), self.CHUNK_SIZE):
+                for item in items[idx:idx + self.CHUNK_SIZE]:
+                    report.object_to_print = item
+                    documents.append(report.render_document(request, base_url=self.base_url))
+
+                self.progress = len(documents)
+                self.save(update_fields=['progress'])
+
+            filename = report.generate_filename(request)
+
+            if not filename.endswith('.pdf'):
+                filename += '.pdf'
+
+            pages = []
+
+            for document in documents:
+                pages += document.pages
+
+            pdf = documents[0].copy(pages).write_pdf()
+
+            self.output.save(filename, ContentFile(pdf), save=False)
+            self.status = self.COMPLETE
+
+        except Exception as e:
+            logger.error(f"Report job <{self.pk}> failed: {e}")
+
+            self.status = self.FAILED
+            self.error = str(e)
+
+        self.save()
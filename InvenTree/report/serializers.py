@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from django.urls import reverse
+
+from rest_framework import serializers
+
 from InvenTree.serializers import InvenTreeModelSerializer
 from InvenTree.serializers import InvenTreeAttachmentSerializerField
 
@@ -8,6 +12,7 @@ from .models import TestReport
 from .models import BuildReport
 from .models import BillOfMaterialsReport
 from .models import PurchaseOrderReport, SalesOrderReport
+from .models import ReportJob
 
 
 class TestReportSerializer(InvenTreeModelSerializer):
@@ -88,3 +93,43 @@ class SOReportSerializer(InvenTreeModelSerializer):
             'filters',
             'enabled',
         ]
+
+
+class ReportJobSerializer(InvenTreeModelSerializer):
+    """ Serializer for the ReportJob model """
+
+    status_text = serializers.CharField(source='get_status_display', read_only=True)
+
+    total = serializers.IntegerField(read_only=True)
+
+    download = serializers.SerializerMethodField()
+
+    def get_download(self, job):
+        """
+        Return the URL of the download endpoint (once the report is available).
+
+        The URL of the output file itself is not provided,
+        as the download endpoint checks that the user created the job.
+        """
+
+        if job.is_complete and job.output:
+            return reverse('api-report-job-download', kwargs={'pk': job.pk})
+
+        return None
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'pk',
+            'report_type',
+            'report_id',
+            'created',
+            'status',
+            'status_text',
+            'progress',
+            'total',
+            'download',
+            'error',
+        ]
+
+        read_only_fields = fields
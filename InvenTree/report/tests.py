@@ -1,2 +1,101 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from InvenTree.api_tester import InvenTreeAPITestCase
+
+from .models import ReportJob
+
+
+class ReportJobTest(InvenTreeAPITestCase):
+    """
+    Tests for background report jobs
+    """
+
+    fixtures = [
+        'category',
+        'part',
+        'location',
+        'stock',
+    ]
+
+    def setUp(self):
+
+        super().setUp()
+
+        self.job = ReportJob.objects.create(
+            report_type='testreport',
+            report_id=1,
+            item_type='stock.stockitem',
+            items=[102, 100, 999999, 101],
+            user=self.user,
+            base_url='http://localhost/',
+        )
+
+    def test_items(self):
+        """
+        Items are returned in the requested order, ignoring invalid items
+        """
+
+        items = self.job.get_items()
+
+        self.assertEqual([item.pk for item in items], [102, 100, 101])
+        self.assertEqual(self.job.total, 4)
+
+    def test_status(self):
+        """
+        Test the job status and download endpoints
+        """
+
+        url = reverse('api-report-job-detail', kwargs={'pk': self.job.pk})
+
+        response = self.get(url)
+
+        self.assertEqual(response.data['status'], ReportJob.PENDING)
+        self.assertEqual(response.data['progress'], 0)
+        self.assertEqual(response.data['total'], 4)
+
+        # The output file location is not exposed (only the download endpoint)
+        self.assertNotIn('output', response.data)
+        self.assertIsNone(response.data['download'])
+
+        # Report output is not yet available
+        url = reverse('api-report-job-download', kwargs={'pk': self.job.pk})
+
+        response = self.get(url, code=400)
+
+        # Users cannot access report jobs created by other users
+        other = get_user_model().objects.create_user(username='other', password='password')
+
+        self.job.user = other
+        self.job.save()
+
+        self.get(url, code=404)
+
+    def test_output(self):
+        """
+        Rendered output is stored outside the media directory, and served via the download endpoint
+        """
+
+        self.job.output.save('report.pdf', ContentFile(b'%PDF-1.4'), save=False)
+        self.job.status = ReportJob.COMPLETE
+        self.job.save()
+
+        path = os.path.abspath(self.job.output.path)
+
+        self.assertTrue(path.startswith(settings.REPORT_OUTPUT_ROOT))
+        self.assertFalse(path.startswith(settings.MEDIA_ROOT + os.sep))
+
+        url = reverse('api-report-job-download', kwargs={'pk': self.job.pk})
+
+        response = self.get(url)
+
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+
+        self.job.output.delete(save=False)
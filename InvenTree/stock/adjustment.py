@@ -0,0 +1,284 @@
+"""
+Bulk stock adjustment operations.
+
+Adjusting the stock of many items (e.g. counting the stock in an entire warehouse)
+via the StockItem.stocktake / add_stock / take_stock / move methods
+saves each item (and creates each tracking entry) separately.
+
+The StockAdjustment class performs the same operations against a set of stock items:
+
+- Stock items are loaded in a single query
+- Changes are validated in memory
+- Changed items are saved with a single bulk update
+- Stock tracking entries are created with a single bulk insert
+
+Items which are depleted (and need to be deleted), or which need to be split,
+are handled individually.
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+
+from InvenTree.status_codes import StockHistoryCode
+from InvenTree.tree import invalidate_tree_cache
+
+import common.search as common_search
+
+from part import models as PartModels
+from stock import models as StockModels
+
+
+class StockAdjustment:
+    """
+    Perform a bulk stock adjustment, against multiple stock items.
+
+    Args:
+        user: The user performing the adjustment
+        notes: User notes (added to each stock tracking entry)
+
+    Usage:
+        adjustment = StockAdjustment(user, notes)
+        items = adjustment.load_items(pk_list)
+
+        for item in items.values():
+            adjustment.count(item, quantity)
+
+        adjustment.save()
+
+    Each operation returns True if the adjustment was performed (matching the StockItem methods),
+    and records a per-item result (see results)
+    """
+
+    # Fields which may be changed by a stock adjustment
+    UPDATE_FIELDS = [
+        'quantity',
+        'location',
+        'stocktake_date',
+        'stocktake_user',
+        'updated',
+    ]
+
+    def __init__(self, user, notes=''):
+
+        self.user = user
+        self.notes = notes
+
+        self.date = datetime.now()
+
+        # Stock items which need to be updated
+        self.items = {}
+
+        # Stock items which have been depleted
+        self.deleted = {}
+
+        # Stock tracking entries which will be created
+        self.tracking = []
+
+        # Per-item results
+        self.results = []
+
+        # Stock items which are "in stock"
+        self.in_stock = set()
+
+        # Parts affected by this adjustment
+        self.parts = set()
+
+    def load_items(self, pk_list):
+        """
+        Load the specified stock items from the database (in a single query).
+
+        Returns a dict of pk -> StockItem
+        """
+
+        items = StockModels.StockItem.objects.filter(pk__in=pk_list).select_related('part', 'location')
+
+        items = {item.pk: item for item in items}
+
+        self.in_stock = set(
+            StockModels.StockItem.objects.filter(
+                StockModels.StockItem.IN_STOCK_FILTER,
+                pk__in=items.keys(),
+            ).values_list('pk', flat=True)
+        )
+
+        return items
+
+    def result(self, item, success, error=None):
+        """ Record the result of an adjustment for a stock item """
+
+        result = {
+            'pk': item.pk,
+            'success': success,
+            'quantity': float(item.quantity),
+        }
+
+        if error is not None:
+            result['error'] = str(error)
+
+        self.results.append(result)
+
+        return success
+
+    def track(self, item, entry_type, deltas):
+        """ Add a stock tracking entry for a stock item """
+
+        self.tracking.append(
+            StockModels.StockItemTracking(
+                item=item,
+                tracking_type=entry_type,
+                user=self.user,
+                date=self.date,
+                notes=self.notes,
+                deltas=deltas,
+            )
+        )
+
+    def update_quantity(self, item, quantity):
+        """
+        Update the stock quantity for an item.
+
+        Returns False if the stock item was depleted (and will be deleted), else True
+
+        See: StockItem.updateQuantity()
+        """
+
+        if quantity < 0:
+            quantity = 0
+
+        item.quantity = quantity
+
+        self.parts.add(item.part_id)
+
+        if quantity == 0 and item.delete_on_deplete and item.can_delete():
+            self.items.pop(item.pk, None)
+            self.deleted[item.pk] = item
+            return False
+
+        self.items[item.pk] = item
+        return True
+
+    def count(self, item, quantity):
+        """ Count stock (see StockItem.stocktake) """
+
+        quantity = Decimal(quantity)
+
+        if quantity < 0 or item.infinite:
+            return self.result(item, False, _('Stock quantity cannot be adjusted'))
+
+        # Serialized stock quantity cannot be adjusted
+        if item.serialized:
+            return self.result(item, True)
+
+        item.stocktake_date = self.date.date()
+        item.stocktake_user = self.user
+
+        if self.update_quantity(item, quantity):
+            self.track(item, StockHistoryCode.STOCK_COUNT, {
+                'quantity': float(item.quantity),
+            })
+
+        return self.result(item, True)
+
+    def add(self, item, quantity):
+        """ Add stock (see StockItem.add_stock) """
+
+        quantity = Decimal(quantity)
+
+        if item.serialized or quantity <= 0 or item.infinite:
+            return self.result(item, False, _('Stock quantity cannot be adjusted'))
+
+        if self.update_quantity(item, item.quantity + quantity):
+            self.track(item, StockHistoryCode.STOCK_ADD, {
+                'added': float(quantity),
+                'quantity': float(item.quantity),
+            })
+
+        return self.result(item, True)
+
+    def remove(self, item, quantity):
+        """ Remove stock (see StockItem.take_stock) """
+
+        quantity = Decimal(quantity)
+
+        if item.serialized or quantity <= 0 or item.infinite:
+            return self.result(item, False, _('Stock quantity cannot be adjusted'))
+
+        if self.update_quantity(item, item.quantity - quantity):
+            self.track(item, StockHistoryCode.STOCK_REMOVE, {
+                'removed': float(quantity),
+                'quantity': float(item.quantity),
+            })
+
+        return self.result(item, True)
+
+    def move(self, item, location, quantity=None):
+        """
+        Move stock to a new location (see StockItem.move)
+
+        Note: If only part of the stock item is moved,
+              the stock item is split (this is performed immediately).
+        """
+
+        if quantity is None:
+            quantity = item.quantity
+
+        quantity = Decimal(quantity)
+
+        if item.pk not in self.in_stock:
+            return self.result(item, False, _('StockItem cannot be moved as it is not in stock'))
+
+        if quantity <= 0 or location is None:
+            return self.result(item, False, _('Stock item cannot be moved'))
+
+        if item.location_id == location.pk and quantity == item.quantity:
+            return self.result(item, False, _('Stock item is already in this location'))
+
+        self.parts.add(item.part_id)
+
+        if quantity < item.quantity:
+            # Partial stock movement, split the stock item
+            item.splitStock(quantity, location, self.user, notes=self.notes)
+            return self.result(item, True)
+
+        item.location = location
+        self.items[item.pk] = item
+
+        self.track(item, StockHistoryCode.STOCK_MOVE, {
+            'location': location.pk,
+        })
+
+        return self.result(item, True)
+
+    @transaction.atomic
+    def save(self):
+        """
+        Save all changes to the database.
+        """
+
+        items = list(self.items.values())
+
+        for item in items:
+            item.updated = self.date.date()
+
+        StockModels.StockItem.objects.bulk_update(items, self.UPDATE_FIELDS, batch_size=500)
+
+        StockModels.StockItemTracking.objects.bulk_create(self.tracking, batch_size=500)
+
+        for item in self.deleted.values():
+            item.delete()
+
+        # bulk_update does not send the post_save signal, so update the cached stock quantities here
+        for part_id in self.parts:
+            PartModels.update_part_quantities(part_id, 'in_stock')
+
+        # Stock items may have been moved to a different location
+        invalidate_tree_cache('stock.stocklocation')
+
+        # Update the search index (which includes the location name) for the changed items
+        common_search.SearchIndex.update_queryset(StockModels.StockItem.objects.filter(pk__in=[item.pk for item in items]))
@@ -9,23 +9,25 @@ from rest_framework import status
 
 from django.conf.urls import url, include
 from django.urls import reverse
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils.translation import ugettext_lazy as _
 
 from .models import StockLocation, StockItem
 from .models import StockItemTracking
 from .models import StockItemAttachment
 from .models import StockItemTestResult
+from .adjustment import StockAdjustment
+from . import tracking as stock_tracking
+from . import results as stock_results
 
 from part.models import Part, PartCategory
 from part.serializers import PartBriefSerializer
 
-from company.models import Company, SupplierPart
-from company.serializers import CompanySerializer, SupplierPartSerializer
-
-from order.models import PurchaseOrder
-from order.serializers import POSerializer
+from company.models import SupplierPart
+from company.serializers import SupplierPartSerializer
 
 import common.settings
 import common.models
@@ -35,9 +37,11 @@ from .serializers import LocationSerializer, LocationBriefSerializer
 from .serializers import StockTrackingSerializer
 from .serializers import StockItemAttachmentSerializer
 from .serializers import StockItemTestResultSerializer
+from .serializers import StockItemSerializeSerializer
 
 from InvenTree.views import TreeSerializer
-from InvenTree.helpers import str2bool, isNull
+from InvenTree.tree import get_item_counts
+from InvenTree.helpers import str2bool, isNull, extract_serial_numbers
 from InvenTree.api import AttachmentMixin
 
 from decimal import Decimal, InvalidOperation
@@ -58,8 +62,8 @@ class StockCategoryTree(TreeSerializer):
     def root_url(self):
         return reverse('stock-index')
 
-    def get_items(self):
-        return StockLocation.objects.all().prefetch_related('stock_items', 'children')
+    def get_item_counts(self):
+        return get_item_counts(StockItem.objects.all(), 'location')
 
     permission_classes = [
         permissions.IsAuthenticated,
@@ -111,6 +115,51 @@ class StockDetail(generics.RetrieveUpdateDestroyAPIView):
         return super().update(request, *args, **kwargs)
 
 
+class StockItemSerialize(generics.GenericAPIView):
+    """
+    API endpoint for serializing a StockItem
+
+    post:
+    Split the StockItem into (quantity) new items, each with a unique serial number.
+
+    - quantity: Number of items to serialize
+    - serial_numbers: Serial number string (e.g. "1-5, 7, 9")
+    - destination: Optional StockLocation for the new items
+    - notes: Optional notes for stock tracking
+    """
+
+    queryset = StockItem.objects.all()
+    serializer_class = StockItemSerializeSerializer
+
+    def post(self, request, *args, **kwargs):
+
+        item = self.get_object()
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+
+        quantity = data['quantity']
+        notes = data['notes']
+        destination = data.get('destination', None)
+
+        try:
+            serials = extract_serial_numbers(data['serial_numbers'], quantity)
+        except DjangoValidationError as e:
+            raise ValidationError({'serial_numbers': e.messages})
+
+        try:
+            items = item.serializeStock(quantity, serials, request.user, notes=notes, location=destination)
+        except DjangoValidationError as e:
+            raise ValidationError(e.message_dict)
+
+        return Response({
+            'success': _('Serialized {n} items').format(n=len(items)),
+            'items': [new_item.pk for new_item in items],
+        })
+
+
 class StockFilter(FilterSet):
     """ FilterSet for advanced stock filtering.
 
@@ -136,14 +185,17 @@ class StockAdjust(APIView):
     - StockRemove: remove stock items
     - StockTransfer: transfer stock items
 
-    # TODO - This needs serious refactoring!!!
-
+    All items are loaded and validated before any changes are made,
+    and the changes are saved in a single transaction (see stock.adjustment.StockAdjustment)
     """
 
     queryset = StockItem.objects.none()
 
     allow_missing_quantity = False
 
+    # Name of the StockAdjustment method which performs the adjustment (e.g. 'count')
+    operation = None
+
     def get_items(self, request):
         """
         Return a list of items posted to the endpoint.
@@ -160,6 +212,22 @@ class StockAdjust(APIView):
         else:
             raise ValidationError({'items': 'Request must contain list of stock items'})
 
+        self.notes = str(request.data.get('notes', ''))
+
+        self.adjustment = StockAdjustment(request.user, self.notes)
+
+        # Load all the referenced stock items in a single query
+        pk_list = []
+
+        for entry in _items:
+            if type(entry) == dict:
+                try:
+                    pk_list.append(int(entry.get('pk', None)))
+                except (ValueError, TypeError):
+                    pass
+
+        stock_items = self.adjustment.load_items(pk_list)
+
         # List of validated items
         self.items = []
 
@@ -169,9 +237,8 @@ class StockAdjust(APIView):
                 raise ValidationError({'error': 'Improperly formatted data'})
 
             try:
-                pk = entry.get('pk', None)
-                item = StockItem.objects.get(pk=pk)
-            except (ValueError, StockItem.DoesNotExist):
+                item = stock_items[int(entry.get('pk', None))]
+            except (ValueError, TypeError, KeyError):
                 raise ValidationError({'pk': 'Each entry must contain a valid pk field'})
 
             if self.allow_missing_quantity and 'quantity' not in entry:
@@ -190,13 +257,20 @@ class StockAdjust(APIView):
                 'quantity': quantity
             })
 
-        self.notes = str(request.data.get('notes', ''))
+    def adjust(self, item, quantity):
+        """
+        Perform the stock adjustment for a single item,
+        using the StockAdjustment method specified by the 'operation' attribute
+        """
 
+        return getattr(self.adjustment, self.operation)(item, quantity)
 
-class StockCount(StockAdjust):
-    """
-    Endpoint for counting stock (performing a stocktake).
-    """
+    def get_message(self, n):
+        """
+        Return the success message for the adjustment
+        """
+
+        return ''
 
     def post(self, request, *args, **kwargs):
 
@@ -205,29 +279,37 @@ class StockCount(StockAdjust):
         n = 0
 
         for item in self.items:
-
-            if item['item'].stocktake(item['quantity'], request.user, notes=self.notes):
+            if self.adjust(item['item'], item['quantity']):
                 n += 1
 
-        return Response({'success': _('Updated stock for {n} items').format(n=n)})
+        self.adjustment.save()
 
+        return Response({
+            'success': self.get_message(n),
+            'items': self.adjustment.results,
+        })
 
-class StockAdd(StockAdjust):
+
+class StockCount(StockAdjust):
     """
-    Endpoint for adding a quantity of stock to an existing StockItem
+    Endpoint for counting stock (performing a stocktake).
     """
 
-    def post(self, request, *args, **kwargs):
+    operation = 'count'
 
-        self.get_items(request)
+    def get_message(self, n):
+        return _('Updated stock for {n} items').format(n=n)
 
-        n = 0
 
-        for item in self.items:
-            if item['item'].add_stock(item['quantity'], request.user, notes=self.notes):
-                n += 1
+class StockAdd(StockAdjust):
+    """
+    Endpoint for adding a quantity of stock to an existing StockItem
+    """
 
-        return Response({"success": "Added stock for {n} items".format(n=n)})
+    operation = 'add'
+
+    def get_message(self, n):
+        return "Added stock for {n} items".format(n=n)
 
 
 class StockRemove(StockAdjust):
@@ -235,18 +317,10 @@ class StockRemove(StockAdjust):
     Endpoint for removing a quantity of stock from an existing StockItem.
     """
 
-    def post(self, request, *args, **kwargs):
+    operation = 'remove'
 
-        self.get_items(request)
-
-        n = 0
-
-        for item in self.items:
-
-            if item['item'].take_stock(item['quantity'], request.user, notes=self.notes):
-                n += 1
-
-        return Response({"success": "Removed stock for {n} items".format(n=n)})
+    def get_message(self, n):
+        return "Removed stock for {n} items".format(n=n)
 
 
 class StockTransfer(StockAdjust):
@@ -258,30 +332,28 @@ class StockTransfer(StockAdjust):
 
     def post(self, request, *args, **kwargs):
 
-        self.get_items(request)
-
         data = request.data
 
         try:
-            location = StockLocation.objects.get(pk=data.get('location', None))
+            self.location = StockLocation.objects.get(pk=data.get('location', None))
         except (ValueError, StockLocation.DoesNotExist):
             raise ValidationError({'location': 'Valid location must be specified'})
 
-        n = 0
+        return super().post(request, *args, **kwargs)
 
-        for item in self.items:
+    def adjust(self, item, quantity):
 
-            # If quantity is not specified, move the entire stock
-            if item['quantity'] in [0, None]:
-                item['quantity'] = item['item'].quantity
+        # If quantity is not specified, move the entire stock
+        if quantity in [0, None]:
+            quantity = item.quantity
 
-            if item['item'].move(location, self.notes, request.user, quantity=item['quantity']):
-                n += 1
+        return self.adjustment.move(item, self.location, quantity)
 
-        return Response({'success': _('Moved {n} parts to {loc}').format(
+    def get_message(self, n):
+        return _('Moved {n} parts to {loc}').format(
             n=n,
-            loc=str(location),
-        )})
+            loc=str(self.location),
+        )
 
 
 class StockLocationList(generics.ListCreateAPIView):
@@ -369,6 +441,7 @@ class StockList(generics.ListCreateAPIView):
         - supplier: Filter by supplier
         - ancestor: Filter by an 'ancestor' StockItem
         - status: Filter by the StockItem status
+        - test_detail: Include the status of the required tests for each StockItem
     """
 
     serializer_class = StockItemSerializer
@@ -500,6 +573,21 @@ class StockList(generics.ListCreateAPIView):
                 loc_id = stock_item['location']
                 stock_item['location_detail'] = location_map.get(loc_id, None)
 
+        # Do we wish to include the status of the required tests?
+        if str2bool(request.query_params.get('test_detail', False)):
+
+            # Calculate the test status for all returned items at once
+            test_status = stock_results.TestStatus(
+                StockItem.objects.filter(pk__in=[stock_item['pk'] for stock_item in data])
+            )
+
+            for stock_item in data:
+                status = test_status.status(stock_item['pk'])
+
+                stock_item['required_tests'] = status['total']
+                stock_item['tests_passed'] = status['passed']
+                stock_item['tests_failed'] = status['failed']
+
         """
         Determine the response type based on the request.
         a) For HTTP requests (e.g. via the browseable API) return a DRF response
@@ -1006,56 +1094,82 @@ class StockTrackingList(generics.ListAPIView):
 
         return self.serializer_class(*args, **kwargs)
 
-    def list(self, request, *args, **kwargs):
+    # Number of tracking entries serialized at once, when streaming the response
+    STREAM_CHUNK_SIZE = 250
 
-        queryset = self.filter_queryset(self.get_queryset())
+    def get_queryset(self, *args, **kwargs):
 
-        serializer = self.get_serializer(queryset, many=True)
+        queryset = super().get_queryset(*args, **kwargs)
 
-        data = serializer.data
+        queryset = queryset.select_related(
+            'item',
+            'item__part',
+            'item__location',
+            'user',
+        )
 
-        # Attempt to add extra context information to the historical data
-        for item in data:
-            deltas = item['deltas']
+        return queryset
 
-            if not deltas:
-                deltas = {}
+    def serialize_rows(self, queryset):
+        """
+        Serialize a set of tracking entries,
+        adding detail information for the objects referenced by each entry
+        """
 
-            # Add location detail
-            if 'location' in deltas:
-                try:
-                    location = StockLocation.objects.get(pk=deltas['location'])
-                    serializer = LocationSerializer(location)
-                    deltas['location_detail'] = serializer.data
-                except:
-                    pass
+        data = self.get_serializer(queryset, many=True).data
 
-            # Add stockitem detail
-            if 'stockitem' in deltas:
-                try:
-                    stockitem = StockItem.objects.get(pk=deltas['stockitem'])
-                    serializer = StockItemSerializer(stockitem)
-                    deltas['stockitem_detail'] = serializer.data
-                except:
-                    pass
+        return stock_tracking.hydrate_deltas(data)
 
-            # Add customer detail
-            if 'customer' in deltas:
-                try:
-                    customer = Company.objects.get(pk=deltas['customer'])
-                    serializer = CompanySerializer(customer)
-                    deltas['customer_detail'] = serializer.data
-                except:
-                    pass
+    def stream_rows(self, queryset):
+        """
+        Generate a JSON array of serialized tracking entries, one chunk at a time
+        """
 
-            # Add purchaseorder detail
-            if 'purchaseorder' in deltas:
-                try:
-                    order = PurchaseOrder.objects.get(pk=deltas['purchaseorder'])
-                    serializer = POSerializer(order)
-                    deltas['purchaseorder_detail'] = serializer.data
-                except:
-                    pass
+        encoder = DjangoJSONEncoder()
+
+        # Chunks are sliced by offset, which requires a total ordering
+        # (otherwise entries with the same date could be repeated or skipped between chunks)
+        queryset = queryset.order_by(*queryset.query.order_by, '-pk')
+
+        yield '['
+
+        offset = 0
+        first = True
+
+        while True:
+            rows = self.serialize_rows(queryset[offset:offset + self.STREAM_CHUNK_SIZE])
+
+            for row in rows:
+                yield ('' if first else ',') + encoder.encode(row)
+                first = False
+
+            if len(rows) < self.STREAM_CHUNK_SIZE:
+                break
+
+            offset += self.STREAM_CHUNK_SIZE
+
+        yield ']'
+
+    def list(self, request, *args, **kwargs):
+        """
+        Return the (optionally paginated) list of tracking entries.
+
+        Query parameters:
+        - limit / offset: Paginate the results
+        - stream: Stream the (unpaginated) results as a JSON array, for long histories
+        """
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+
+        if page is not None:
+            return self.get_paginated_response(self.serialize_rows(page))
+
+        if str2bool(request.query_params.get('stream', False)):
+            return StreamingHttpResponse(self.stream_rows(queryset), content_type='application/json')
+
+        data = self.serialize_rows(queryset)
 
         if request.is_ajax():
             return JsonResponse(data, safe=False)
@@ -1095,7 +1209,7 @@ class StockTrackingList(generics.ListAPIView):
         'user',
     ]
 
-    ordering = '-date'
+    ordering = ['-date', '-pk']
 
     ordering_fields = [
         'date',
@@ -1120,6 +1234,8 @@ class LocationDetail(generics.RetrieveUpdateDestroyAPIView):
 
 
 stock_endpoints = [
+    url(r'^serialize/', StockItemSerialize.as_view(), name='api-stock-item-serialize'),
+
     url(r'^$', StockDetail.as_view(), name='api-stock-detail'),
 ]
 
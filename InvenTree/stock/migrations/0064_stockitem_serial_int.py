@@ -0,0 +1,46 @@
+# Generated by Django 3.2.4 on 2021-06-20 10:12
+
+from django.db import migrations, models
+
+
+def update_serial_int(apps, schema_editor):
+    """
+    Calculate the integer representation of the serial number for existing StockItem objects
+    """
+
+    StockItem = apps.get_model('stock', 'stockitem')
+
+    items = StockItem.objects.exclude(serial=None)
+
+    for item in items:
+
+        try:
+            value = int(str(item.serial).strip())
+        except ValueError:
+            continue
+
+        # Value must fit into a 64-bit integer field
+        if abs(value) >= 2 ** 63:
+            continue
+
+        StockItem.objects.filter(pk=item.pk).update(serial_int=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0063_auto_20210511_2343'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockitem',
+            name='serial_int',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stockitem',
+            index=models.Index(fields=['part', 'serial_int'], name='stock_item_serial_int_idx'),
+        ),
+        migrations.RunPython(update_serial_int, reverse_code=migrations.RunPython.noop),
+    ]
@@ -9,7 +9,7 @@ from __future__ import unicode_literals
 import os
 
 from django.utils.translation import gettext_lazy as _
-from django.core.exceptions import ValidationError, FieldError
+from django.core.exceptions import ValidationError
 from django.urls import reverse
 
 from django.db import models, transaction
@@ -17,7 +17,7 @@ from django.db.models import Sum, Q
 from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
 from django.dispatch import receiver
 
 from common.settings import currency_code_default
@@ -31,8 +31,10 @@ from djmoney.models.fields import MoneyField
 from decimal import Decimal, InvalidOperation
 from datetime import datetime, timedelta
 from InvenTree import helpers
+from InvenTree import matching as template_matching
 
 import common.models
+import common.search as common_search
 import report.models
 import label.models
 
@@ -45,6 +47,8 @@ from users.models import Owner
 from company import models as CompanyModels
 from part import models as PartModels
 
+import stock.results as stock_results
+
 
 class StockLocation(InvenTreeTree):
     """ Organization tree for StockItem objects
@@ -161,6 +165,12 @@ class StockItem(MPTTModel):
         packaging: Description of how the StockItem is packaged (e.g. "reel", "loose", "tape" etc)
     """
 
+    class Meta:
+        indexes = [
+            # Allows the "latest" serial number for a part to be found via an index lookup
+            models.Index(fields=['part', 'serial_int'], name='stock_item_serial_int_idx'),
+        ]
+
     # A Query filter which will be re-used in multiple places to determine if a StockItem is actually "in stock"
     IN_STOCK_FILTER = Q(
         quantity__gt=0,
@@ -174,12 +184,106 @@ class StockItem(MPTTModel):
     # A query filter which can be used to filter StockItem objects which have expired
     EXPIRED_FILTER = IN_STOCK_FILTER & ~Q(expiry_date=None) & Q(expiry_date__lt=datetime.now().date())
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Record the values loaded from the database,
+        so that changed fields can be determined without re-fetching the item.
+        """
+
+        instance = super().from_db(db, field_names, values)
+
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+
+        super().refresh_from_db(using=using, fields=fields)
+
+        self.reset_loaded_values(fields)
+
+    def reset_loaded_values(self, fields=None):
+        """
+        Mark the current field values as "saved"
+
+        Args:
+            fields: Names of the fields which were loaded (or written). If None, all fields are reset
+        """
+
+        if fields is None:
+            self._loaded_values = {
+                field.attname: getattr(self, field.attname)
+                for field in self._meta.concrete_fields if field.attname in self.__dict__
+            }
+
+            return
+
+        loaded = getattr(self, '_loaded_values', None)
+
+        # Values for the other fields are not known
+        if loaded is None:
+            return
+
+        for name in fields:
+            attname = self._meta.get_field(name).attname
+
+            if attname in self.__dict__:
+                loaded[attname] = getattr(self, attname)
+
+    def get_changed_fields(self):
+        """
+        Return the set of field names which have been changed since this item was loaded (or saved).
+
+        Returns None if the changes are unknown
+        (e.g. the item has not been saved, or was loaded with deferred fields)
+        """
+
+        loaded = getattr(self, '_loaded_values', None)
+
+        if self._state.adding or loaded is None:
+            return None
+
+        # Item is being copied (e.g. the primary key has been cleared)
+        if self.pk is None or loaded.get(self._meta.pk.attname, None) != self.pk:
+            return None
+
+        changed = set()
+
+        for field in self._meta.concrete_fields:
+            if field.attname not in loaded:
+                return None
+
+            if loaded[field.attname] != getattr(self, field.attname):
+                changed.add(field.name)
+
+        return changed
+
+    def field_changed(self, *names, changed=None):
+        """
+        Return True if any of the named fields may have been changed
+        (and therefore need to be validated)
+        """
+
+        if changed is None:
+            changed = self.get_changed_fields()
+
+        if changed is None:
+            return True
+
+        return any([name in changed for name in names])
+
     def save(self, *args, **kwargs):
         """
         Save this StockItem to the database. Performs a number of checks:
 
         - Unique serial number requirement
         - Adds a transaction note when the item is first created.
+
+        Only the fields which have been changed (since the item was loaded)
+        are validated and written to the database.
         """
 
         self.validate_unique()
@@ -201,13 +305,18 @@ class StockItem(MPTTModel):
             # Check if "interesting" fields have been changed
             # (we wish to record these as historical records)
 
+            changed = self.get_changed_fields()
+
             try:
-                old = StockItem.objects.get(pk=self.pk)
+                if changed is None:
+                    old_status = StockItem.objects.get(pk=self.pk).status
+                else:
+                    old_status = self._loaded_values['status']
 
                 deltas = {}
 
                 # Status changed?
-                if not old.status == self.status:
+                if not old_status == self.status:
                     deltas['status'] = self.status
 
                 # TODO - Other interesting changes we are interested in...
@@ -223,10 +332,25 @@ class StockItem(MPTTModel):
             except (ValueError, StockItem.DoesNotExist):
                 pass
 
+            # Only write the changed fields
+            # (changes to the tree structure are always written in full)
+            if changed is not None and 'parent' not in changed and len(args) == 0 and 'update_fields' not in kwargs:
+                update_fields = changed | {'updated'}
+
+                if 'serial' in changed:
+                    update_fields.add('serial_int')
+
+                kwargs['update_fields'] = update_fields
+
             add_note = False
 
         super(StockItem, self).save(*args, **kwargs)
 
+        # Only the written fields are now "saved"
+        update_fields = kwargs.get('update_fields', args[3] if len(args) > 3 else None)
+
+        self.reset_loaded_values(update_fields)
+
         if add_note:
 
             tracking_info = {
@@ -262,7 +386,7 @@ class StockItem(MPTTModel):
         super(StockItem, self).validate_unique(exclude)
 
         # If the serial number is set, make sure it is not a duplicate
-        if self.serial:
+        if self.serial and self.field_changed('serial', 'part'):
             # Query to look for duplicate serial numbers
             parts = PartModels.Part.objects.filter(tree_id=self.part.tree_id)
             stock = StockItem.objects.filter(part__in=parts, serial=self.serial)
@@ -282,12 +406,19 @@ class StockItem(MPTTModel):
         - The 'part' and 'supplier_part.part' fields cannot point to the same Part object
         - The 'part' does not belong to itself
         - Quantity must be 1 if the StockItem has a serial number
+
+        For an existing item, only the checks which depend on the changed fields are performed.
         """
 
         super().clean()
 
+        changed = self.get_changed_fields()
+
+        def check(*names):
+            return self.field_changed(*names, changed=changed)
+
         try:
-            if self.part.trackable:
+            if check('part', 'quantity') and self.part.trackable:
                 # Trackable parts must have integer values for quantity field!
                 if not self.quantity == int(self.quantity):
                     raise ValidationError({
@@ -306,14 +437,14 @@ class StockItem(MPTTModel):
 
         # The 'supplier_part' field must point to the same part!
         try:
-            if self.supplier_part is not None:
+            if self.supplier_part_id is not None and check('supplier_part', 'part'):
                 if not self.supplier_part.part == self.part:
                     raise ValidationError({'supplier_part': _("Part type ('{pf}') must be {pe}").format(
                                            pf=str(self.supplier_part.part),
                                            pe=str(self.part))
                                            })
 
-            if self.part is not None:
+            if self.part_id is not None:
                 # A part with a serial number MUST have the quantity set to 1
                 if self.serial:
                     if self.quantity > 1:
@@ -339,19 +470,19 @@ class StockItem(MPTTModel):
             pass
 
         # Ensure that the item cannot be assigned to itself
-        if self.belongs_to and self.belongs_to.pk == self.pk:
+        if self.belongs_to_id is not None and self.belongs_to_id == self.pk:
             raise ValidationError({
                 'belongs_to': _('Item cannot belong to itself')
             })
 
         # If the item is marked as "is_building", it must point to a build!
-        if self.is_building and not self.build:
+        if self.is_building and self.build_id is None:
             raise ValidationError({
                 'build': _("Item must have a build reference if is_building=True")
             })
 
         # If the item points to a build, check that the Part references match
-        if self.build:
+        if self.build_id is not None and check('build', 'part'):
             if not self.part == self.build.part:
                 raise ValidationError({
                     'build': _("Build reference does not point to the same part object")
@@ -456,6 +587,9 @@ class StockItem(MPTTModel):
         help_text=_('Serial number for this item')
     )
 
+    # Integer representation of the serial number (used for efficient numerical sorting)
+    serial_int = models.BigIntegerField(null=True, blank=True, editable=False)
+
     link = InvenTreeURLField(
         verbose_name=_('External Link'),
         max_length=125, blank=True,
@@ -764,31 +898,30 @@ class StockItem(MPTTModel):
         Args:
             cascade - Include items which are installed in items which are installed in items
 
-        Note: This function is recursive, and may result in a number of database hits!
+        Installed items are loaded one level at a time (a single query per level).
         """
 
         installed = set()
 
-        items = StockItem.objects.filter(belongs_to=self)
+        parents = set([self.pk])
 
-        for item in items:
+        while len(parents) > 0:
 
-            # Prevent duplication or recursion
-            if item == self or item in installed:
-                continue
+            items = StockItem.objects.filter(belongs_to__in=parents)
 
-            installed.add(item)
+            parents = set()
 
-            if cascade:
-                sub_items = item.get_installed_items(cascade=True)
+            for item in items:
 
-                for sub_item in sub_items:
+                # Prevent duplication or recursion
+                if item == self or item in installed:
+                    continue
 
-                    # Prevent recursion
-                    if sub_item == self or sub_item in installed:
-                        continue
+                installed.add(item)
+                parents.add(item.pk)
 
-                    installed.add(sub_item)
+            if not cascade:
+                break
 
         return installed
 
@@ -1001,11 +1134,14 @@ class StockItem(MPTTModel):
             user: User object associated with action
             notes: Optional notes for tracking
             location: If specified, serialized items will be placed in the given location
+
+        Returns:
+            List of the newly created StockItem objects
         """
 
         # Cannot serialize stock that is already serialized!
         if self.serialized:
-            return
+            return []
 
         if not self.part.trackable:
             raise ValidationError({"part": _("Part is not set as trackable")})
@@ -1036,61 +1172,154 @@ class StockItem(MPTTModel):
             raise ValidationError({"serial_numbers": _("Serial numbers already exist: {exists}").format(exists=exists)})
 
         # Create a new stock item for each unique serial number
-        for serial in serials:
+        items = self.bulkSerialize(serials, user, notes=notes, location=location)
+
+        # Remove the equivalent number of items
+        self.take_stock(quantity, user, notes=notes)
+
+        return items
+
+    def bulkSerialize(self, serials, user, notes='', location=None):
+        """ Create a new (serialized) child StockItem for each of the provided serial numbers.
+
+        The new items, and the tracking history and test results copied to each new item,
+        are created using bulk_create (a fixed number of queries, regardless of quantity).
+        Space for the new items is made in the MPTT tree with a single query,
+        rather than shifting the tree once for each new item.
+
+        Note: Serial numbers are *not* validated here (see serializeStock)
+
+        Args:
+            serials: List of serial numbers
+            user: User object associated with action
+            notes: Optional notes for tracking
+            location: If specified, serialized items will be placed in the given location
+
+        Returns:
+            List of the newly created StockItem objects
+        """
+
+        if len(serials) == 0:
+            return []
+
+        # Use the current tree position of this item
+        self.refresh_from_db(fields=['tree_id', 'lft', 'rght', 'level'])
+
+        # Field values which are copied to each new item
+        data = StockItem.objects.filter(pk=self.pk).values().first()
+
+        for field in ['id', 'parent_id', 'tree_id', 'lft', 'rght', 'level']:
+            data.pop(field, None)
 
-            # Create a copy of this StockItem
-            new_item = StockItem.objects.get(pk=self.pk)
-            new_item.quantity = 1
-            new_item.serial = serial
-            new_item.pk = None
-            new_item.parent = self
+        # Make room in the tree for the new items (as the last children of this item)
+        size = 2 * len(serials)
+        left = self.rght
+
+        StockItem.objects._create_space(size, self.rght - 1, self.tree_id)
+
+        # Keep the in-memory tree position in sync, as this item is saved again later
+        self.rght += size
+
+        items = []
+
+        for idx, serial in enumerate(serials):
+            item = StockItem(**data)
+
+            item.quantity = 1
+            item.serial = serial
+            item.serial_int = helpers.serial_number_to_int(serial)
+            item.parent = self
+
+            item.tree_id = self.tree_id
+            item.level = self.level + 1
+            item.lft = left + 2 * idx
+            item.rght = item.lft + 1
 
             if location:
-                new_item.location = location
+                item.location = location
 
-            # The item already has a transaction history, don't create a new note
-            new_item.save(user=user, notes=notes)
+            items.append(item)
 
-            # Copy entire transaction history
-            new_item.copyHistoryFrom(self)
+        StockItem.objects.bulk_create(items)
 
-            # Copy test result history
-            new_item.copyTestResultsFrom(self)
+        # Not all database backends return primary keys from bulk_create,
+        # so re-fetch the new items (in the same order as the serial numbers)
+        items = list(StockItem.objects.filter(
+            parent=self,
+            tree_id=self.tree_id,
+            lft__gte=left,
+            rght__lt=left + size,
+        ).order_by('lft'))
 
-            # Create a new stock tracking item
-            new_item.add_tracking_entry(
-                StockHistoryCode.ASSIGNED_SERIAL,
-                user,
+        history = list(self.tracking_info.all().order_by('pk'))
+        results = list(self.test_results.all().order_by('pk'))
+
+        tracking = []
+        test_results = []
+
+        for item in items:
+
+            # Tracking entries are created in the same order as StockItem.save() and copyHistoryFrom()
+            deltas = {
+                'status': item.status,
+                'quantity': float(item.quantity),
+            }
+
+            if item.location_id:
+                deltas['location'] = item.location_id
+
+            tracking.append(StockItemTracking(
+                item=item,
+                tracking_type=StockHistoryCode.CREATED,
+                user=user,
                 notes=notes,
-                deltas={
-                    'serial': serial,
-                },
-                location=location
-            )
+                deltas=deltas,
+            ))
 
-        # Remove the equivalent number of items
-        self.take_stock(quantity, user, notes=notes)
+            for entry in history:
+                tracking.append(entry.copy_to(item))
+
+            deltas = {
+                'serial': item.serial,
+            }
+
+            if location:
+                deltas['location'] = location.id
+
+            tracking.append(StockItemTracking(
+                item=item,
+                tracking_type=StockHistoryCode.ASSIGNED_SERIAL,
+                user=user,
+                notes=notes,
+                deltas=deltas,
+            ))
+
+            for result in results:
+                test_results.append(result.copy_to(item))
+
+        StockItemTracking.objects.bulk_create(tracking)
+        StockItemTestResult.objects.bulk_create(test_results)
+
+        # bulk_create does not send the post_save signal, so add the new items to the search index here
+        common_search.SearchIndex.update_queryset(StockItem.objects.filter(pk__in=[item.pk for item in items]))
+
+        return items
 
     @transaction.atomic
     def copyHistoryFrom(self, other):
         """ Copy stock history from another StockItem """
 
-        for item in other.tracking_info.all():
-
-            item.item = self
-            item.pk = None
-            item.save()
+        StockItemTracking.objects.bulk_create([
+            entry.copy_to(self) for entry in other.tracking_info.all().order_by('pk')
+        ])
 
     @transaction.atomic
     def copyTestResultsFrom(self, other, filters={}):
         """ Copy all test results from another StockItem """
 
-        for result in other.test_results.all().filter(**filters):
-
-            # Create a copy of the test result by nulling-out the pk
-            result.pk = None
-            result.stock_item = self
-            result.save()
+        StockItemTestResult.objects.bulk_create([
+            result.copy_to(self) for result in other.test_results.all().filter(**filters).order_by('pk')
+        ])
 
     @transaction.atomic
     def splitStock(self, quantity, location, user, **kwargs):
@@ -1451,8 +1680,11 @@ class StockItem(MPTTModel):
         if include_installed:
             installed_items = self.get_installed_items(cascade=cascade)
 
+            # Load the results for all installed items in a single query
+            installed_results = stock_results.get_result_maps([item.pk for item in installed_items])
+
             for item in installed_items:
-                item_results = item.testResultMap()
+                item_results = installed_results[item.pk]
 
                 for key in item_results.keys():
                     # Results from sub items should not override master ones
@@ -1479,44 +1711,20 @@ class StockItem(MPTTModel):
             - failed: Number of tests that have failed
         """
 
-        # All the tests required by the part object
-        required = self.part.getRequiredTests()
-
-        results = self.testResultMap()
-
-        total = len(required)
-        passed = 0
-        failed = 0
-
-        for test in required:
-            key = helpers.generateTestKey(test.test_name)
-
-            if key in results:
-                result = results[key]
-
-                if result.result:
-                    passed += 1
-                else:
-                    failed += 1
-
-        return {
-            'total': total,
-            'passed': passed,
-            'failed': failed,
-        }
+        return stock_results.TestStatus([self]).status(self.pk)
 
     @property
     def required_test_count(self):
         """
         Return the number of 'required tests' for this StockItem
         """
-        return self.part.getRequiredTests().count()
+        return len(stock_results.get_required_tests([self.part_id]).get(self.part_id, {}))
 
     def hasRequiredTests(self):
         """
         Return True if there are any 'required tests' associated with this StockItem
         """
-        return self.part.getRequiredTests().count() > 0
+        return self.required_test_count > 0
 
     def passedAllRequiredTests(self):
         """
@@ -1532,21 +1740,7 @@ class StockItem(MPTTModel):
         Return a list of TestReport objects which match this StockItem.
         """
 
-        reports = []
-
-        item_query = StockItem.objects.filter(pk=self.pk)
-
-        for test_report in report.models.TestReport.objects.filter(enabled=True):
-
-            # Attempt to validate report filter (skip if invalid)
-            try:
-                filters = helpers.validateFilterString(test_report.filters)
-                if item_query.filter(**filters).exists():
-                    reports.append(test_report)
-            except (ValidationError, FieldError):
-                continue
-
-        return reports
+        return template_matching.get_matching_templates(report.models.TestReport, self)
 
     @property
     def has_test_reports(self):
@@ -1561,21 +1755,7 @@ class StockItem(MPTTModel):
         Return a list of Label objects which match this StockItem
         """
 
-        labels = []
-
-        item_query = StockItem.objects.filter(pk=self.pk)
-
-        for lbl in label.models.StockItemLabel.objects.filter(enabled=True):
-
-            try:
-                filters = helpers.validateFilterString(lbl.filters)
-
-                if item_query.filter(**filters).exists():
-                    labels.append(lbl)
-            except (ValidationError, FieldError):
-                continue
-
-        return labels
+        return template_matching.get_matching_templates(label.models.StockItemLabel, self)
 
     @property
     def has_labels(self):
@@ -1586,6 +1766,66 @@ class StockItem(MPTTModel):
         return len(self.available_labels()) > 0
 
 
+@receiver(pre_save, sender=StockItem, dispatch_uid='stock_item_pre_save_serial')
+def before_save_stock_item(sender, instance, **kwargs):
+    """ Receives pre_save signal from StockItem object.
+
+    Update the integer representation of the serial number.
+    (This is also performed when loading fixture data)
+    """
+
+    instance.serial_int = helpers.serial_number_to_int(instance.serial)
+
+
+@receiver(pre_save, sender=StockItem, dispatch_uid='stock_item_pre_save_part')
+def before_save_stock_item_part(sender, instance, **kwargs):
+    """
+    Record the Part which the StockItem previously pointed to,
+    if it was not loaded along with the item (e.g. deferred fields).
+    """
+
+    instance._previous_part_id = None
+
+    if instance._state.adding or instance.pk is None:
+        return
+
+    loaded = getattr(instance, '_loaded_values', None) or {}
+
+    if 'part_id' in loaded:
+        instance._previous_part_id = loaded['part_id']
+    else:
+        instance._previous_part_id = StockItem.objects.filter(pk=instance.pk).values_list('part', flat=True).first()
+
+
+@receiver(post_save, sender=StockItem, dispatch_uid='stock_item_post_save_quantities')
+def after_save_stock_item(sender, instance, **kwargs):
+    """
+    Update the cached stock quantity for the associated Part.
+
+    If the StockItem has been moved to a different Part (e.g. converted to a variant),
+    the cached quantities for the previous Part are also updated.
+    """
+
+    previous = getattr(instance, '_previous_part_id', None)
+
+    if previous is not None and previous != instance.part_id:
+        PartModels.update_part_quantities(previous, 'in_stock', 'allocated')
+        PartModels.update_part_quantities(instance.part_id, 'in_stock', 'allocated')
+    else:
+        PartModels.update_part_quantities(instance.part_id, 'in_stock')
+
+
+@receiver(post_delete, sender=StockItem, dispatch_uid='stock_item_post_delete_quantities')
+def after_delete_stock_item(sender, instance, **kwargs):
+    """
+    Update the cached stock (and allocation) quantities for the associated Part.
+
+    Any allocations against the StockItem will also have been deleted.
+    """
+
+    PartModels.update_part_quantities(instance.part_id, 'in_stock', 'allocated')
+
+
 @receiver(pre_delete, sender=StockItem, dispatch_uid='stock_item_pre_delete_log')
 def before_delete_stock_item(sender, instance, using, **kwargs):
     """ Receives pre_delete signal from StockItem object.
@@ -1649,6 +1889,17 @@ class StockItemTracking(models.Model):
         else:
             return self.title
 
+    def copy_to(self, item):
+        """ Return an (unsaved) copy of this tracking entry, for a different StockItem """
+
+        return StockItemTracking(
+            item=item,
+            tracking_type=self.tracking_type,
+            notes=self.notes,
+            user_id=self.user_id,
+            deltas=self.deltas,
+        )
+
     tracking_type = models.IntegerField(
         default=StockHistoryCode.LEGACY,
     )
@@ -1733,6 +1984,19 @@ class StockItemTestResult(models.Model):
     def key(self):
         return helpers.generateTestKey(self.test)
 
+    def copy_to(self, item):
+        """ Return an (unsaved) copy of this test result, for a different StockItem """
+
+        return StockItemTestResult(
+            stock_item=item,
+            test=self.test,
+            result=self.result,
+            value=self.value,
+            attachment=self.attachment,
+            notes=self.notes,
+            user_id=self.user_id,
+        )
+
     stock_item = models.ForeignKey(
         StockItem,
         on_delete=models.CASCADE,
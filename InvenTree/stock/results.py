@@ -0,0 +1,148 @@
+"""
+Batch calculation of stock item test results.
+
+Calculating the test status for a StockItem requires the test results for the item,
+and the required test templates for the part (and all template parts above it).
+Performing this calculation for each item separately requires multiple queries per item
+(e.g. when listing or reporting on many serialized build outputs).
+
+The TestStatus class calculates the test status for a set of stock items:
+
+- The test results for all items are loaded in a single query
+- The required test templates for all parts (and their ancestors) are loaded in a single query
+- Required tests are deduplicated (by test key) for each part
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from InvenTree.helpers import generateTestKey
+
+from part import models as PartModels
+from stock import models as StockModels
+
+
+def get_result_maps(item_ids):
+    """
+    Return a map of test results for each stock item.
+
+    Returns a dict of stock item pk -> {test key: StockItemTestResult},
+    where the *most recent* result is used for each test key
+    """
+
+    item_ids = list(item_ids)
+
+    result_maps = {pk: {} for pk in item_ids}
+
+    results = StockModels.StockItemTestResult.objects.filter(stock_item__in=item_ids).order_by('date', 'pk')
+
+    for result in results:
+        result_maps[result.stock_item_id][generateTestKey(result.test)] = result
+
+    return result_maps
+
+
+def get_required_tests(part_ids):
+    """
+    Return the required test templates for each part.
+
+    Required tests include those defined for any template part above the part.
+
+    Returns a dict of part pk -> {test key: PartTestTemplate}
+    """
+
+    parts = PartModels.Part.objects.filter(pk__in=list(part_ids)).values_list('pk', 'tree_id', 'lft', 'rght')
+
+    parts = list(parts)
+
+    required = {pk: {} for pk, _tree, _lft, _rght in parts}
+
+    if len(parts) == 0:
+        return required
+
+    templates = PartModels.PartTestTemplate.objects.filter(
+        required=True,
+        part__tree_id__in=set([tree for _pk, tree, _lft, _rght in parts]),
+    ).select_related('part')
+
+    # Group the templates by part tree
+    tree_templates = {}
+
+    for template in templates:
+        tree_templates.setdefault(template.part.tree_id, []).append(template)
+
+    for pk, tree, lft, rght in parts:
+        for template in tree_templates.get(tree, []):
+            # Template is defined for this part, or a part above it in the tree
+            if template.part.lft <= lft and template.part.rght >= rght:
+                required[pk].setdefault(generateTestKey(template.test_name), template)
+
+    return required
+
+
+class TestStatus:
+    """
+    Calculate the test status for multiple stock items.
+
+    Args:
+        items: StockItem queryset (or list of StockItem objects)
+
+    Usage:
+        status = TestStatus(StockItem.objects.filter(build=build))
+
+        for item, result in status.items():
+            ...
+    """
+
+    def __init__(self, items):
+
+        if hasattr(items, 'values_list'):
+            # Only the pk and part fields are required
+            self.parts = dict(items.values_list('pk', 'part'))
+        else:
+            self.parts = {item.pk: item.part_id for item in items}
+
+        self.results = get_result_maps(self.parts.keys())
+        self.required = get_required_tests(set(self.parts.values()))
+
+    def status(self, pk):
+        """
+        Return the status of the tests required for a single stock item.
+
+        return:
+            A dict containing the following items:
+            - total: Number of required tests
+            - passed: Number of tests that have passed
+            - failed: Number of tests that have failed
+        """
+
+        required = self.required.get(self.parts[pk], {})
+        results = self.results.get(pk, {})
+
+        passed = 0
+        failed = 0
+
+        for key in required.keys():
+            if key in results:
+                if results[key].result:
+                    passed += 1
+                else:
+                    failed += 1
+
+        return {
+            'total': len(required),
+            'passed': passed,
+            'failed': failed,
+        }
+
+    def passed(self, pk):
+        """ Return True if the stock item has passed all required tests """
+
+        status = self.status(pk)
+
+        return status['passed'] >= status['total']
+
+    def items(self):
+        """ Return a list of (stock item pk, status) for every stock item """
+
+        return [(pk, self.status(pk)) for pk in self.parts.keys()]
@@ -2,6 +2,8 @@
 JSON serializers for Stock app
 """
 
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework import serializers
 
 from .models import StockItem, StockLocation
@@ -237,6 +239,32 @@ class StockItemSerializer(InvenTreeModelSerializer):
         ]
 
 
+class StockItemSerializeSerializer(serializers.Serializer):
+    """
+    Serializer for the data required to serialize a StockItem
+    (see the StockItemSerialize API endpoint)
+    """
+
+    quantity = serializers.IntegerField(
+        error_messages={
+            'invalid': _('Quantity must be integer'),
+        }
+    )
+
+    serial_numbers = serializers.CharField(allow_blank=True)
+
+    destination = serializers.PrimaryKeyRelatedField(
+        queryset=StockLocation.objects.all(),
+        required=False, allow_null=True,
+        error_messages={
+            'does_not_exist': _('Invalid location specified'),
+            'incorrect_type': _('Invalid location specified'),
+        }
+    )
+
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
 class StockQuantitySerializer(InvenTreeModelSerializer):
 
     class Meta:
@@ -5,17 +5,20 @@ Unit testing for the Stock API
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import json
+
 from datetime import datetime, timedelta
 
 from rest_framework import status
 from django.urls import reverse
 
-from InvenTree.status_codes import StockStatus
+from InvenTree.status_codes import StockStatus, StockHistoryCode
 from InvenTree.api_tester import InvenTreeAPITestCase
 
 from common.models import InvenTreeSetting
 
-from .models import StockItem, StockLocation
+from .models import StockItem, StockLocation, StockItemTracking
+from .api import StockTrackingList
 
 
 class StockAPITestCase(InvenTreeAPITestCase):
@@ -257,6 +260,23 @@ class StockItemListTest(StockAPITestCase):
 
             self.assertEqual(len(response['results']), n)
 
+    def test_test_detail(self):
+        """
+        Test that the required test status can be included in the stock list
+        """
+
+        data = self.get_stock(test_detail=True, part=10000)
+
+        self.assertTrue(len(data) > 0)
+
+        for item in data:
+            instance = StockItem.objects.get(pk=item['pk'])
+            test_status = instance.requiredTestStatus()
+
+            self.assertEqual(item['required_tests'], test_status['total'])
+            self.assertEqual(item['tests_passed'], test_status['passed'])
+            self.assertEqual(item['tests_failed'], test_status['failed'])
+
 
 class StockItemTest(StockAPITestCase):
     """
@@ -498,6 +518,81 @@ class StocktakeTest(StockAPITestCase):
             response = self.post(url, data)
             self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_bulk_count(self):
+        """
+        Test a stocktake against multiple stock items
+        """
+
+        url = reverse('api-stock-count')
+
+        n = StockItemTracking.objects.count()
+
+        data = {
+            'items': [
+                {'pk': 1, 'quantity': 3500},
+                {'pk': 2, 'quantity': 5000},
+                {'pk': 1234, 'quantity': 1000},
+                {'pk': 105, 'quantity': 5},
+            ],
+            'notes': 'Counting stock',
+        }
+
+        response = self.post(url, data)
+        self.assertContains(response, 'Updated stock for 4 items', status_code=status.HTTP_200_OK)
+
+        results = response.data['items']
+
+        self.assertEqual(len(results), 4)
+
+        for result in results:
+            self.assertTrue(result['success'])
+
+        # Serialized stock quantity is not adjusted
+        self.assertEqual(results[3]['quantity'], 1)
+
+        self.assertEqual(StockItem.objects.get(pk=1).quantity, 3500)
+        self.assertEqual(StockItem.objects.get(pk=1234).quantity, 1000)
+
+        # A tracking entry is created for each (non-serialized) item
+        self.assertEqual(StockItemTracking.objects.count(), n + 3)
+
+        tracking = StockItemTracking.objects.filter(item=1).latest('pk')
+        self.assertEqual(tracking.notes, 'Counting stock')
+        self.assertEqual(tracking.deltas['quantity'], 3500)
+
+        # Cached part quantities are updated
+        part = StockItem.objects.get(pk=1).part
+        self.assertEqual(part.in_stock, part.total_stock)
+
+    def test_bulk_remove(self):
+        """
+        Test removing stock from multiple stock items
+        """
+
+        url = reverse('api-stock-remove')
+
+        data = {
+            'items': [
+                {'pk': 1, 'quantity': 1000},
+                {'pk': 105, 'quantity': 1},
+                {'pk': 2, 'quantity': 5000},
+            ]
+        }
+
+        response = self.post(url, data)
+        self.assertContains(response, 'Removed stock for 2 items', status_code=status.HTTP_200_OK)
+
+        results = response.data['items']
+
+        self.assertTrue(results[0]['success'])
+        self.assertFalse(results[1]['success'])
+        self.assertIn('error', results[1])
+
+        self.assertEqual(StockItem.objects.get(pk=1).quantity, 3000)
+
+        # Depleted stock item is deleted
+        self.assertFalse(StockItem.objects.filter(pk=2).exists())
+
     def test_transfer(self):
         """
         Test stock transfers
@@ -524,6 +619,133 @@ class StocktakeTest(StockAPITestCase):
         self.assertContains(response, 'Valid location must be specified', status_code=status.HTTP_400_BAD_REQUEST)
 
 
+class StockSerializeTest(StockAPITestCase):
+
+    def get_url(self, pk):
+        return reverse('api-stock-item-serialize', kwargs={'pk': pk})
+
+    def test_serialize(self):
+        """
+        Test stock serialization via the API
+        """
+
+        url = self.get_url(100)
+
+        # Serial number '1000' is already in use
+        response = self.post(url, {'quantity': 2, 'serial_numbers': '999-1000'})
+        self.assertContains(response, 'Serial numbers already exist', status_code=status.HTTP_400_BAD_REQUEST)
+
+        # Quantity does not match serial numbers
+        response = self.post(url, {'quantity': 3, 'serial_numbers': '1-2'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Invalid destination
+        response = self.post(url, {'quantity': 2, 'serial_numbers': '1-2', 'destination': 'abc'})
+        self.assertContains(response, 'Invalid location specified', status_code=status.HTTP_400_BAD_REQUEST)
+
+        response = self.post(url, {'quantity': 4, 'serial_numbers': '1-4', 'destination': 1, 'notes': 'Serialized'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(response.data['items']), 4)
+
+        for pk in response.data['items']:
+            item = StockItem.objects.get(pk=pk)
+            self.assertEqual(item.parent.pk, 100)
+            self.assertEqual(item.location.pk, 1)
+
+        self.assertEqual(StockItem.objects.get(pk=100).quantity, 6)
+
+
+class StockTrackingTest(StockAPITestCase):
+
+    def setUp(self):
+
+        super().setUp()
+
+        item = StockItem.objects.get(pk=1)
+
+        for idx in range(10):
+            item.add_tracking_entry(
+                StockHistoryCode.STOCK_MOVE,
+                self.user,
+                deltas={
+                    'location': 1 + (idx % 2),
+                    'customer': 1,
+                    'stockitem': 2,
+                },
+                notes=f'Entry {idx}',
+            )
+
+        # Reference to an object which does not exist
+        item.add_tracking_entry(StockHistoryCode.STOCK_MOVE, self.user, deltas={'location': 9999})
+
+    def test_list(self):
+
+        url = reverse('api-stock-track')
+
+        response = self.get(url, {'item': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        entries = [entry for entry in response.data if entry['deltas'].get('customer', None) == 1]
+
+        self.assertEqual(len(entries), 10)
+
+        for entry in entries:
+            deltas = entry['deltas']
+
+            self.assertEqual(deltas['location_detail']['pk'], deltas['location'])
+            self.assertEqual(deltas['customer_detail']['pk'], 1)
+            self.assertEqual(deltas['stockitem_detail']['pk'], 2)
+
+        missing = [entry for entry in response.data if entry['deltas'].get('location', None) == 9999]
+
+        self.assertEqual(len(missing), 1)
+        self.assertNotIn('location_detail', missing[0]['deltas'])
+
+        n = len(response.data)
+
+        # Paginated response
+        response = self.get(url, {'item': 1, 'limit': 5})
+
+        self.assertEqual(response.data['count'], n)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIn('location_detail', response.data['results'][-1]['deltas'])
+
+    def test_stream(self):
+
+        url = reverse('api-stock-track')
+
+        expected = self.get(url, {'item': 1}).data
+
+        StockTrackingList.STREAM_CHUNK_SIZE = 3
+
+        try:
+            response = self.get(url, {'item': 1, 'stream': True})
+        finally:
+            StockTrackingList.STREAM_CHUNK_SIZE = 250
+
+        data = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual([entry['pk'] for entry in data], [entry['pk'] for entry in expected])
+        self.assertEqual(data[0]['deltas'].get('location_detail', None), expected[0]['deltas'].get('location_detail', None))
+
+        # Entries with the same date are streamed exactly once (across chunks)
+        entries = StockItemTracking.objects.filter(item=1)
+        entries.update(date=entries.first().date)
+
+        StockTrackingList.STREAM_CHUNK_SIZE = 3
+
+        try:
+            response = self.get(url, {'item': 1, 'stream': True, 'ordering': 'date'})
+        finally:
+            StockTrackingList.STREAM_CHUNK_SIZE = 250
+
+        pks = [entry['pk'] for entry in json.loads(b''.join(response.streaming_content))]
+
+        self.assertEqual(pks, sorted(entries.values_list('pk', flat=True), reverse=True))
+
+
 class StockTestResultTest(StockAPITestCase):
 
     def get_url(self):
@@ -5,10 +5,12 @@ from django.core.exceptions import ValidationError
 
 import datetime
 
-from InvenTree.status_codes import StockHistoryCode
+from InvenTree import helpers
+from InvenTree.status_codes import StockHistoryCode, StockStatus
 
 from .models import StockLocation, StockItem, StockItemTracking
 from .models import StockItemTestResult
+from .results import TestStatus
 
 from part.models import Part
 from build.models import Build
@@ -327,6 +329,92 @@ class StockTest(TestCase):
         # Test that negative quantity does nothing
         self.assertFalse(it.take_stock(-10, None))
 
+    def test_changed_fields(self):
+        """
+        Test that only the changed fields are validated and saved
+        """
+
+        it = StockItem.objects.get(pk=2)
+
+        self.assertEqual(it.get_changed_fields(), set())
+
+        it.quantity = 10
+        it.notes = 'Some notes'
+
+        self.assertEqual(it.get_changed_fields(), set(['quantity', 'notes']))
+
+        # A stale copy of the same item
+        other = StockItem.objects.get(pk=2)
+
+        it.save()
+
+        self.assertEqual(it.get_changed_fields(), set())
+
+        # Saving the stale copy does not overwrite unchanged fields
+        other.batch = 'B123'
+        other.save()
+
+        it = StockItem.objects.get(pk=2)
+
+        self.assertEqual(it.quantity, 10)
+        self.assertEqual(it.notes, 'Some notes')
+        self.assertEqual(it.batch, 'B123')
+
+        # Status changes are recorded, without re-fetching the item
+        n = it.tracking_info.count()
+
+        it.status = StockStatus.DAMAGED
+        it.save()
+
+        self.assertEqual(it.tracking_info.count(), n + 1)
+
+        track = it.tracking_info.latest('id')
+        self.assertEqual(track.tracking_type, StockHistoryCode.EDITED)
+        self.assertEqual(track.deltas['status'], StockStatus.DAMAGED)
+
+        # Invalid changes are still validated
+        it.belongs_to = it
+
+        with self.assertRaises(ValidationError):
+            it.save()
+
+        # Copies of an item are validated in full
+        it = StockItem.objects.get(pk=2)
+        self.assertIsNotNone(it.get_changed_fields())
+
+        it.pk = None
+        self.assertIsNone(it.get_changed_fields())
+
+    def test_changed_fields_partial(self):
+        """
+        Partial refreshes / saves only mark the refreshed (or written) fields as saved
+        """
+
+        it = StockItem.objects.get(pk=2)
+
+        it.quantity = 20
+        it.notes = 'Unsaved notes'
+
+        # Only the 'quantity' field is written to the database
+        it.save(update_fields=['quantity'])
+
+        self.assertEqual(it.get_changed_fields(), set(['notes']))
+
+        it.batch = 'B999'
+
+        # Only the 'batch' field is reloaded
+        it.refresh_from_db(fields=['batch'])
+
+        self.assertEqual(it.get_changed_fields(), set(['notes']))
+
+        # The remaining change is written by the next save
+        it.save()
+
+        it = StockItem.objects.get(pk=2)
+
+        self.assertEqual(it.quantity, 20)
+        self.assertEqual(it.notes, 'Unsaved notes')
+
     def test_deplete_stock(self):
 
         w1 = StockItem.objects.get(pk=100)
@@ -411,6 +499,45 @@ class StockTest(TestCase):
         # Serialize the remainder of the stock
         item.serializeStock(2, [99, 100], self.user)
 
+    def test_serialize_stock_bulk(self):
+        """ Serialized items are created with tracking history and test results copied from the parent """
+
+        item = StockItem.objects.create(
+            part=Part.objects.get(pk=25),
+            location=self.office,
+            quantity=50,
+        )
+
+        item.add_tracking_entry(StockHistoryCode.EDITED, self.user, notes='Edited')
+
+        StockItemTestResult.objects.create(stock_item=item, test='Firmware', result=True)
+
+        history = item.tracking_info.count()
+
+        items = item.serializeStock(40, list(range(200, 240)), self.user, notes='Bulk', location=self.drawer1)
+
+        self.assertEqual(len(items), 40)
+        self.assertEqual(item.quantity, 10)
+
+        # The serialized items are correctly inserted into the tree
+        item = StockItem.objects.get(pk=item.pk)
+        self.assertEqual(item.get_descendant_count(), 40)
+        self.assertEqual(list(item.get_children().values_list('serial', flat=True)), [str(n) for n in range(200, 240)])
+
+        for child in items:
+            self.assertEqual(child.quantity, 1)
+            self.assertEqual(child.location, self.drawer1)
+            self.assertEqual(child.serial_int, int(child.serial))
+
+            # Parent history, plus 'created' and 'assigned serial' entries
+            self.assertEqual(child.tracking_info.count(), history + 2)
+            self.assertEqual(child.tracking_info.filter(tracking_type=StockHistoryCode.ASSIGNED_SERIAL).count(), 1)
+
+            self.assertTrue(child.test_results.filter(test='Firmware', result=True).exists())
+
+        # Serial numbers are now in use
+        self.assertEqual(len(item.part.find_conflicting_serial_numbers(range(235, 245))), 5)
+
 
 class VariantTest(StockTest):
     """
@@ -457,6 +584,16 @@ class VariantTest(StockTest):
 
         self.assertEqual(len(conflicts), 6)
 
+        # Conflicts are checked with a single query
+        with self.assertNumQueries(1):
+            conflicts = chair.find_conflicting_serial_numbers(range(1, 100))
+
+        self.assertEqual(len(conflicts), 11)
+
+        # The integer representation of each serial number is stored
+        item = StockItem.objects.get(part__tree_id=chair.tree_id, serial='22')
+        self.assertEqual(item.serial_int, 22)
+
         # Same operations on a sub-item
         variant = Part.objects.get(pk=10003)
         self.assertEqual(variant.getLatestSerialNumber(), '22')
@@ -558,6 +695,45 @@ class TestResultTest(StockTest):
 
         self.assertTrue(item.passedAllRequiredTests())
 
+    def test_batch_test_status(self):
+        """
+        Test that the batch test status matches the per-item calculation
+        """
+
+        items = StockItem.objects.filter(part__tree_id=Part.objects.get(pk=10000).tree_id)
+
+        self.assertTrue(items.count() > 1)
+
+        status = TestStatus(items)
+
+        for pk, result in status.items():
+            item = StockItem.objects.get(pk=pk)
+
+            # Calculate the test status separately for each item
+            required = item.part.getRequiredTests()
+            results = item.testResultMap()
+
+            expected = {
+                'total': required.count(),
+                'passed': 0,
+                'failed': 0,
+            }
+
+            for test in required:
+                key = helpers.generateTestKey(test.test_name)
+
+                if key in results:
+                    expected['passed' if results[key].result else 'failed'] += 1
+
+            self.assertEqual(result, expected)
+            self.assertEqual(status.passed(pk), expected['passed'] >= expected['total'])
+
+        result = status.status(522)
+
+        self.assertEqual(result['total'], 5)
+        self.assertEqual(result['passed'], 2)
+        self.assertEqual(result['failed'], 2)
+
     def test_duplicate_item_tests(self):
 
         # Create an example stock item by copying one from the database (because we are lazy)
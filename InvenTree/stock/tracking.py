@@ -0,0 +1,123 @@
+"""
+Hydration of related objects referenced by stock tracking entries.
+
+Each StockItemTracking entry stores a dict of "deltas", which may reference other objects
+(e.g. the location a stock item was moved to, or the customer it was sent to).
+The stock tracking API adds detail information for each referenced object.
+
+Loading (and serializing) each referenced object separately required up to four queries
+for every tracking entry. The hydrate_deltas function instead:
+
+- Collects the referenced primary keys across all tracking entries
+- Loads each referenced model with a single "pk__in" query
+- Serializes each referenced object only once
+"""
+
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from company.models import Company
+from company.serializers import CompanySerializer
+from order.models import PurchaseOrder
+from order.serializers import POSerializer
+
+from stock.models import StockItem, StockLocation
+from stock.serializers import LocationSerializer, StockItemSerializer
+
+
+def get_stock_items(pk_list):
+
+    queryset = StockItem.objects.filter(pk__in=pk_list)
+    queryset = StockItemSerializer.prefetch_queryset(queryset)
+    queryset = StockItemSerializer.annotate_queryset(queryset)
+
+    return queryset
+
+
+def get_companies(pk_list):
+
+    return CompanySerializer.annotate_queryset(Company.objects.filter(pk__in=pk_list))
+
+
+def get_purchase_orders(pk_list):
+
+    return POSerializer.annotate_queryset(PurchaseOrder.objects.filter(pk__in=pk_list))
+
+
+def get_locations(pk_list):
+
+    return StockLocation.objects.filter(pk__in=pk_list)
+
+
+# Referenced objects: delta key -> (function returning a queryset for a list of pk values, serializer)
+DELTA_MODELS = {
+    'location': (get_locations, LocationSerializer),
+    'stockitem': (get_stock_items, StockItemSerializer),
+    'customer': (get_companies, CompanySerializer),
+    'purchaseorder': (get_purchase_orders, POSerializer),
+}
+
+
+def get_pk(value):
+    """ Return a referenced primary key value as an integer (or None if invalid) """
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def hydrate_deltas(rows):
+    """
+    Add detail information for the objects referenced by serialized stock tracking entries.
+
+    Args:
+        rows: List of serialized StockItemTracking data (modified in place)
+
+    For each referenced object (e.g. deltas['location']),
+    the serialized object is added to the deltas (e.g. deltas['location_detail']).
+    Objects which no longer exist are ignored.
+    """
+
+    # Collect the referenced pk values for each model
+    references = {key: set() for key in DELTA_MODELS.keys()}
+
+    for row in rows:
+        deltas = row.get('deltas', None) or {}
+
+        for key in DELTA_MODELS.keys():
+            if key in deltas:
+                pk = get_pk(deltas[key])
+
+                if pk is not None:
+                    references[key].add(pk)
+
+    # Load and serialize each referenced object (once)
+    details = {}
+
+    for key, (get_queryset, serializer) in DELTA_MODELS.items():
+
+        details[key] = {}
+
+        if len(references[key]) == 0:
+            continue
+
+        for item in serializer(get_queryset(references[key]), many=True).data:
+            details[key][item['pk']] = item
+
+    for row in rows:
+        deltas = row.get('deltas', None)
+
+        if not deltas:
+            continue
+
+        for key in DELTA_MODELS.keys():
+            if key not in deltas:
+                continue
+
+            detail = details[key].get(get_pk(deltas[key]), None)
+
+            if detail is not None:
+                deltas[f'{key}_detail'] = detail
+
+    return rows
@@ -137,6 +137,9 @@ class RuleSet(models.Model):
         'common_inventreesetting',
         'company_contact',
         'users_owner',
+        'report_reportjob',
+        'part_bomusage',
+        'common_searchentry',
 
         # Third-party tables
         'error_report_error',
@@ -144,6 +144,16 @@ def migrate(c):
     manage(c, "migrate --run-syncdb")
     manage(c, "check")
 
+    # Ensure that cached part quantities (and BOM status) are up to date
+    manage(c, "rebuild_part_quantities")
+    manage(c, "rebuild_bom_status")
+
+    # Ensure that the search index is up to date
+    manage(c, "rebuild_search_index")
+
+    # Render any missing part image thumbnails
+    manage(c, "rebuild_thumbnails")
+
     print("========================================")
     print("InvenTree database migrations completed!")
 